@@ -0,0 +1,87 @@
+"""Find native classes whose instances can't be part of reference cycles.
+
+Instances of such classes don't need to support the cyclic garbage
+collector, so they are neither tracked nor traversed by it.
+
+A class needs GC support if an attribute (including inherited ones) may
+refer to an object that can be part of a cycle. We assume that values
+of primitive types such as int, str, float and bool (and tuples of
+them) can't refer to other objects. A native instance attribute may
+refer to an instance of the declared class or of any of its subclasses,
+so it's acyclic only if all of these classes are acyclic and can't
+refer back to the class. Classes with a __dict__ and subclasses of
+built-in classes always need GC support. (Instances of subclasses of
+int and str with a __dict__ are a loophole, but compiled code doesn't
+distinguish these from int and str objects anyway.)
+"""
+
+from typing import Dict, List, Set
+
+from mypyc.ops import (
+    ClassIR, RType, RInstance, RTuple, RUnion, is_int_rprimitive, is_short_int_rprimitive,
+    is_float_rprimitive, is_bool_rprimitive, is_none_rprimitive, is_str_rprimitive,
+    is_fixed_width_rtype
+)
+
+
+def analyze_acyclic_classes(classes: List[ClassIR]) -> None:
+    """Set ClassIR.needs_gc for each class."""
+    # Native classes that an instance of each class may directly refer to
+    refs = {}  # type: Dict[ClassIR, Set[ClassIR]]
+    for cl in classes:
+        targets = set()  # type: Set[ClassIR]
+        if cl.has_dict or cl.builtin_base or not all(
+                collect_instance_refs(rtype, targets)
+                for base in cl.base_mro
+                for rtype in base.attributes.values()):
+            cl.needs_gc = True
+        else:
+            cl.needs_gc = False
+            refs[cl] = targets
+
+    # A class also needs GC support if it can reach a class that needs it
+    # or a class that can refer to itself (possibly indirectly)
+    reachable = {cl: reachable_classes(cl, refs) for cl in refs}
+    on_cycle = {cl for cl in refs if cl in reachable[cl]}
+    for cl in refs:
+        if cl in on_cycle or any(target.needs_gc or target in on_cycle
+                                 for target in reachable[cl]):
+            cl.needs_gc = True
+
+
+def collect_instance_refs(rtype: RType, targets: Set[ClassIR]) -> bool:
+    """Add the classes a value of a type may be an instance of to targets.
+
+    Return False if the value may be part of a cycle by itself.
+    """
+    if isinstance(rtype, RInstance):
+        targets.add(rtype.class_ir)
+        targets.update(rtype.class_ir.subclasses())
+        return True
+    elif isinstance(rtype, RTuple):
+        return all(collect_instance_refs(item, targets) for item in rtype.types)
+    elif isinstance(rtype, RUnion):
+        return all(collect_instance_refs(item, targets) for item in rtype.items)
+    return (is_int_rprimitive(rtype)
+            or is_short_int_rprimitive(rtype)
+            or is_float_rprimitive(rtype)
+            or is_bool_rprimitive(rtype)
+            or is_none_rprimitive(rtype)
+            or is_str_rprimitive(rtype)
+            or is_fixed_width_rtype(rtype))
+
+
+def reachable_classes(cl: ClassIR, refs: Dict[ClassIR, Set[ClassIR]]) -> Set[ClassIR]:
+    """Return the classes reachable from instances of a class through attributes.
+
+    Classes missing from refs (classes that need GC support) are included
+    but not followed.
+    """
+    result = set()  # type: Set[ClassIR]
+    worklist = list(refs[cl])
+    while worklist:
+        target = worklist.pop()
+        if target not in result:
+            result.add(target)
+            worklist.extend(refs.get(target, ()))
+    return result
@@ -7,9 +7,9 @@ from typing import Dict, Tuple, List, Set, TypeVar, Iterator, Generic, Optional,
 from mypyc.ops import (
     Value, Register,
     ControlOp,
-    BasicBlock, OpVisitor, Assign, LoadInt, LoadErrorValue, RegisterOp, Goto, Branch, Return, Call,
-    Environment, Box, Unbox, Cast, Op, Unreachable, TupleGet, TupleSet, GetAttr, SetAttr,
-    LoadStatic, InitStatic, PrimitiveOp, MethodCall, RaiseStandardError,
+    BasicBlock, OpVisitor, Assign, LoadInt, LoadFloat, LoadErrorValue, RegisterOp, Goto, Branch,
+    Return, Call, Environment, Box, Unbox, Cast, Op, Unreachable, TupleGet, TupleSet, GetAttr,
+    SetAttr, LoadStatic, InitStatic, PrimitiveOp, MethodCall, RaiseStandardError,
 )
 
 
@@ -163,6 +163,9 @@ class BaseAnalysisVisitor(OpVisitor[GenAndKill]):
     def visit_load_int(self, op: LoadInt) -> GenAndKill:
         return self.visit_register_op(op)
 
+    def visit_load_float(self, op: LoadFloat) -> GenAndKill:
+        return self.visit_register_op(op)
+
     def visit_load_error_value(self, op: LoadErrorValue) -> GenAndKill:
         return self.visit_register_op(op)
 
@@ -373,6 +376,57 @@ def analyze_live_regs(blocks: List[BasicBlock],
                         kind=MAYBE_ANALYSIS)
 
 
+class AvailableCopiesVisitor(BaseAnalysisVisitor):
+    """Visitor for finding assignments 'reg = value' that are still in effect.
+
+    An assignment is killed by another assignment to the register and by
+    redefining the source value (an op gets a new value each time it is
+    executed).
+    """
+
+    def __init__(self, copies: Iterable[Assign]) -> None:
+        self.by_dest = {}  # type: Dict[Value, Set[Value]]
+        self.by_src = {}  # type: Dict[Value, Set[Value]]
+        for copy in copies:
+            self.by_dest.setdefault(copy.dest, set()).add(copy)
+            self.by_src.setdefault(copy.src, set()).add(copy)
+
+    def visit_branch(self, op: Branch) -> GenAndKill:
+        return set(), set()
+
+    def visit_return(self, op: Return) -> GenAndKill:
+        return set(), set()
+
+    def visit_unreachable(self, op: Unreachable) -> GenAndKill:
+        return set(), set()
+
+    def visit_register_op(self, op: RegisterOp) -> GenAndKill:
+        return set(), self.by_src.get(op, set())
+
+    def visit_assign(self, op: Assign) -> GenAndKill:
+        kill = (self.by_dest.get(op.dest, set()) | self.by_src.get(op.dest, set())) - {op}
+        if op.src is not op.dest:
+            return {op}, kill
+        return set(), kill
+
+
+def analyze_available_copies(blocks: List[BasicBlock],
+                             cfg: CFG) -> AnalysisResult[Value]:
+    """Calculate the assignments to registers that are in effect at each location.
+
+    If an assignment 'reg = value' is available at a location, reg is
+    guaranteed to hold the current value of value there.
+    """
+    copies = [op for block in blocks for op in block.ops if isinstance(op, Assign)]
+    return run_analysis(blocks=blocks,
+                        cfg=cfg,
+                        gen_and_kill=AvailableCopiesVisitor(copies),
+                        initial=set(),
+                        backward=False,
+                        kind=MUST_ANALYSIS,
+                        universe=set(copies))
+
+
 # Analysis kinds
 MUST_ANALYSIS = 0
 MAYBE_ANALYSIS = 1
@@ -0,0 +1,94 @@
+"""Infer which native attributes are always defined.
+
+Reading a native attribute normally checks whether the attribute has
+been assigned and raises AttributeError otherwise. An attribute that is
+given a default value in the class body is assigned when the object is
+allocated, before any other code can observe it, so it's always defined.
+This must also hold for every subclass, since an object with a static
+type may be an instance of a subclass.
+
+Always defined attributes can't be deleted from Python code. An
+attribute deleted using 'del' in compiled code is not always defined in
+the static type of the object it's deleted from, or in any subclass of
+that type.
+
+The cyclic GC may still clear an attribute that refers to an object
+(using tp_clear) if the instance is part of a reference cycle, so reads
+of such attributes must still check them. Reads of other always defined
+attributes can't fail (see GetAttr).
+
+The analysis runs before genops generates any code, since it
+determines the error kinds of attribute reads.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from mypy.nodes import MypyFile, Expression, DelStmt, MemberExpr, TupleExpr, ListExpr, TypeInfo
+from mypy.traverser import TraverserVisitor
+from mypy.types import Type, Instance, UnionType
+
+from mypyc.ops import ClassIR
+
+
+def analyze_always_defined_attrs(defaults: Dict[ClassIR, Set[str]],
+                                 deleted: Set[Tuple[ClassIR, str]]) -> None:
+    """Set ClassIR.always_defined for each class.
+
+    Here defaults maps each class to the names of the attributes that get
+    default values from the class body (including those of base classes), and
+    deleted contains the attributes that are deleted using 'del' together with
+    the class of the object they are deleted from.
+    """
+    defined = {}  # type: Dict[ClassIR, Set[str]]
+    for cl, names in defaults.items():
+        if cl.is_trait or cl.builtin_base:
+            continue
+        defined[cl] = {name for name in names
+                       if any(name in base.attributes for base in cl.base_mro)
+                       and cl.get_method(name) is None
+                       and not any((base, name) in deleted for base in cl.mro)}
+
+    for cl in defined:
+        always = set(defined[cl])
+        for sub in cl.subclasses():
+            always &= defined.get(sub, set())
+        cl.always_defined = always
+
+
+def find_deleted_attrs(modules: List[MypyFile],
+                       types: Dict[Expression, Type],
+                       type_to_ir: Dict[TypeInfo, ClassIR]) -> Set[Tuple[ClassIR, str]]:
+    """Find the native attributes that are deleted using 'del'.
+
+    Return (class, attribute) pairs, where the class is the static type of the
+    object that the attribute is deleted from.
+    """
+    finder = DeletedAttrFinder(types, type_to_ir)
+    for module in modules:
+        module.accept(finder)
+    return finder.deleted
+
+
+class DeletedAttrFinder(TraverserVisitor):
+    def __init__(self,
+                 types: Dict[Expression, Type],
+                 type_to_ir: Dict[TypeInfo, ClassIR]) -> None:
+        super().__init__()
+        self.types = types
+        self.type_to_ir = type_to_ir
+        self.deleted = set()  # type: Set[Tuple[ClassIR, str]]
+
+    def visit_del_stmt(self, o: DelStmt) -> None:
+        self.add_target(o.expr)
+        super().visit_del_stmt(o)
+
+    def add_target(self, expr: Expression) -> None:
+        if isinstance(expr, (TupleExpr, ListExpr)):
+            for item in expr.items:
+                self.add_target(item)
+        elif isinstance(expr, MemberExpr) and expr.expr in self.types:
+            typ = self.types[expr.expr]
+            items = typ.items if isinstance(typ, UnionType) else [typ]
+            for item in items:
+                if isinstance(item, Instance) and item.type in self.type_to_ir:
+                    self.deleted.add((self.type_to_ir[item.type], expr.name))
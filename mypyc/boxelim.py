@@ -0,0 +1,166 @@
+"""Transform that removes redundant boxing, unboxing and casts.
+
+Genops inserts coercions locally without knowing where a value came
+from, so it often generates chains such as these:
+
+    r1 = box(int, r0)
+    x = r1
+    ...
+    r2 = unbox(int, x)     # Can use r0 directly
+
+    r3 = cast(A, y)
+    z = r3
+    ...
+    r4 = cast(A, z)        # Can use r3 directly
+
+We track which registers hold the current value of which other values
+(available copies) to find the value that a coercion was applied to.
+If it already has a compatible runtime type, uses of the coercion are
+replaced with the original value. This avoids allocating boxed
+objects and performing runtime type checks (which also get an error
+check each), so it must run before exception insertion.
+
+To keep this simple, a coercion is only replaced if all of its uses
+are later in the same basic block.
+"""
+
+from typing import List, Dict, Set, Tuple, Optional
+
+from mypyc.analysis import get_cfg, analyze_available_copies
+from mypyc.ops import (
+    FuncIR, BasicBlock, Op, Value, Register, Assign, Box, Unbox, Cast, RType
+)
+from mypyc.subtype import is_subtype
+from mypyc.rt_subtype import is_runtime_subtype
+
+
+def eliminate_redundant_coercions(ir: FuncIR) -> None:
+    cfg = get_cfg(ir.blocks)
+    copies = analyze_available_copies(ir.blocks, cfg)
+
+    # Data-flow facts are imprecise in error handlers, since an error
+    # may happen in the middle of a block, so don't use facts in
+    # anything reachable from a handler.
+    unsafe = set()  # type: Set[BasicBlock]
+    worklist = [block.error_handler for block in ir.blocks if block.error_handler]
+    while worklist:
+        block = worklist.pop()
+        if block not in unsafe:
+            unsafe.add(block)
+            worklist.extend(cfg.succ[block])
+
+    positions = {}  # type: Dict[Op, Tuple[BasicBlock, int]]
+    uses = {}  # type: Dict[Value, List[Tuple[BasicBlock, int]]]
+    assigned = set()  # type: Set[Value]
+    for block in ir.blocks:
+        for i, op in enumerate(block.ops):
+            positions[op] = (block, i)
+            for src in op.sources():
+                uses.setdefault(src, []).append((block, i))
+            if isinstance(op, Assign):
+                assigned.add(op.dest)
+
+    def copy_source(reg: Value, block: BasicBlock, i: int) -> Optional[Value]:
+        """Return the value that reg was copied from, if it's still in effect at block.ops[i]."""
+        if block in unsafe:
+            return None
+        for copy in copies.before[block, i]:
+            assert isinstance(copy, Assign)
+            if copy.dest is reg:
+                return copy.src
+        return None
+
+    def unchanged(value: Value, block: BasicBlock, start: int, end: int) -> bool:
+        """Is value not redefined in block.ops[start:end]?"""
+        for op in block.ops[start:end]:
+            if op is value or isinstance(op, Assign) and op.dest is value:
+                return False
+        return True
+
+    def inner_source(inner: Op, block: BasicBlock, i: int, end: int) -> Optional[Value]:
+        """Return the source of inner if it still has the same value at block.ops[i:end + 1].
+
+        Here inner is a box or unbox op whose current value is used by block.ops[i].
+        """
+        src = inner.sources()[0]
+        inner_block, inner_index = positions[inner]
+        if isinstance(src, Register) and src not in assigned:
+            return src
+        if inner_block is block and inner_index < i:
+            if unchanged(src, block, inner_index + 1, end + 1):
+                return src
+        elif (block not in unsafe and isinstance(src, Op) and src in positions
+                and positions[src][0] is inner_block and positions[src][1] < inner_index):
+            # An op computed before inner in the same block always gets
+            # recomputed together with it.
+            if unchanged(src, block, i + 1, end + 1):
+                return src
+        return None
+
+    replacements = {}  # type: Dict[Value, Value]
+    for block in ir.blocks:
+        for i, op in enumerate(block.ops):
+            if not isinstance(op, (Box, Unbox, Cast)) or op not in uses:
+                continue
+            if any(use_block is not block for use_block, _ in uses[op]):
+                continue
+            last_use = max(j for _, j in uses[op])
+
+            src = op.sources()[0]
+            if src in replacements:
+                continue
+            origin = src  # type: Value
+            if isinstance(src, Register):
+                origin = copy_source(src, block, i) or src
+                if origin in replacements:
+                    continue
+
+            new = None  # type: Optional[Value]
+            if isinstance(op, Cast):
+                # Cast of a value that is already known to have the target type
+                for value in (src, origin):
+                    if (is_compatible(value.type, op.type)
+                            and unchanged(value, block, i + 1, last_use + 1)):
+                        new = value
+                        break
+            elif isinstance(op, Unbox) and isinstance(origin, Box):
+                # Unbox of a boxed value of the right type
+                if is_runtime_subtype(origin.src.type, op.type):
+                    new = inner_source(origin, block, i, last_use)
+            elif isinstance(op, Box) and isinstance(origin, Unbox):
+                # Box of an unboxed value that came from an object
+                if is_compatible(origin.src.type, op.type):
+                    new = inner_source(origin, block, i, last_use)
+            if new is not None and new not in replacements:
+                replacements[op] = new
+
+    if not replacements:
+        return
+
+    for block in ir.blocks:
+        for op in block.ops:
+            srcs = op.sources()
+            if any(src in replacements for src in srcs):
+                op.set_sources([replacements.get(src, src) for src in srcs])
+
+    # Remove the replaced ops, and boxes that are no longer used.
+    used = set()  # type: Set[Value]
+    for block in ir.blocks:
+        for op in block.ops:
+            if op not in replacements:
+                used.update(op.sources())
+    for block in ir.blocks:
+        new_ops = []  # type: List[Op]
+        for op in block.ops:
+            if op in replacements or (isinstance(op, Box) and op not in used):
+                del ir.env.indexes[op]
+            else:
+                new_ops.append(op)
+        block.ops = new_ops
+
+
+def is_compatible(left: RType, right: RType) -> bool:
+    """Can a value of type left be used as a value of type right without a coercion?"""
+    if left.is_unboxed or right.is_unboxed:
+        return is_runtime_subtype(left, right)
+    return is_subtype(left, right)
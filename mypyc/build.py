@@ -329,7 +329,14 @@ def mypycify(paths: List[str],
              multi_file: bool = False,
              skip_cgen: bool = False,
              verbose: bool = False,
-             strip_asserts: bool = False) -> List[MypycifyExtension]:
+             strip_asserts: bool = False,
+             passes: Optional[List[str]] = None,
+             disabled_passes: Optional[List[str]] = None,
+             time_passes: bool = False,
+             verify_ir: bool = False,
+             compact_layout: bool = False,
+             freelist_size: int = 0,
+             transparent_decorators: Optional[List[str]] = None) -> List[MypycifyExtension]:
     """Main entry point to building using mypyc.
 
     This produces a list of Extension objects that should be passed as the
@@ -340,11 +347,32 @@ def mypycify(paths: List[str],
       * mypy_options: Optionally, a list of command line flags to pass to mypy.
                       (This can also contain additional files, for compatibility reasons.)
       * opt_level: The optimization level, as a string. Defaults to '3' (meaning '-O3').
+      * passes: Optionally, the names of the IR passes to run, in order.
+                Defaults to the pipeline in mypyc.passes.default_pipeline.
+      * disabled_passes: Optionally, names of IR passes to leave out of the pipeline.
+      * time_passes: Report the time spent in each IR pass.
+      * verify_ir: Check that the IR is well-formed after each IR pass.
+      * compact_layout: Reorder the attributes of native instances to reduce padding
+                        and pack bool attributes into bitfields. With verbose, report
+                        the size of each instance.
+      * freelist_size: Keep the memory of up to this many deleted instances of each
+                       native class for reuse. The mypyc_extensions.freelist class
+                       decorator sets the size for a single class.
+      * transparent_decorators: Optionally, full names of decorators that return a function
+                                that behaves like the decorated function. Compiled code calls
+                                functions that only have such decorators natively. The
+                                mypyc_extensions.transparent_decorator marker does the same
+                                for a single decorator.
     """
 
     setup_mypycify_vars()
     compiler_options = CompilerOptions(strip_asserts=strip_asserts,
-                                       multi_file=multi_file, verbose=verbose)
+                                       multi_file=multi_file, verbose=verbose,
+                                       passes=passes, disabled_passes=disabled_passes,
+                                       time_passes=time_passes, verify_ir=verify_ir,
+                                       compact_layout=compact_layout,
+                                       freelist_size=freelist_size,
+                                       transparent_decorators=transparent_decorators)
 
     # Create a compiler object so we can make decisions based on what
     # compiler is being used. typeshed is missing some attribues on the
@@ -1,4 +1,5 @@
 PREFIX = 'CPyPy_'  # Python wrappers
+VARARGS_PREFIX = 'CPyPyVA_'  # Python wrappers that take a tuple and a dict of arguments
 NATIVE_PREFIX = 'CPyDef_'  # Native functions etc.
 DUNDER_PREFIX = 'CPyDunder_'  # Wrappers for exposing dunder methods to the API
 REG_PREFIX = 'cpy_r_'  # Registers
@@ -1,7 +1,7 @@
 """Utilities for emitting C code."""
 
 from collections import OrderedDict
-from typing import List, Set, Dict, Optional, List, Callable, Union
+from typing import List, Set, Dict, Optional, List, Callable, Union, Tuple
 
 from mypyc.common import (
     REG_PREFIX, ATTR_PREFIX, STATIC_PREFIX, TYPE_PREFIX, NATIVE_PREFIX,
@@ -10,10 +10,11 @@ from mypyc.common import (
 from mypyc.ops import (
     Any, AssignmentTarget, Environment, BasicBlock, Value, Register, RType, RTuple, RInstance,
     RUnion, RPrimitive, is_int_rprimitive, is_short_int_rprimitive,
-    is_float_rprimitive, is_bool_rprimitive,
+    is_float_rprimitive, is_bool_rprimitive, is_int64_rprimitive, is_fixed_width_rtype,
     short_name, is_list_rprimitive, is_dict_rprimitive, is_set_rprimitive, is_tuple_rprimitive,
     is_none_rprimitive, is_object_rprimitive, object_rprimitive, is_str_rprimitive, ClassIR,
-    FuncIR, FuncDecl, int_rprimitive, is_optional_type, optional_value_type, all_concrete_classes
+    FuncIR, FuncDecl, int_rprimitive, is_optional_type, optional_value_type, all_concrete_classes,
+    is_array_rprimitive, array_types
 )
 from mypyc.namegen import NameGenerator
 from mypyc.sametype import is_same_type
@@ -48,6 +49,11 @@ class EmitterContext:
         # The declaration contains the body of the struct.
         self.declarations = OrderedDict()  # type: Dict[str, HeaderDeclaration]
 
+        # Initializations of globals declared above whose values aren't
+        # constant expressions, as (symbol, value) pairs. They are done
+        # at runtime in CPyGlobalsInit().
+        self.runtime_inits = []  # type: List[Tuple[str, str]]
+
 
 class Emitter:
     """Helper for C code generation."""
@@ -150,9 +156,34 @@ class Emitter:
             return self.tuple_undefined_value(rtype)
         assert False, rtype
 
+    def c_fixed_width_literal(self, value: int) -> str:
+        """Return a C literal for a fixed-width integer value.
+
+        The minimum 64-bit value can't be written as a negated decimal literal,
+        since the literal without the sign is out of range.
+        """
+        if value == -2 ** 63:
+            return '(-9223372036854775807LL - 1)'
+        return str(value)
+
     def c_error_value(self, rtype: RType) -> str:
         return self.c_undefined_value(rtype)
 
+    def error_value_check(self, value: str, rtype: RType, compare: str) -> str:
+        """Return a C condition that checks whether value is (or isn't) the error value.
+
+        Here compare is either '==' or '!='. Float error values are NaNs, which
+        can't be compared using '=='. The fixed-width integer error value is
+        also a valid value, so it only indicates an error if an exception is set.
+        """
+        if is_float_rprimitive(rtype):
+            check = 'CPyFloat_IsError({})'.format(value)
+            return check if compare == '==' else '!' + check
+        if is_fixed_width_rtype(rtype):
+            check = 'CPyLLInt_IsError({})'.format(value)
+            return check if compare == '==' else '!' + check
+        return '{} {} {}'.format(value, compare, self.c_error_value(rtype))
+
     def native_function_name(self, fn: FuncDecl) -> str:
         return '{}{}'.format(NATIVE_PREFIX, fn.cname(self.names))
 
@@ -200,6 +231,8 @@ class Emitter:
         if isinstance(item_type, RTuple):
             return self.tuple_undefined_check_cond(
                 item_type, tuple_expr_in_c + '.f0', c_type_compare_val, compare)
+        elif is_float_rprimitive(item_type) or is_fixed_width_rtype(item_type):
+            return self.error_value_check(tuple_expr_in_c + '.f0', item_type, compare)
         else:
             return '{}.f0 {} {}'.format(
                 tuple_expr_in_c, compare, c_type_compare_val(item_type))
@@ -210,13 +243,27 @@ class Emitter:
         name = 'tuple_undefined_' + id
         if name not in context.declarations:
             struct_name = self.tuple_struct_name(rtuple)
-            values = self.tuple_undefined_value_helper(rtuple)
+            values = ''.join(self.tuple_undefined_value_helper(rtuple))
             var = 'struct {} {}'.format(struct_name, name)
             decl = '{};'.format(var)
-            init = '{} = {{ {} }};'.format(var, ''.join(values))
+            if self.is_constant_undefined_value(rtuple):
+                init = '{} = {{ {} }};'.format(var, values)
+            else:
+                init = decl
+                context.runtime_inits.append(
+                    (name, '(struct {}){{ {} }}'.format(struct_name, values)))
             context.declarations[name] = HeaderDeclaration(set([struct_name]), [decl], [init])
         return name
 
+    def is_constant_undefined_value(self, rtype: RType) -> bool:
+        """Can the undefined value of rtype be used in a static initializer?
+
+        The float error value is not a constant expression (see mypyc_util.h).
+        """
+        if isinstance(rtype, RTuple):
+            return all(self.is_constant_undefined_value(item) for item in rtype.types)
+        return not is_float_rprimitive(rtype)
+
     def tuple_undefined_value_helper(self, rtuple: RTuple) -> List[str]:
         res = []
         # see tuple_c_declaration()
@@ -366,6 +413,19 @@ class Emitter:
                 err,
                 '{} = NULL;'.format(dest),
                 '}')
+        elif is_array_rprimitive(typ):
+            if declare_dest:
+                self.emit_line('PyObject *{};'.format(dest))
+            check = "(CPyArray_Check({}, '%s'))" % array_types[typ.name][0]
+            if likely:
+                check = '(likely{})'.format(check)
+            self.emit_arg_check(src, dest, typ, check.format(src), optional)
+            self.emit_lines(
+                '    {} = {};'.format(dest, src),
+                'else {',
+                err,
+                '{} = NULL;'.format(dest),
+                '}')
         elif is_tuple_rprimitive(typ):
             if declare_dest:
                 self.emit_line('{} {};'.format(self.ctype(typ), dest))
@@ -543,6 +603,31 @@ class Emitter:
             self.emit_line('else {')
             self.emit_lines(*failure)
             self.emit_line('}')
+        elif is_float_rprimitive(typ):
+            # Ints are accepted as well, like everywhere else where a float is expected.
+            if declare_dest:
+                self.emit_line('double {};'.format(dest))
+            self.emit_arg_check(src, dest, typ, '(likely(CPyFloat_Check({}))) {{'.format(src),
+                                optional)
+            self.emit_line('{} = CPyFloat_FromObject({});'.format(dest, src))
+            self.emit_line('} else {')
+            self.emit_lines(*failure)
+            self.emit_line('}')
+        elif is_fixed_width_rtype(typ):
+            # The conversion raises OverflowError if the value doesn't fit.
+            if declare_dest:
+                self.emit_line('{} {};'.format(self.ctype(typ), dest))
+            self.emit_arg_check(src, dest, typ, '(likely(PyLong_Check({}))) {{'.format(src),
+                                optional)
+            func = 'CPyLong_AsInt64' if is_int64_rprimitive(typ) else 'CPyLong_AsInt32'
+            self.emit_line('{} = {}({});'.format(dest, func, src))
+            if custom_failure is not None:
+                self.emit_line('if (unlikely(CPyLLInt_IsError({}))) {{'.format(dest))
+                self.emit_line(custom_failure)
+                self.emit_line('}')
+            self.emit_line('} else {')
+            self.emit_lines(*failure)
+            self.emit_line('}')
         elif is_bool_rprimitive(typ):
             # Whether we are borrowing or not makes no difference.
             if declare_dest:
@@ -629,6 +714,10 @@ class Emitter:
             self.emit_lines('{}{} = {} ? Py_True : Py_False;'.format(declaration, dest, src))
             if not can_borrow:
                 self.emit_inc_ref(dest, object_rprimitive)
+        elif is_float_rprimitive(typ):
+            self.emit_line('{}{} = PyFloat_FromDouble({});'.format(declaration, dest, src))
+        elif is_fixed_width_rtype(typ):
+            self.emit_line('{}{} = PyLong_FromLongLong({});'.format(declaration, dest, src))
         elif is_none_rprimitive(typ):
             # N.B: None is special cased to produce a borrowed value
             # after boxing, so we don't need to increment the refcount
@@ -658,7 +747,7 @@ class Emitter:
     def emit_error_check(self, value: str, rtype: RType, failure: str) -> None:
         """Emit code for checking a native function return value for uncaught exception."""
         if not isinstance(rtype, RTuple):
-            self.emit_line('if ({} == {}) {{'.format(value, self.c_error_value(rtype)))
+            self.emit_line('if ({}) {{'.format(self.error_value_check(value, rtype, '==')))
         else:
             if len(rtype.types) == 0:
                 return  # empty tuples can't fail.
@@ -1,23 +1,30 @@
 """Code generation for native classes and related wrappers."""
 
+import math
 import textwrap
 
 from typing import Optional, List, Tuple, Dict, Callable, Mapping
 from collections import OrderedDict
 
-from mypyc.common import PREFIX, NATIVE_PREFIX, REG_PREFIX, DUNDER_PREFIX
+from mypy.nodes import reverse_op_methods
+
+from mypyc.common import PREFIX, NATIVE_PREFIX, REG_PREFIX, DUNDER_PREFIX, VARARGS_PREFIX
 from mypyc.emit import Emitter
 from mypyc.emitfunc import native_function_header, native_getter_name, native_setter_name
 from mypyc.emitwrapper import (
     generate_dunder_wrapper, generate_hash_wrapper, generate_richcompare_wrapper,
-    generate_bool_wrapper, generate_get_wrapper
+    generate_bool_wrapper, generate_get_wrapper, generate_len_wrapper, generate_sq_item_wrapper,
+    generate_contains_wrapper, generate_set_del_item_wrapper, generate_bin_op_wrapper,
+    generate_inplace_op_wrapper, method_table_entry
 )
 from mypyc.ops import (
     ClassIR, FuncIR, FuncDecl, RType, RTuple, Environment, object_rprimitive, FuncSignature,
+    is_fixed_width_rtype,
     VTableMethod, VTableAttr, VTableEntries,
-    FUNC_STATICMETHOD, FUNC_CLASSMETHOD,
+    FUNC_STATICMETHOD, FUNC_CLASSMETHOD, ConstantDefault,
 )
 from mypyc.sametype import is_same_type
+from mypyc.layout import struct_layout, is_bitfield, field_bits
 from mypyc.namegen import NameGenerator
 
 
@@ -26,7 +33,7 @@ def native_slot(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
 
 
 def wrapper_slot(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
-    return '{}{}'.format(PREFIX, fn.cname(emitter.names))
+    return '{}{}'.format(VARARGS_PREFIX, fn.cname(emitter.names))
 
 
 # We maintain a table from dunder function names to struct slots they
@@ -49,14 +56,62 @@ SLOT_DEFS = {
 
 AS_MAPPING_SLOT_DEFS = {
     '__getitem__': ('mp_subscript', generate_dunder_wrapper),
+    '__setitem__': ('mp_ass_subscript', generate_set_del_item_wrapper),
+    '__delitem__': ('mp_ass_subscript', generate_set_del_item_wrapper),
+    '__len__': ('mp_length', generate_len_wrapper),
+}  # type: SlotTable
+
+# The sequence slots for __getitem__ and __len__ reuse the wrappers generated
+# for the mapping slots.
+AS_SEQUENCE_SLOT_DEFS = {
+    '__getitem__': ('sq_item', generate_sq_item_wrapper),
+    '__len__': ('sq_length', lambda c, t, e: '{}{}{}'.format(
+        DUNDER_PREFIX, t.name, c.name_prefix(e.names))),
+    '__contains__': ('sq_contains', generate_contains_wrapper),
 }  # type: SlotTable
 
 AS_NUMBER_SLOT_DEFS = {
     '__bool__': ('nb_bool', generate_bool_wrapper),
-}  # type: SlotTable
+    '__neg__': ('nb_negative', generate_dunder_wrapper),
+    '__pos__': ('nb_positive', generate_dunder_wrapper),
+    '__abs__': ('nb_absolute', generate_dunder_wrapper),
+    '__invert__': ('nb_invert', generate_dunder_wrapper),
+    '__int__': ('nb_int', generate_dunder_wrapper),
+    '__float__': ('nb_float', generate_dunder_wrapper),
+    '__index__': ('nb_index', generate_dunder_wrapper),
+}  # type: Dict[str, Tuple[str, SlotGenerator]]
+
+# Binary operator methods and their number slots. The slots are shared with
+# the reverse methods (such as __radd__), and all but nb_divmod have an
+# in-place variant (such as nb_inplace_add for __iadd__).
+BINARY_OP_SLOTS = [
+    ('__add__', 'nb_add'),
+    ('__sub__', 'nb_subtract'),
+    ('__mul__', 'nb_multiply'),
+    ('__matmul__', 'nb_matrix_multiply'),
+    ('__truediv__', 'nb_true_divide'),
+    ('__floordiv__', 'nb_floor_divide'),
+    ('__mod__', 'nb_remainder'),
+    ('__divmod__', 'nb_divmod'),
+    ('__pow__', 'nb_power'),
+    ('__lshift__', 'nb_lshift'),
+    ('__rshift__', 'nb_rshift'),
+    ('__and__', 'nb_and'),
+    ('__or__', 'nb_or'),
+    ('__xor__', 'nb_xor'),
+]
+
+for _method, _slot in BINARY_OP_SLOTS:
+    AS_NUMBER_SLOT_DEFS[_method] = (_slot, generate_bin_op_wrapper)
+    AS_NUMBER_SLOT_DEFS[reverse_op_methods[_method]] = (_slot, generate_bin_op_wrapper)
+    if _method != '__divmod__':
+        AS_NUMBER_SLOT_DEFS['__i' + _method[2:]] = (
+            'nb_inplace_' + _slot[3:], generate_inplace_op_wrapper)
 
+# as_sequence must come after as_mapping (see AS_SEQUENCE_SLOT_DEFS)
 SIDE_TABLES = [
     ('as_mapping', 'PyMappingMethods', AS_MAPPING_SLOT_DEFS),
+    ('as_sequence', 'PySequenceMethods', AS_SEQUENCE_SLOT_DEFS),
     ('as_number', 'PyNumberMethods', AS_NUMBER_SLOT_DEFS),
 ]
 
@@ -65,17 +120,19 @@ def generate_slots(cl: ClassIR, table: SlotTable, emitter: Emitter) -> Dict[str,
     fields = OrderedDict()  # type: Dict[str, str]
     for name, (slot, generator) in table.items():
         method = cl.get_method(name)
-        if method:
+        # Several methods can share a slot, in which case the generator handles all of them
+        if method and slot not in fields:
             fields[slot] = generator(cl, method, emitter)
 
     return fields
 
 
-def generate_class_type_decl(cl: ClassIR, c_emitter: Emitter, emitter: Emitter) -> None:
+def generate_class_type_decl(cl: ClassIR, c_emitter: Emitter, emitter: Emitter,
+                             compact_layout: bool = False) -> None:
     c_emitter.emit_line('PyTypeObject *{};'.format(emitter.type_struct_name(cl)))
     emitter.emit_line('extern PyTypeObject *{};'.format(emitter.type_struct_name(cl)))
     emitter.emit_line()
-    generate_object_struct(cl, emitter)
+    generate_object_struct(cl, emitter, compact_layout)
     emitter.emit_line()
     declare_native_getters_and_setters(cl, emitter)
     generate_full = not cl.is_trait and not cl.builtin_base
@@ -93,6 +150,7 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
 
     setup_name = '{}_setup'.format(name_prefix)
     new_name = '{}_new'.format(name_prefix)
+    vectorcall_name = '{}_vectorcall'.format(name_prefix)
     members_name = '{}_members'.format(name_prefix)
     getseters_name = '{}_getseters'.format(name_prefix)
     vtable_name = '{}_vtable'.format(name_prefix)
@@ -101,6 +159,8 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
     dealloc_name = '{}_dealloc'.format(name_prefix)
     methods_name = '{}_methods'.format(name_prefix)
     vtable_setup_name = '{}_trait_vtable_setup'.format(name_prefix)
+    freelist_name = '{}_freelist'.format(name_prefix)
+    instance_template_name = '{}_instance_template'.format(name_prefix)
 
     fields = OrderedDict()  # type: Dict[str, str]
     fields['tp_name'] = '"{}"'.format(name)
@@ -111,8 +171,9 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
     if generate_full:
         fields['tp_new'] = new_name
         fields['tp_dealloc'] = '(destructor){}_dealloc'.format(name_prefix)
-        fields['tp_traverse'] = '(traverseproc){}_traverse'.format(name_prefix)
-        fields['tp_clear'] = '(inquiry){}_clear'.format(name_prefix)
+        if cl.needs_gc:
+            fields['tp_traverse'] = '(traverseproc){}_traverse'.format(name_prefix)
+            fields['tp_clear'] = '(inquiry){}_clear'.format(name_prefix)
     if needs_getseters:
         fields['tp_getset'] = getseters_name
     fields['tp_methods'] = methods_name
@@ -123,8 +184,9 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
     emit_line()
 
     # If the class has a method to initialize default attribute
-    # values, we need to call it during initialization.
-    defaults_fn = cl.get_method('__mypyc_defaults_setup')
+    # values, we need to call it during initialization. (It also
+    # assigns the defaults from base classes, so don't inherit it.)
+    defaults_fn = cl.methods.get('__mypyc_defaults_setup')
 
     # If there is a __init__ method, we'll use it in the native constructor.
     init_fn = cl.get_method('__init__')
@@ -177,6 +239,11 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
         fields['tp_basicsize'] = base_size
 
     if generate_full:
+        if has_freelist(cl):
+            emitter.emit_lines(
+                'static {} *{}[{}];'.format(struct_name, freelist_name, cl.freelist_size),
+                'static int {}_len;'.format(freelist_name))
+        emitter.emit_line('static {} {};'.format(struct_name, instance_template_name))
         emitter.emit_line('static PyObject *{}(void);'.format(setup_name))
         assert cl.ctor is not None
         emitter.emit_line(native_function_header(cl.ctor, emitter) + ';')
@@ -184,11 +251,14 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
         emit_line()
         generate_new_for_class(cl, new_name, vtable_name, setup_name, emitter)
         emit_line()
-        generate_traverse_for_class(cl, traverse_name, emitter)
+        generate_vectorcall_for_class(cl, vectorcall_name, init_fn, setup_name, emitter)
         emit_line()
+        if cl.needs_gc:
+            generate_traverse_for_class(cl, traverse_name, emitter)
+            emit_line()
         generate_clear_for_class(cl, clear_name, emitter)
         emit_line()
-        generate_dealloc_for_class(cl, dealloc_name, clear_name, emitter)
+        generate_dealloc_for_class(cl, dealloc_name, clear_name, freelist_name, emitter)
         emit_line()
         generate_native_getters_and_setters(cl, emitter)
         vtable_name = generate_vtables(cl, vtable_name, emitter)
@@ -202,7 +272,7 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
     emit_line()
 
     flags = ['Py_TPFLAGS_DEFAULT', 'Py_TPFLAGS_HEAPTYPE', 'Py_TPFLAGS_BASETYPE']
-    if generate_full:
+    if generate_full and cl.needs_gc:
         flags.append('Py_TPFLAGS_HAVE_GC')
     fields['tp_flags'] = ' | '.join(flags)
 
@@ -210,14 +280,21 @@ def generate_class(cl: ClassIR, module: str, emitter: Emitter) -> None:
     emitter.emit_line("PyVarObject_HEAD_INIT(NULL, 0)")
     for field, value in fields.items():
         emitter.emit_line(".{} = {},".format(field, value))
+    if generate_full:
+        emitter.emit_lines(
+            "#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 9",
+            ".tp_vectorcall = {},".format(vectorcall_name),
+            "#endif")
     emitter.emit_line("};")
     emitter.emit_line("static PyTypeObject *{t}_template = &{t}_template_;".format(
         t=emitter.type_struct_name(cl)))
 
     emitter.emit_line()
-    generate_trait_vtable_setup(cl, vtable_setup_name, vtable_name, emitter)
+    generate_trait_vtable_setup(cl, vtable_setup_name, vtable_name,
+                                instance_template_name if generate_full else None, emitter)
     if generate_full:
-        generate_setup_for_class(cl, setup_name, defaults_fn, vtable_name, emitter)
+        generate_setup_for_class(cl, setup_name, defaults_fn, instance_template_name,
+                                 freelist_name, emitter)
         emitter.emit_line()
         generate_constructor_for_class(
             cl, cl.ctor, init_fn, setup_name, vtable_name, emitter)
@@ -234,14 +311,22 @@ def setter_name(cl: ClassIR, attribute: str, names: NameGenerator) -> str:
     return names.private_name(cl.module_name, '{}_set{}'.format(cl.name, attribute))
 
 
-def generate_object_struct(cl: ClassIR, emitter: Emitter) -> None:
+def generate_object_struct(cl: ClassIR, emitter: Emitter, compact: bool = False) -> None:
     emitter.emit_lines('typedef struct {',
                        'PyObject_HEAD',
                        'CPyVTableItem *vtable;')
-    for base in reversed(cl.base_mro):
-        if not base.is_trait:
-            for attr, rtype in base.attributes.items():
-                emitter.emit_line('{}{};'.format(emitter.ctype_spaced(rtype), emitter.attr(attr)))
+    for group in struct_layout(cl, compact):
+        for field in group:
+            if field.is_flag:
+                name = defined_flag(field.attr)
+                ctype = 'char '
+            else:
+                name = emitter.attr(field.attr)
+                ctype = emitter.ctype_spaced(field.rtype)
+            if compact and is_bitfield(field):
+                emitter.emit_line('unsigned char {} : {};'.format(name, field_bits(field)))
+            else:
+                emitter.emit_line('{}{};'.format(ctype, name))
     emitter.emit_line('}} {};'.format(cl.struct_name(emitter.names)))
 
 
@@ -267,13 +352,15 @@ def generate_native_getters_and_setters(cl: ClassIR,
                                                   native_getter_name(cl, attr, emitter.names),
                                                   cl.struct_name(emitter.names)))
         emitter.emit_line('{')
-        if rtype.is_refcounted:
-            emit_undefined_check(rtype, emitter, attr_field, '==')
-            emitter.emit_lines(
+        # Always defined attributes can only be undefined if tp_clear has cleared them
+        if not cl.is_always_defined(attr) or rtype.is_refcounted:
+            emit_undefined_check(rtype, emitter, attr, '==')
+            emitter.emit_line(
                 'PyErr_SetString(PyExc_AttributeError, "attribute {} of {} undefined");'.format(
-                    repr(attr), repr(cl.name)),
-                '} else {')
-            emitter.emit_inc_ref('self->{}'.format(attr_field), rtype)
+                    repr(attr), repr(cl.name)))
+            if rtype.is_refcounted:
+                emitter.emit_line('} else {')
+                emitter.emit_inc_ref('self->{}'.format(attr_field), rtype)
             emitter.emit_line('}')
         emitter.emit_line('return self->{};'.format(attr_field))
         emitter.emit_line('}')
@@ -285,12 +372,14 @@ def generate_native_getters_and_setters(cl: ClassIR,
                                                 emitter.ctype_spaced(rtype)))
         emitter.emit_line('{')
         if rtype.is_refcounted:
-            emit_undefined_check(rtype, emitter, attr_field, '!=')
+            emit_undefined_check(rtype, emitter, attr, '!=')
             emitter.emit_dec_ref('self->{}'.format(attr_field), rtype)
             emitter.emit_line('}')
         # This steal the reference to src, so we don't need to increment the arg
-        emitter.emit_lines('self->{} = value;'.format(attr_field),
-                           'return 1;',
+        emitter.emit_line('self->{} = value;'.format(attr_field))
+        if is_fixed_width_rtype(rtype):
+            emitter.emit_line('self->{} = 1;'.format(defined_flag(attr)))
+        emitter.emit_lines('return 1;',
                            '}')
         emitter.emit_line()
 
@@ -349,10 +438,12 @@ def generate_vtable(entries: VTableEntries,
 def generate_trait_vtable_setup(cl: ClassIR,
                                 vtable_setup_name: str,
                                 vtable_name: str,
+                                instance_template_name: Optional[str],
                                 emitter: Emitter) -> None:
     """Generate a native function that fixes up the trait vtables of a class.
 
-    This needs to be called before a class is used.
+    It also fills in the instance template, if the class has one. This
+    needs to be called before a class is used.
     """
     emitter.emit_line('static bool')
     emitter.emit_line('{}{}(void)'.format(NATIVE_PREFIX, vtable_setup_name))
@@ -360,32 +451,94 @@ def generate_trait_vtable_setup(cl: ClassIR,
     if cl.trait_vtables and not cl.is_trait:
         emitter.emit_lines('CPy_FixupTraitVtable({}_vtable, {});'.format(
             cl.name_prefix(emitter.names), len(cl.trait_vtables)))
+    if instance_template_name is not None:
+        generate_instance_template(cl, instance_template_name, vtable_name, emitter)
     emitter.emit_line('return 1;')
     emitter.emit_line('}')
 
 
+def generate_instance_template(cl: ClassIR,
+                               instance_template_name: str,
+                               vtable_name: str,
+                               emitter: Emitter) -> None:
+    """Fill in the object struct that is copied to each new instance of a class.
+
+    The template holds borrowed references to the constant default values.
+    """
+    emitter.emit_line('{}.vtable = {};'.format(instance_template_name, vtable_name))
+    for base in reversed(cl.base_mro):
+        for attr, rtype in base.attributes.items():
+            field = '{}.{}'.format(instance_template_name, emitter.attr(attr))
+            if attr in cl.constant_defaults:
+                value = c_constant_default(cl.constant_defaults[attr], rtype, emitter)
+                emitter.emit_line('{} = {};'.format(field, value))
+                if is_fixed_width_rtype(rtype):
+                    emitter.emit_line('{}.{} = 1;'.format(instance_template_name,
+                                                          defined_flag(attr)))
+            else:
+                emitter.emit_line('{} = {};'.format(field, emitter.c_undefined_value(rtype)))
+
+
+def c_constant_default(value: ConstantDefault, rtype: RType, emitter: Emitter) -> str:
+    """Return a C expression for a constant default attribute value."""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    elif isinstance(value, int):
+        if is_fixed_width_rtype(rtype):
+            return emitter.c_fixed_width_literal(value)
+        return str(value * 2)
+    elif isinstance(value, float):
+        if math.isinf(value):
+            return 'Py_HUGE_VAL' if value > 0 else '-Py_HUGE_VAL'
+        return repr(value)
+    elif isinstance(value, str):
+        return emitter.static_name(value, None)
+    elif rtype.is_unboxed:
+        return '1'
+    return 'Py_None'
+
+
 def generate_setup_for_class(cl: ClassIR,
                              func_name: str,
                              defaults_fn: Optional[FuncIR],
-                             vtable_name: str,
+                             instance_template_name: str,
+                             freelist_name: str,
                              emitter: Emitter) -> None:
     """Generate a native function that allocates an instance of a class."""
+    struct_name = cl.struct_name(emitter.names)
     emitter.emit_line('static PyObject *')
     emitter.emit_line('{}(void)'.format(func_name))
     emitter.emit_line('{')
-    emitter.emit_line('{} *self;'.format(cl.struct_name(emitter.names)))
+    emitter.emit_line('{} *self;'.format(struct_name))
+    if has_freelist(cl):
+        # Reuse a deleted instance. It was cleared (and untracked) when it was
+        # deallocated, and all fields are overwritten below.
+        emitter.emit_lines(
+            'if ({}_len > 0) {{'.format(freelist_name),
+            'self = {name}[--{name}_len];'.format(name=freelist_name),
+            '_Py_NewReference((PyObject *)self);')
+        if cl.needs_gc:
+            emitter.emit_line('PyObject_GC_Track(self);')
+        emitter.emit_line('} else {')
     emitter.emit_line('self = ({struct} *){type_struct}->tp_alloc({type_struct}, 0);'.format(
-        struct=cl.struct_name(emitter.names),
+        struct=struct_name,
         type_struct=emitter.type_struct_name(cl)))
     emitter.emit_line('if (self == NULL)')
     emitter.emit_line('    return NULL;')
-    emitter.emit_line('self->vtable = {};'.format(vtable_name))
-    for base in reversed(cl.base_mro):
-        for attr, rtype in base.attributes.items():
-            emitter.emit_line('self->{} = {};'.format(
-                emitter.attr(attr), emitter.c_undefined_value(rtype)))
+    if has_freelist(cl):
+        emitter.emit_line('}')
+    # Copy the vtable, undefined attribute values and constant default values
+    # from the template
+    emitter.emit_line(
+        'memcpy((char *)self + sizeof(PyObject), (char *)&{} + sizeof(PyObject),'.format(
+            instance_template_name))
+    emitter.emit_line('       sizeof({}) - sizeof(PyObject));'.format(struct_name))
+    for attr, value in cl.constant_defaults.items():
+        rtype = cl.attr_type(attr)
+        if rtype.is_refcounted:
+            emitter.emit_inc_ref('self->{}'.format(emitter.attr(attr)), rtype)
 
-    # Initialize attributes to default values, if necessary
+    # Initialize other attributes to default values, if necessary
     if defaults_fn is not None:
         emitter.emit_lines(
             'if ({}{}((PyObject *)self) == 0) {{'.format(
@@ -438,7 +591,7 @@ def generate_init_for_class(cl: ClassIR,
         '{}(PyObject *self, PyObject *args, PyObject *kwds)'.format(func_name))
     emitter.emit_line('{')
     emitter.emit_line('return {}{}(self, args, kwds) != NULL ? 0 : -1;'.format(
-        PREFIX, init_fn.cname(emitter.names)))
+        VARARGS_PREFIX, init_fn.cname(emitter.names)))
     emitter.emit_line('}')
 
     return func_name
@@ -459,11 +612,59 @@ def generate_new_for_class(cl: ClassIR,
         'PyErr_SetString(PyExc_TypeError, "interpreted classes cannot inherit from compiled");')
     emitter.emit_line('return NULL;')
     emitter.emit_line('}')
-
+    if cl.get_method('__init__') is None:
+        # Like object, reject arguments if there is no __init__
+        emitter.emit_lines(
+            'if (PyTuple_GET_SIZE(args) != 0 || (kwds != NULL && PyDict_Size(kwds) != 0)) {',
+            'PyErr_SetString(PyExc_TypeError, "{}() takes no arguments");'.format(cl.name),
+            'return NULL;',
+            '}')
     emitter.emit_line('return {}();'.format(setup_name))
     emitter.emit_line('}')
 
 
+def generate_vectorcall_for_class(cl: ClassIR,
+                                  func_name: str,
+                                  init_fn: Optional[FuncIR],
+                                  setup_name: str,
+                                  emitter: Emitter) -> None:
+    """Generate a constructor used when Python code calls the class.
+
+    Python 3.9 and later call the tp_vectorcall slot of a type object
+    (it isn't inherited by subclasses). This allocates an instance and
+    calls the METH_FASTCALL wrapper of __init__, instead of going through
+    tp_new and tp_init with an argument tuple.
+    """
+    emitter.emit_lines(
+        '#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 9',
+        'static PyObject *',
+        '{}(PyObject *type, PyObject *const *args, size_t nargsf, PyObject *kwnames)'.format(
+            func_name),
+        '{')
+    if init_fn is None:
+        emitter.emit_lines(
+            'if (PyVectorcall_NARGS(nargsf) != 0'
+            ' || (kwnames != NULL && PyTuple_GET_SIZE(kwnames) != 0)) {',
+            'PyErr_SetString(PyExc_TypeError, "{}() takes no arguments");'.format(cl.name),
+            'return NULL;',
+            '}',
+            'return {}();'.format(setup_name))
+    else:
+        emitter.emit_lines(
+            'PyObject *self = {}();'.format(setup_name),
+            'if (self == NULL)',
+            '    return NULL;',
+            'PyObject *ret = {}{}(self, args, PyVectorcall_NARGS(nargsf), kwnames);'.format(
+                PREFIX, init_fn.cname(emitter.names)),
+            'if (ret == NULL) {',
+            'Py_DECREF(self);',
+            'return NULL;',
+            '}',
+            'Py_DECREF(ret);',
+            'return self;')
+    emitter.emit_lines('}', '#endif')
+
+
 def generate_traverse_for_class(cl: ClassIR,
                                 func_name: str,
                                 emitter: Emitter) -> None:
@@ -514,24 +715,44 @@ def generate_clear_for_class(cl: ClassIR,
 def generate_dealloc_for_class(cl: ClassIR,
                                dealloc_func_name: str,
                                clear_func_name: str,
+                               freelist_name: str,
                                emitter: Emitter) -> None:
     emitter.emit_line('static void')
     emitter.emit_line('{}({} *self)'.format(dealloc_func_name, cl.struct_name(emitter.names)))
     emitter.emit_line('{')
-    emitter.emit_line('PyObject_GC_UnTrack(self);')
+    if cl.needs_gc:
+        emitter.emit_line('PyObject_GC_UnTrack(self);')
     emitter.emit_line('{}(self);'.format(clear_func_name))
+    if has_freelist(cl):
+        # Clearing may have run arbitrary code, so check the length only now
+        emitter.emit_lines(
+            'if ({name}_len < {size} && Py_TYPE(self) == {type_struct}) {{'.format(
+                name=freelist_name,
+                size=cl.freelist_size,
+                type_struct=emitter.type_struct_name(cl)),
+            '{name}[{name}_len++] = self;'.format(name=freelist_name),
+            'return;',
+            '}')
     emitter.emit_line('Py_TYPE(self)->tp_free((PyObject *)self);')
     emitter.emit_line('}')
 
 
+def has_freelist(cl: ClassIR) -> bool:
+    """Does a class keep deleted instances for reuse?
+
+    Classes with a __dict__ are excluded, since their instances are larger
+    than the struct and support weak references.
+    """
+    return bool(cl.freelist_size) and not cl.has_dict
+
+
 def generate_methods_table(cl: ClassIR,
                            name: str,
                            emitter: Emitter) -> None:
     emitter.emit_line('static PyMethodDef {}[] = {{'.format(name))
     for fn in cl.methods.values():
         emitter.emit_line('{{"{}",'.format(fn.name))
-        emitter.emit_line(' (PyCFunction){}{},'.format(PREFIX, fn.cname(emitter.names)))
-        flags = ['METH_VARARGS', 'METH_KEYWORDS']
+        flags = [method_table_entry(fn, emitter.names)]
         if fn.decl.kind == FUNC_STATICMETHOD:
             flags.append('METH_STATIC')
         elif fn.decl.kind == FUNC_CLASSMETHOD:
@@ -614,7 +835,7 @@ def generate_getter(cl: ClassIR,
     emitter.emit_line('{}({} *self, void *closure)'.format(getter_name(cl, attr, emitter.names),
                                                            cl.struct_name(emitter.names)))
     emitter.emit_line('{')
-    emit_undefined_check(rtype, emitter, attr_field, '==')
+    emit_undefined_check(rtype, emitter, attr, '==')
     emitter.emit_line('PyErr_SetString(PyExc_AttributeError,')
     emitter.emit_line('    "attribute {} of {} undefined");'.format(repr(attr),
                                                                     repr(cl.name)))
@@ -636,8 +857,15 @@ def generate_setter(cl: ClassIR,
         setter_name(cl, attr, emitter.names),
         cl.struct_name(emitter.names)))
     emitter.emit_line('{')
+    if not cl.is_deletable(attr):
+        emitter.emit_lines(
+            'if (value == NULL) {',
+            'PyErr_SetString(PyExc_AttributeError,',
+            '    "attribute {} of {} cannot be deleted");'.format(repr(attr), repr(cl.name)),
+            'return -1;',
+            '}')
     if rtype.is_refcounted:
-        emit_undefined_check(rtype, emitter, attr_field, '!=')
+        emit_undefined_check(rtype, emitter, attr, '!=')
         emitter.emit_dec_ref('self->{}'.format(attr_field), rtype)
         emitter.emit_line('}')
     emitter.emit_line('if (value != NULL) {')
@@ -651,8 +879,16 @@ def generate_setter(cl: ClassIR,
                            '    return -1;')
     emitter.emit_inc_ref('tmp', rtype)
     emitter.emit_line('self->{} = tmp;'.format(attr_field))
-    emitter.emit_line('} else')
-    emitter.emit_line('    self->{} = {};'.format(attr_field, emitter.c_undefined_value(rtype)))
+    if is_fixed_width_rtype(rtype):
+        emitter.emit_line('self->{} = 1;'.format(defined_flag(attr)))
+        emitter.emit_line('} else {')
+        emitter.emit_line('self->{} = 0;'.format(defined_flag(attr)))
+        emitter.emit_line('self->{} = {};'.format(attr_field, emitter.c_undefined_value(rtype)))
+        emitter.emit_line('}')
+    else:
+        emitter.emit_line('} else')
+        emitter.emit_line('    self->{} = {};'.format(attr_field,
+                                                      emitter.c_undefined_value(rtype)))
     emitter.emit_line('return 0;')
     emitter.emit_line('}')
 
@@ -669,6 +905,7 @@ def generate_readonly_getter(cl: ClassIR,
     if rtype.is_unboxed:
         emitter.emit_line('{}retval = {}{}((PyObject *) self);'.format(
             emitter.ctype_spaced(rtype), NATIVE_PREFIX, func_ir.cname(emitter.names)))
+        emitter.emit_error_check('retval', rtype, 'return NULL;')
         emitter.emit_box('retval', 'retbox', rtype, declare_dest=True)
         emitter.emit_line('return retbox;')
     else:
@@ -677,13 +914,29 @@ def generate_readonly_getter(cl: ClassIR,
     emitter.emit_line('}')
 
 
+def defined_flag(attr: str) -> str:
+    """Return the name of the struct field that records if a fixed-width attribute is set.
+
+    Every value of a fixed-width integer is valid, so the undefined value
+    alone doesn't tell whether the attribute has been assigned.
+    """
+    return 'defined_{}'.format(attr)
+
+
 def emit_undefined_check(rtype: RType, emitter: Emitter, attr: str, compare: str) -> None:
+    attr_expr = 'self->{}'.format(emitter.attr(attr))
     if isinstance(rtype, RTuple):
-        attr_expr = 'self->{}'.format(attr)
         emitter.emit_line(
             'if ({}) {{'.format(
                 emitter.tuple_undefined_check_cond(
                     rtype, attr_expr, emitter.c_undefined_value, compare)))
+    elif is_fixed_width_rtype(rtype):
+        if compare == '==':
+            cond = '{} == {} && !self->{}'
+        else:
+            cond = '{} != {} || self->{}'
+        emitter.emit_line('if ({}) {{'.format(
+            cond.format(attr_expr, emitter.c_undefined_value(rtype), defined_flag(attr))))
     else:
         emitter.emit_line(
-            'if (self->{} {} {}) {{'.format(attr, compare, emitter.c_undefined_value(rtype)))
+            'if ({}) {{'.format(emitter.error_value_check(attr_expr, rtype, compare)))
@@ -1,14 +1,16 @@
 """Code generation for native function bodies."""
 
+import math
 from typing import Optional, List
 
 from mypyc.common import REG_PREFIX, NATIVE_PREFIX, STATIC_PREFIX, TYPE_PREFIX, TOP_LEVEL_NAME
 from mypyc.emit import Emitter
 from mypyc.ops import (
-    FuncIR, OpVisitor, Goto, Branch, Return, Assign, LoadInt, LoadErrorValue, GetAttr, SetAttr,
-    LoadStatic, InitStatic, TupleGet, TupleSet, Call, IncRef, DecRef, Box, Cast, Unbox,
-    BasicBlock, Value, Register, RType, RTuple, MethodCall, PrimitiveOp,
-    EmitterInterface, Unreachable, is_int_rprimitive, NAMESPACE_STATIC, NAMESPACE_TYPE,
+    FuncIR, OpVisitor, Goto, Branch, Return, Assign, LoadInt, LoadFloat, LoadErrorValue,
+    GetAttr, SetAttr, LoadStatic, InitStatic, TupleGet, TupleSet, Call, IncRef, DecRef, Box,
+    Cast, Unbox, BasicBlock, Value, Register, RType, RTuple, MethodCall, PrimitiveOp,
+    EmitterInterface, Unreachable, is_int_rprimitive, is_fixed_width_rtype, NAMESPACE_STATIC,
+    NAMESPACE_TYPE,
     RaiseStandardError, FuncDecl, ClassIR,
     FUNC_STATICMETHOD, FUNC_CLASSMETHOD,
 )
@@ -123,9 +125,7 @@ class FunctionEmitterVisitor(OpVisitor[None], EmitterInterface):
                                                                self.c_error_value,
                                                                compare)
             else:
-                cond = '{} {} {}'.format(self.reg(op.left),
-                                         compare,
-                                         self.c_error_value(typ))
+                cond = self.emitter.error_value_check(self.reg(op.left), typ, compare)
         else:
             assert False, "Invalid branch"
 
@@ -190,7 +190,21 @@ class FunctionEmitterVisitor(OpVisitor[None], EmitterInterface):
 
     def visit_load_int(self, op: LoadInt) -> None:
         dest = self.reg(op)
-        self.emit_line('%s = %d;' % (dest, op.value * 2))
+        if is_fixed_width_rtype(op.type):
+            self.emit_line('%s = %s;' % (dest, self.emitter.c_fixed_width_literal(op.value)))
+        else:
+            self.emit_line('%s = %d;' % (dest, op.value * 2))
+
+    def visit_load_float(self, op: LoadFloat) -> None:
+        dest = self.reg(op)
+        value = op.value
+        if math.isnan(value):
+            literal = 'Py_NAN'
+        elif math.isinf(value):
+            literal = 'Py_HUGE_VAL' if value > 0 else '-Py_HUGE_VAL'
+        else:
+            literal = repr(value)
+        self.emit_line('%s = %s;' % (dest, literal))
 
     def visit_load_error_value(self, op: LoadErrorValue) -> None:
         if isinstance(op.type, RTuple):
@@ -218,6 +232,28 @@ class FunctionEmitterVisitor(OpVisitor[None], EmitterInterface):
                 rtype.struct_name(self.names),
                 self.ctype(rtype.attr_type(op.attr)),
                 op.attr))
+        elif cl.is_always_defined(op.attr):
+            # We can read the field directly. It can only be undefined if it refers to
+            # an object and tp_clear has cleared it.
+            typ, decl_cl = cl.attr_details(op.attr)
+            self.emit_line('%s = ((%s *)%s)->%s;' % (
+                dest,
+                decl_cl.struct_name(self.names),
+                obj,
+                self.emitter.attr(op.attr)))
+            if typ.is_refcounted:
+                if isinstance(typ, RTuple):
+                    cond = self.emitter.tuple_undefined_check_cond(
+                        typ, dest, self.c_error_value, '==')
+                else:
+                    cond = self.emitter.error_value_check(dest, typ, '==')
+                self.emit_line('if (unlikely(%s)) {' % cond)
+                self.emit_line(
+                    'PyErr_SetString(PyExc_AttributeError, "attribute %s of %s undefined");' % (
+                        repr(op.attr), repr(decl_cl.name)))
+                self.emit_line('} else {')
+                self.emitter.emit_inc_ref(dest, typ)
+                self.emit_line('}')
         else:
             typ, decl_cl = cl.attr_details(op.attr)
             self.emit_line('%s = %s((%s *)%s); /* %s */' % (
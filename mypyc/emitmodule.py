@@ -10,18 +10,18 @@ from mypy.errors import CompileError
 from mypy.options import Options
 
 from mypyc import genops
-from mypyc.common import PREFIX, TOP_LEVEL_NAME, INT_PREFIX
+from mypyc.common import NATIVE_PREFIX, TOP_LEVEL_NAME, INT_PREFIX
 from mypyc.emit import EmitterContext, Emitter, HeaderDeclaration
 from mypyc.emitfunc import generate_native_function, native_function_header
 from mypyc.emitclass import generate_class_type_decl, generate_class
 from mypyc.emitwrapper import (
-    generate_wrapper_function, wrapper_function_header,
+    generate_wrapper_function, wrapper_function_header, varargs_wrapper_function_header,
+    method_table_entry,
 )
 from mypyc.ops import FuncIR, ClassIR, ModuleIR, LiteralsMap, format_func, RType, RTuple
 from mypyc.options import CompilerOptions
-from mypyc.uninit import insert_uninit_checks
-from mypyc.refcount import insert_ref_count_opcodes
-from mypyc.exceptions import insert_exception_handling
+from mypyc.passes import PassManager, build_pipeline
+from mypyc.layout import format_size_report
 from mypyc.emit import EmitterContext, Emitter, HeaderDeclaration
 from mypyc.namegen import exported_name
 
@@ -56,18 +56,18 @@ def compile_modules_to_c(result: BuildResult, module_names: List[str],
                                                 compiler_options)
     if errors > 0:
         sys.exit(1)
-    # Insert uninit checks.
-    for _, module in modules:
-        for fn in module.functions:
-            insert_uninit_checks(fn)
-    # Insert exception handling.
-    for _, module in modules:
-        for fn in module.functions:
-            insert_exception_handling(fn)
-    # Insert refcount handling.
-    for _, module in modules:
-        for fn in module.functions:
-            insert_ref_count_opcodes(fn)
+    # Insert uninit checks, exception handling and refcount handling,
+    # and run any optimization passes.
+    pipeline = build_pipeline(compiler_options.passes, compiler_options.disabled_passes)
+    pass_manager = PassManager(pipeline, verify=compiler_options.verify_ir)
+    pass_manager.run(modules)
+    if compiler_options.time_passes:
+        for line in pass_manager.format_timings():
+            print(line)
+    if compiler_options.compact_layout and compiler_options.verbose:
+        for _, module in modules:
+            for line in format_size_report(module.classes):
+                print(line)
     # Format ops for debugging
     if ops is not None:
         for _, module in modules:
@@ -78,7 +78,7 @@ def compile_modules_to_c(result: BuildResult, module_names: List[str],
     source_paths = {module_name: result.files[module_name].path
                     for module_name in module_names}
     generator = ModuleGenerator(literals, modules, source_paths, shared_lib_name,
-                                compiler_options.multi_file)
+                                compiler_options.multi_file, compiler_options.compact_layout)
     return generator.generate_c_for_modules()
 
 
@@ -86,6 +86,7 @@ def generate_function_declaration(fn: FuncIR, emitter: Emitter) -> None:
     emitter.emit_line('{};'.format(native_function_header(fn.decl, emitter)))
     if fn.name != TOP_LEVEL_NAME:
         emitter.emit_line('{};'.format(wrapper_function_header(fn, emitter.names)))
+        emitter.emit_line('{};'.format(varargs_wrapper_function_header(fn, emitter.names)))
 
 
 def encode_as_c_string(s: str) -> Tuple[str, int]:
@@ -109,7 +110,8 @@ class ModuleGenerator:
                  modules: List[Tuple[str, ModuleIR]],
                  source_paths: Dict[str, str],
                  shared_lib_name: Optional[str],
-                 multi_file: bool) -> None:
+                 multi_file: bool,
+                 compact_layout: bool = False) -> None:
         self.literals = literals
         self.modules = modules
         self.source_paths = source_paths
@@ -121,6 +123,7 @@ class ModuleGenerator:
         self.shared_lib_name = shared_lib_name
         self.use_shared_lib = shared_lib_name is not None
         self.multi_file = multi_file
+        self.compact_layout = compact_layout
 
     def generate_c_for_modules(self) -> List[Tuple[str, str]]:
         file_contents = []
@@ -205,7 +208,7 @@ class ModuleGenerator:
         for module_name, module in self.modules:
             self.declare_finals(module.final_names, declarations)
             for cl in module.classes:
-                generate_class_type_decl(cl, emitter, declarations)
+                generate_class_type_decl(cl, emitter, declarations, self.compact_layout)
             for fn in module.functions:
                 generate_function_declaration(fn, declarations)
 
@@ -223,7 +226,7 @@ class ModuleGenerator:
         )
 
         emitter.emit_line('CPy_Init();')
-        for symbol, fixup in self.simple_inits:
+        for symbol, fixup in self.simple_inits + self.context.runtime_inits:
             emitter.emit_line('{} = {};'.format(symbol, fixup))
 
         for (_, literal), identifier in self.literals.items():
@@ -254,11 +257,22 @@ class ModuleGenerator:
                     '{} = PyBytes_FromStringAndSize({}, {});'.format(
                         symbol, *encode_bytes_as_c_string(literal))
                 )
+            elif isinstance(literal, tuple):
+                # The items are str literals that have already been initialized
+                items = [emitter.static_name(self.literals[(str, item)], None)
+                         for item in literal]
+                emitter.emit_line(
+                    '{} = PyTuple_Pack({});'.format(symbol, ', '.join([str(len(items))] + items))
+                )
             else:
                 assert False, ('Literals must be integers, floating point numbers, or strings,',
                                'but the provided literal is of type {}'.format(type(literal)))
             emitter.emit_lines('if (unlikely({} == NULL))'.format(symbol),
                                '    return -1;')
+            # Intern strings, since they are often used as attribute and keyword
+            # argument names, which are compared by identity first.
+            if isinstance(literal, str):
+                emitter.emit_line('PyUnicode_InternInPlace(&{});'.format(symbol))
             # Ints have an unboxed representation.
             if isinstance(literal, int):
                 emitter.emit_line(
@@ -280,11 +294,9 @@ class ModuleGenerator:
             if fn.class_name is not None or fn.name == TOP_LEVEL_NAME:
                 continue
             emitter.emit_line(
-                ('{{"{name}", (PyCFunction){prefix}{cname}, METH_VARARGS | METH_KEYWORDS, '
-                 'NULL /* docstring */}},').format(
+                '{{"{name}", {entry}, NULL /* docstring */}},'.format(
                     name=fn.name,
-                    cname=fn.cname(emitter.names),
-                    prefix=PREFIX))
+                    entry=method_table_entry(fn, emitter.names)))
         emitter.emit_line('{NULL, NULL, 0, NULL}')
         emitter.emit_line('};')
         emitter.emit_line()
@@ -335,6 +347,9 @@ class ModuleGenerator:
                            'if (unlikely({} == NULL))'.format(module_globals),
                            '    return NULL;')
 
+        emitter.emit_lines('if (CPyGlobalsInit() < 0)',
+                           '    return NULL;')
+
         # HACK: Manually instantiate generated classes here
         for cl in module.classes:
             if cl.is_generated:
@@ -344,9 +359,8 @@ class ModuleGenerator:
                     format(t=type_struct))
                 emitter.emit_lines('if (unlikely(!{}))'.format(type_struct),
                                    '    return NULL;')
-
-        emitter.emit_lines('if (CPyGlobalsInit() < 0)',
-                           '    return NULL;')
+                emitter.emit_line('{}{}_trait_vtable_setup();'.format(
+                    NATIVE_PREFIX, cl.name_prefix(emitter.names)))
 
         self.generate_top_level_call(module, emitter)
 
@@ -447,8 +461,15 @@ class ModuleGenerator:
                 undefined = '{{ {} }}'.format(''.join(emitter.tuple_undefined_value_helper(typ)))
             else:
                 undefined = emitter.c_undefined_value(typ)
-            emitter.emit_line('{}{} = {};'.format(emitter.ctype_spaced(typ), static_name,
-                                                  undefined))
+            if emitter.is_constant_undefined_value(typ):
+                emitter.emit_line('{}{} = {};'.format(emitter.ctype_spaced(typ), static_name,
+                                                      undefined))
+            else:
+                # The float error value isn't a constant expression, so assign it at runtime
+                emitter.emit_line('{}{};'.format(emitter.ctype_spaced(typ), static_name))
+                if isinstance(typ, RTuple):
+                    undefined = '({}){}'.format(emitter.ctype(typ), undefined)
+                self.simple_inits.append((static_name, undefined))
 
     def declare_static_pyobject(self, identifier: str, emitter: Emitter) -> None:
         symbol = emitter.static_name(identifier, None)
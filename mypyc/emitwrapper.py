@@ -1,10 +1,12 @@
 """Generate CPython API wrapper function for a native function."""
 
-from mypyc.common import PREFIX, NATIVE_PREFIX, DUNDER_PREFIX
+from mypy.nodes import reverse_op_methods, normal_from_reverse_op
+
+from mypyc.common import PREFIX, NATIVE_PREFIX, DUNDER_PREFIX, VARARGS_PREFIX
 from mypyc.emit import Emitter
 from mypyc.ops import (
     ClassIR, FuncIR, RType, RuntimeArg,
-    is_object_rprimitive, is_int_rprimitive, is_bool_rprimitive,
+    is_object_rprimitive, is_int_rprimitive, is_bool_rprimitive, is_fixed_width_rtype,
     bool_rprimitive,
     FUNC_STATICMETHOD,
 )
@@ -13,16 +15,39 @@ from typing import List, Optional
 
 
 def wrapper_function_header(fn: FuncIR, names: NameGenerator) -> str:
+    """Return the header of a wrapper that uses the METH_FASTCALL calling convention."""
+    return ('PyObject *{prefix}{name}(PyObject *self, PyObject *const *args, Py_ssize_t nargs, '
+            'PyObject *kwnames)').format(
+                prefix=PREFIX,
+                name=fn.cname(names))
+
+
+def varargs_wrapper_function_header(fn: FuncIR, names: NameGenerator) -> str:
+    """Return the header of a wrapper that takes a tuple and a dict of arguments."""
     return 'PyObject *{prefix}{name}(PyObject *self, PyObject *args, PyObject *kw)'.format(
-        prefix=PREFIX,
+        prefix=VARARGS_PREFIX,
         name=fn.cname(names))
 
 
+def method_table_entry(fn: FuncIR, names: NameGenerator) -> str:
+    """Return the function pointer and flags for a function in a PyMethodDef table.
+
+    The fastcall wrapper is used if the Python version supports it.
+    """
+    return 'CPY_FASTCALL_METHOD({}{}, {}{})'.format(
+        PREFIX, fn.cname(names), VARARGS_PREFIX, fn.cname(names))
+
+
 def generate_wrapper_function(fn: FuncIR, emitter: Emitter) -> None:
     """Generates a CPython-compatible wrapper function for a native function.
 
     In particular, this handles unboxing the arguments, calling the native function, and
     then boxing the return value.
+
+    The arguments are parsed using a static parser spec, which caches the parsed format
+    and the interned keyword names after the first call. Also generate a wrapper that
+    takes a tuple and a dict of arguments (for tp_call and tp_init, and for Python
+    versions without METH_FASTCALL).
     """
     emitter.emit_line('{} {{'.format(wrapper_function_header(fn, emitter.names)))
 
@@ -35,23 +60,31 @@ def generate_wrapper_function(fn: FuncIR, emitter: Emitter) -> None:
     optional_args = [arg for arg in fn.args if arg.optional]
 
     arg_names = ''.join('"{}", '.format(arg.name) for arg in real_args)
-    emitter.emit_line('static char *kwlist[] = {{{}0}};'.format(arg_names))
-    for arg in real_args:
-        emitter.emit_line('PyObject *obj_{}{};'.format(
-                          arg.name, ' = NULL' if arg.optional else ''))
+    emitter.emit_line('static const char * const kwlist[] = {{{}0}};'.format(arg_names))
     arg_format = '{}{}:{}'.format(
         'O' * (len(real_args) - len(optional_args)),
         '|' + 'O' * len(optional_args) if len(optional_args) > 0 else '',
         fn.name,
     )
+    emitter.emit_line('static CPyArg_Parser parser = {{"{}", kwlist, 0}};'.format(arg_format))
+    for arg in real_args:
+        emitter.emit_line('PyObject *obj_{}{};'.format(
+                          arg.name, ' = NULL' if arg.optional else ''))
     arg_ptrs = ''.join(', &obj_{}'.format(arg.name) for arg in real_args)
     emitter.emit_lines(
-        'if (!CPyArg_ParseTupleAndKeywords(args, kw, "{}", kwlist{})) {{'.format(
-            arg_format, arg_ptrs),
+        'if (!CPyArg_ParseStackAndKeywords(args, nargs, kwnames, &parser{})) {{'.format(
+            arg_ptrs),
         'return NULL;',
         '}')
     generate_wrapper_core(fn, emitter, optional_args)
     emitter.emit_line('}')
+    emitter.emit_line()
+
+    emitter.emit_lines(
+        '{} {{'.format(varargs_wrapper_function_header(fn, emitter.names)),
+        'return CPy_CallFastcallWrapper({}{}, self, args, kw);'.format(
+            PREFIX, fn.cname(emitter.names)),
+        '}')
 
 
 def generate_dunder_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
@@ -168,17 +201,242 @@ def generate_bool_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
     return name
 
 
+def generate_len_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for native __len__ methods."""
+    name = '{}{}{}'.format(DUNDER_PREFIX, fn.name, cl.name_prefix(emitter.names))
+    emitter.emit_line('static Py_ssize_t {name}(PyObject *self) {{'.format(
+        name=name
+    ))
+    emitter.emit_line('{}retval = {}{}(self);'.format(emitter.ctype_spaced(fn.ret_type),
+                                                      NATIVE_PREFIX,
+                                                      fn.cname(emitter.names)))
+    emitter.emit_error_check('retval', fn.ret_type, 'return -1;')
+    if is_int_rprimitive(fn.ret_type):
+        emitter.emit_line('Py_ssize_t val = CPyTagged_AsSsize_t(retval);')
+    elif is_fixed_width_rtype(fn.ret_type):
+        emitter.emit_line('Py_ssize_t val = retval;')
+    else:
+        assert not fn.ret_type.is_unboxed, "Only int return supported for __len__"
+        emitter.emit_line('Py_ssize_t val = PyLong_AsSsize_t(retval);')
+    emitter.emit_dec_ref('retval', fn.ret_type)
+    emitter.emit_line('if (PyErr_Occurred()) return -1;')
+    emitter.emit_lines(
+        'if (val < 0) {',
+        'PyErr_SetString(PyExc_ValueError, "__len__() should return >= 0");',
+        'return -1;',
+        '}')
+    emitter.emit_line('return val;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_sq_item_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for native __getitem__ methods in the sequence protocol.
+
+    This boxes the index and calls the mp_subscript wrapper, which must already
+    have been generated.
+    """
+    subscript_name = '{}{}{}'.format(DUNDER_PREFIX, fn.name, cl.name_prefix(emitter.names))
+    name = '{}_item'.format(subscript_name)
+    emitter.emit_line('static PyObject *{name}(PyObject *self, Py_ssize_t index) {{'.format(
+        name=name
+    ))
+    emitter.emit_lines(
+        'PyObject *obj_index = PyLong_FromSsize_t(index);',
+        'if (obj_index == NULL) return NULL;',
+        'PyObject *result = {}(self, obj_index);'.format(subscript_name),
+        'Py_DECREF(obj_index);',
+        'return result;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_contains_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for native __contains__ methods."""
+    name = '{}{}{}'.format(DUNDER_PREFIX, fn.name, cl.name_prefix(emitter.names))
+    emitter.emit_line('static int {name}(PyObject *obj_self, PyObject *obj_item) {{'.format(
+        name=name
+    ))
+    generate_native_call(fn, emitter, ['self', 'item'], 'return -1;')
+    if is_bool_rprimitive(fn.ret_type):
+        emitter.emit_line('return retval;')
+    else:
+        if fn.ret_type.is_unboxed:
+            emitter.emit_box('retval', 'retbox', fn.ret_type, declare_dest=True)
+        else:
+            emitter.emit_line('PyObject *retbox = retval;')
+        emitter.emit_lines('int val = PyObject_IsTrue(retbox);',
+                           'Py_DECREF(retbox);',
+                           'return val;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_set_del_item_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for native __setitem__ and __delitem__ methods.
+
+    Both methods share the mp_ass_subscript slot, which is called with a NULL
+    value to delete an item.
+    """
+    name = '{}_SetDelItem_{}'.format(DUNDER_PREFIX, cl.name_prefix(emitter.names))
+    emitter.emit_line(
+        'static int {name}(PyObject *obj_self, PyObject *obj_key, PyObject *obj_value) {{'.
+        format(name=name))
+    for method_name, check, arg_names, operation in (
+            ('__delitem__', 'obj_value == NULL', ['self', 'key'], 'deletion'),
+            ('__setitem__', 'obj_value != NULL', ['self', 'key', 'value'], 'assignment')):
+        emitter.emit_line('if ({}) {{'.format(check))
+        method = cl.get_method(method_name)
+        if method:
+            generate_native_call(method, emitter, arg_names, 'return -1;')
+            emitter.emit_dec_ref('retval', method.ret_type)
+            emitter.emit_line('return 0;')
+        else:
+            emitter.emit_lines(
+                'PyErr_Format(PyExc_TypeError,',
+                '             "\'%.200s\' object does not support item {}",'.format(operation),
+                '             Py_TYPE(obj_self)->tp_name);',
+                'return -1;')
+        emitter.emit_line('}')
+    emitter.emit_line('return -1;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_bin_op_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for a binary operator method and its reverse method.
+
+    The methods share a number slot (such as nb_add for __add__ and __radd__), which
+    is called with the instance as either operand. Like the interpreter does for Python
+    classes, return NotImplemented if the other operand isn't accepted by a method so
+    that the operation can fall back to the other operand's methods.
+    """
+    method_name = normal_from_reverse_op.get(fn.name, fn.name)
+    name = '{}_BinOp{}{}'.format(DUNDER_PREFIX, method_name, cl.name_prefix(emitter.names))
+    method = cl.get_method(method_name)
+    reverse = cl.get_method(reverse_op_methods[method_name])
+    method_wrapper = generate_bin_op_method_wrapper(cl, method, emitter) if method else None
+    reverse_wrapper = generate_bin_op_method_wrapper(cl, reverse, emitter) if reverse else None
+
+    # nb_power is a ternary function, but only the binary form is supported
+    is_power = method_name == '__pow__'
+    emitter.emit_line('static PyObject *{name}(PyObject *obj_left, PyObject *obj_right{mod}) {{'.
+                      format(name=name, mod=', PyObject *obj_mod' if is_power else ''))
+    if is_power:
+        emitter.emit_lines('if (obj_mod != Py_None) {',
+                           'Py_INCREF(Py_NotImplemented);',
+                           'return Py_NotImplemented;',
+                           '}')
+    type_name = emitter.type_struct_name(cl)
+    if method_wrapper:
+        emitter.emit_lines(
+            'if (PyObject_TypeCheck(obj_left, {})) {{'.format(type_name),
+            'PyObject *result = {}(obj_left, obj_right);'.format(method_wrapper),
+            'if (result != Py_NotImplemented) return result;',
+            'Py_DECREF(result);',
+            '}')
+    if reverse_wrapper:
+        # As with Python classes, the reverse method isn't tried if both operands
+        # have the same type.
+        emitter.emit_lines(
+            'if (Py_TYPE(obj_left) != Py_TYPE(obj_right) && '
+            'PyObject_TypeCheck(obj_right, {})) {{'.format(type_name),
+            'return {}(obj_right, obj_left);'.format(reverse_wrapper),
+            '}')
+    emitter.emit_line('Py_INCREF(Py_NotImplemented);')
+    emitter.emit_line('return Py_NotImplemented;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_inplace_op_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for in-place operator methods such as __iadd__."""
+    name = generate_bin_op_method_wrapper(cl, fn, emitter)
+    if fn.name != '__ipow__':
+        return name
+
+    # nb_inplace_power is a ternary function, but only the binary form is supported
+    ternary_name = '{}_ternary'.format(name)
+    emitter.emit_line(
+        'static PyObject *{name}(PyObject *obj_left, PyObject *obj_right, '
+        'PyObject *obj_mod) {{'.format(name=ternary_name))
+    emitter.emit_lines('if (obj_mod != Py_None) {',
+                       'Py_INCREF(Py_NotImplemented);',
+                       'return Py_NotImplemented;',
+                       '}',
+                       'return {}(obj_left, obj_right);'.format(name),
+                       '}')
+
+    return ternary_name
+
+
+def generate_bin_op_method_wrapper(cl: ClassIR, fn: FuncIR, emitter: Emitter) -> str:
+    """Generates a wrapper for a binary operator method, called with self first.
+
+    Return NotImplemented if an operand has an incompatible type. Any further
+    arguments must be optional and are left out.
+    """
+    name = '{}{}{}'.format(DUNDER_PREFIX, fn.name, cl.name_prefix(emitter.names))
+    emitter.emit_line('static PyObject *{name}(PyObject *obj_self, PyObject *obj_other) {{'.
+                      format(name=name))
+    optional_args = fn.args[2:]
+    if len(fn.args) < 2 or not all(arg.optional for arg in optional_args):
+        # The method can't be called with two arguments.
+        emitter.emit_lines('Py_INCREF(Py_NotImplemented);',
+                           'return Py_NotImplemented;',
+                           '}')
+        return name
+    for arg in optional_args:
+        emitter.emit_line('PyObject *obj_{} = NULL;'.format(arg.name))
+    arg_names = ['self', 'other'] + [arg.name for arg in optional_args]
+    generate_wrapper_core(fn, emitter, optional_args, arg_names, error='goto typefail;')
+    emitter.emit_lines(
+        'typefail:',
+        'if (!PyErr_ExceptionMatches(PyExc_TypeError)) return NULL;',
+        'PyErr_Clear();',
+        'Py_INCREF(Py_NotImplemented);',
+        'return Py_NotImplemented;')
+    emitter.emit_line('}')
+
+    return name
+
+
+def generate_native_call(fn: FuncIR, emitter: Emitter, arg_names: List[str],
+                         error: str) -> None:
+    """Check and unbox the arguments and call a native function.
+
+    The result is stored in a new variable named retval. Evaluate the C code
+    in 'error' if an argument has an incompatible type or the call fails.
+    """
+    for arg_name, arg in zip(arg_names, fn.args):
+        generate_arg_check(arg_name, arg.type, emitter, error=error)
+    native_args = ', '.join('arg_{}'.format(arg) for arg in arg_names)
+    emitter.emit_line('{}retval = {}{}({});'.format(emitter.ctype_spaced(fn.ret_type),
+                                                    NATIVE_PREFIX,
+                                                    fn.cname(emitter.names),
+                                                    native_args))
+    emitter.emit_error_check('retval', fn.ret_type, error)
+
+
 def generate_wrapper_core(fn: FuncIR, emitter: Emitter,
                           optional_args: List[RuntimeArg] = [],
-                          arg_names: Optional[List[str]] = None) -> None:
+                          arg_names: Optional[List[str]] = None,
+                          error: str = 'return NULL;') -> None:
     """Generates the core part of a wrapper function for a native function.
     This expects each argument as a PyObject * named obj_{arg} as a precondition.
     It converts the PyObject *s to the necessary types, checking and unboxing if necessary,
     makes the call, then boxes the result if necessary and returns it.
+
+    Evaluate the C code in 'error' if an argument has an incompatible type.
     """
     arg_names = arg_names or [arg.name for arg in fn.args]
     for arg_name, arg in zip(arg_names, fn.args):
-        generate_arg_check(arg_name, arg.type, emitter, arg in optional_args)
+        generate_arg_check(arg_name, arg.type, emitter, arg in optional_args, error)
     native_args = ', '.join('arg_{}'.format(arg) for arg in arg_names)
     if fn.ret_type.is_unboxed:
         # TODO: The Py_RETURN macros return the correct PyObject * with reference count handling.
@@ -197,17 +455,19 @@ def generate_wrapper_core(fn: FuncIR, emitter: Emitter,
         # TODO: Tracebacks?
 
 
-def generate_arg_check(name: str, typ: RType, emitter: Emitter, optional: bool = False) -> None:
+def generate_arg_check(name: str, typ: RType, emitter: Emitter, optional: bool = False,
+                       error: str = 'return NULL;') -> None:
     """Insert a runtime check for argument and unbox if necessary.
 
     The object is named PyObject *obj_{}. This is expected to generate
     a value of name arg_{} (unboxed if necessary). For each primitive a runtime
-    check ensures the correct type.
+    check ensures the correct type, and the C code in 'error' is evaluated
+    (with an exception set) if the check fails.
     """
     if typ.is_unboxed:
         # Borrow when unboxing to avoid reference count manipulation.
         emitter.emit_unbox('obj_{}'.format(name), 'arg_{}'.format(name), typ,
-                           'return NULL;', declare_dest=True, borrow=True, optional=optional)
+                           error, declare_dest=True, borrow=True, optional=optional)
     elif is_object_rprimitive(typ):
         # Trivial, since any object is valid.
         if optional:
@@ -221,7 +481,7 @@ def generate_arg_check(name: str, typ: RType, emitter: Emitter, optional: bool =
         emitter.emit_cast('obj_{}'.format(name), 'arg_{}'.format(name), typ,
                           declare_dest=True, optional=optional)
         if optional:
-            emitter.emit_line('if (obj_{} != NULL && arg_{} == NULL) return NULL;'.format(
-                              name, name))
+            emitter.emit_line('if (obj_{} != NULL && arg_{} == NULL) {}'.format(
+                              name, name, error))
         else:
-            emitter.emit_line('if (arg_{} == NULL) return NULL;'.format(name, name))
+            emitter.emit_line('if (arg_{} == NULL) {}'.format(name, error))
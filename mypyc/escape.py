@@ -0,0 +1,144 @@
+"""Escape analysis for temporary objects and a transform that removes them.
+
+An allocation escapes if a reference to the object may outlive the
+ops that use it directly: if it's assigned to a register, returned,
+stolen by an op or passed to an op that may hold on to it. A
+non-escaping allocation is only visible to the ops that use it, so
+these can be rewritten to not need the object at all.
+
+Genops creates such temporaries when lowering Python calls that use
+*args or keyword arguments, and when building tuples from starred
+expressions:
+
+    r0 = []
+    r1 = r0.extend(x) :: list
+    r2 = tuple r0 :: list          # becomes 'r2 = tuple x :: object'
+    r3 = {}
+    r4 = py_call_with_kwargs(f, r2, r3)   # becomes 'py_call_with_args(f, r2)'
+
+The temporary list is replaced with a direct conversion of the
+iterable into a tuple (which doesn't allocate anything if it already
+is a tuple), and an empty keyword argument dictionary is left out.
+Removing the allocations also removes the reference counting ops that
+refcount insertion would generate for them, so this must run before it.
+"""
+
+from typing import List, Dict, Set, Tuple
+
+from mypyc.ops import FuncIR, BasicBlock, Op, Value, PrimitiveOp, OpDescription
+from mypyc.ops_list import (
+    new_list_op, list_append_op, list_extend_op, list_len_op, list_get_item_op
+)
+from mypyc.ops_dict import new_dict_op
+from mypyc.ops_tuple import list_tuple_op, sequence_tuple_op, tuple_get_item_op, tuple_len_op
+from mypyc.ops_misc import py_call_with_kwargs_op, py_call_with_args_op
+
+# Ops that return a new object
+ALLOCATION_OPS = [new_list_op, new_dict_op, list_tuple_op]  # type: List[OpDescription]
+
+# Ops that don't keep a reference to their first operand after the op
+# (op descriptions aren't hashable, so these are lists)
+NON_CAPTURING_OPS = [
+    list_append_op,
+    list_extend_op,
+    list_len_op,
+    list_get_item_op,
+    list_tuple_op,
+    tuple_get_item_op,
+    tuple_len_op,
+]  # type: List[OpDescription]
+
+# Map from value to ops that use it, along with the operand index
+Uses = Dict[Value, List[Tuple[Op, int]]]
+
+
+def find_uses(blocks: List[BasicBlock]) -> Uses:
+    uses = {}  # type: Uses
+    for block in blocks:
+        for op in block.ops:
+            for i, src in enumerate(op.sources()):
+                uses.setdefault(src, []).append((op, i))
+    return uses
+
+
+def escapes(value: Value, uses: Uses) -> bool:
+    for op, i in uses.get(value, []):
+        if not (isinstance(op, PrimitiveOp) and i == 0
+                and any(op.desc is desc for desc in NON_CAPTURING_OPS)):
+            return True
+        if value in op.stolen():
+            return True
+    return False
+
+
+def find_non_escaping_allocations(blocks: List[BasicBlock], uses: Uses) -> Set[Op]:
+    return {op
+            for block in blocks
+            for op in block.ops
+            if (isinstance(op, PrimitiveOp)
+                and any(op.desc is desc for desc in ALLOCATION_OPS)
+                and not escapes(op, uses))}
+
+
+def remove_temporary_allocations(ir: FuncIR) -> None:
+    uses = find_uses(ir.blocks)
+    removed = set()  # type: Set[Op]
+
+    for op in find_non_escaping_allocations(ir.blocks, uses):
+        if isinstance(op, PrimitiveOp) and op.desc is new_list_op and not op.args:
+            removed.update(simplify_list_to_tuple(ir, op, uses))
+
+    for block in ir.blocks:
+        for op in block.ops:
+            if isinstance(op, PrimitiveOp) and op.desc is new_dict_op and not op.args:
+                if is_empty_kwargs(op, uses):
+                    call = uses[op][0][0]
+                    assert isinstance(call, PrimitiveOp)
+                    call.desc = py_call_with_args_op
+                    call.args = call.args[:2]
+                    removed.add(op)
+
+    if removed:
+        for block in ir.blocks:
+            block.ops = [op for op in block.ops if op not in removed]
+        for op in removed:
+            del ir.env.indexes[op]
+
+
+def simplify_list_to_tuple(ir: FuncIR, new_list: PrimitiveOp, uses: Uses) -> List[Op]:
+    """Replace 'l = []; l.extend(x); t = tuple(l)' with 't = tuple(x)'.
+
+    Return the ops that should be removed.
+    """
+    list_uses = uses.get(new_list, [])
+    if len(list_uses) != 2:
+        return []
+    (extend, _), (to_tuple, _) = list_uses
+    if not (isinstance(extend, PrimitiveOp) and extend.desc is list_extend_op
+            and isinstance(to_tuple, PrimitiveOp) and to_tuple.desc is list_tuple_op
+            and extend not in uses):
+        return []
+    # The ops must follow each other directly, so that an error from
+    # extending the list happens at the same point as before.
+    block = next(block for block in ir.blocks if new_list in block.ops)
+    if extend not in block.ops or to_tuple not in block.ops:
+        return []
+    i = block.ops.index(extend)
+    if block.ops.index(new_list) > i or block.ops.index(to_tuple) != i + 1:
+        return []
+    iterable = extend.args[1]
+    if iterable.type.is_unboxed:
+        return []
+    # Change the op in place, since it has the same result type and error kind.
+    to_tuple.desc = sequence_tuple_op
+    to_tuple.args = [iterable]
+    return [new_list, extend]
+
+
+def is_empty_kwargs(new_dict: PrimitiveOp, uses: Uses) -> bool:
+    """Is new_dict only used as the keyword arguments of a Python call?"""
+    dict_uses = uses.get(new_dict, [])
+    if len(dict_uses) != 1:
+        return False
+    call, i = dict_uses[0]
+    return isinstance(call, PrimitiveOp) and call.desc is py_call_with_kwargs_op and i == 2
@@ -37,7 +37,8 @@ from mypy.nodes import (
     NamedTupleExpr, NewTypeExpr, NonlocalDecl, OverloadedFuncDef, PrintStmt, RaiseStmt,
     RevealExpr, SetExpr, SliceExpr, StarExpr, SuperExpr, TryStmt, TypeAliasExpr, TypeApplication,
     TypeVarExpr, TypedDictExpr, UnicodeExpr, WithStmt, YieldFromExpr, YieldExpr, GDEF, ARG_POS,
-    ARG_OPT, ARG_NAMED, ARG_STAR, ARG_NAMED_OPT, ARG_STAR2, is_class_var
+    ARG_OPT, ARG_NAMED, ARG_STAR, ARG_NAMED_OPT, ARG_STAR2, is_class_var, op_methods,
+    reverse_op_methods, unary_op_methods, ops_with_inplace_method
 )
 import mypy.nodes
 import mypy.errors
@@ -56,36 +57,52 @@ from mypyc.common import (
     FAST_ISINSTANCE_MAX_SUBCLASSES
 )
 from mypyc.prebuildvisitor import PreBuildVisitor
+from mypyc.attrdefined import analyze_always_defined_attrs, find_deleted_attrs
+from mypyc.acyclic import analyze_acyclic_classes
 from mypyc.ops import (
     BasicBlock, AssignmentTarget, AssignmentTargetRegister, AssignmentTargetIndex,
     AssignmentTargetAttr, AssignmentTargetTuple, Environment, Op, LoadInt, RType, Value, Register,
     Return, FuncIR, Assign, Branch, Goto, RuntimeArg, Call, Box, Unbox, Cast, RTuple, Unreachable,
     TupleGet, TupleSet, ClassIR, RInstance, ModuleIR, GetAttr, SetAttr, LoadStatic, InitStatic,
-    MethodCall, INVALID_FUNC_DEF, int_rprimitive, float_rprimitive, bool_rprimitive,
+    LoadFloat, MethodCall, INVALID_FUNC_DEF, int_rprimitive, float_rprimitive, bool_rprimitive,
     list_rprimitive, is_list_rprimitive, dict_rprimitive, set_rprimitive, str_rprimitive,
     tuple_rprimitive, none_rprimitive, is_none_rprimitive, object_rprimitive, exc_rtuple,
     is_tuple_rprimitive,
     PrimitiveOp, ControlOp, LoadErrorValue, ERR_FALSE, OpDescription, RegisterOp,
-    is_object_rprimitive, LiteralsMap, FuncSignature, VTableAttr, VTableMethod, VTableEntries,
+    is_object_rprimitive, LiteralsMap, LiteralValue, FuncSignature, VTableAttr, VTableMethod,
+    VTableEntries,
     NAMESPACE_TYPE, RaiseStandardError, LoadErrorValue, NO_TRACEBACK_LINE_NO, FuncDecl,
-    FUNC_NORMAL, FUNC_STATICMETHOD, FUNC_CLASSMETHOD,
-    RUnion, is_optional_type, optional_value_type, is_short_int_rprimitive, all_concrete_classes
+    FUNC_NORMAL, FUNC_STATICMETHOD, FUNC_CLASSMETHOD, is_float_rprimitive, is_int_rprimitive,
+    RUnion, is_optional_type, optional_value_type, is_short_int_rprimitive, all_concrete_classes,
+    int64_rprimitive, int32_rprimitive, is_int64_rprimitive, is_int32_rprimitive,
+    is_fixed_width_rtype, array_rprimitives, is_array_rprimitive, array_item_type,
+    is_bool_rprimitive, ConstantDefault, RPrimitive,
 )
 from mypyc.ops_primitive import binary_ops, unary_ops, func_ops, method_ops, name_ref_ops
 from mypyc.ops_int import unsafe_short_add
+from mypyc.ops_float import (
+    int_to_float_op, float_power_op, promoting_float_ops, float_comparison_ops
+)
+from mypyc.ops_fixed_int import (
+    promoting_fixed_width_ops, fixed_width_comparison_ops, fixed_width_ranges,
+    int_to_int64_op, int_to_int32_op, int64_to_int_op, int32_to_int_op, int32_to_int64_op,
+    int64_to_int32_op,
+)
 from mypyc.ops_list import (
     list_append_op, list_extend_op, list_len_op, new_list_op,
 )
-from mypyc.ops_tuple import list_tuple_op
+from mypyc.ops_tuple import list_tuple_op, tuple_get_item_op
 from mypyc.ops_dict import (
-    new_dict_op, dict_get_item_op, dict_set_item_op, dict_update_in_display_op,
+    new_dict_op, dict_get_item_op, dict_get_item_cached_op, dict_set_item_op,
+    dict_update_in_display_op,
 )
 from mypyc.ops_set import new_set_op, set_add_op, set_update_op
 from mypyc.ops_misc import (
     none_op, none_object_op, true_op, false_op, iter_op, next_op, next_raw_op,
     check_stop_op, send_op, yield_from_except_op,
-    py_getattr_op, py_setattr_op, py_delattr_op,
-    py_call_op, py_call_with_kwargs_op, py_method_call_op,
+    py_getattr_cached_op, py_module_getattr_cached_op, py_setattr_op, py_delattr_op,
+    py_call_op, py_call_with_kwargs_op, py_call_with_kwnames_op, py_method_call_op,
+    py_method_call_with_kwnames_op,
     fast_isinstance_op, bool_op, new_slice_op,
     type_op, pytype_from_template_op, import_op, get_module_dict_op,
     ellipsis_op, method_new_op, type_is_op,
@@ -95,7 +112,14 @@ from mypyc.ops_exc import (
     error_catch_op, restore_exc_info_op, exc_matches_op, get_exc_value_op,
     get_exc_info_op, keep_propagating_op,
 )
-from mypyc.genops_for import ForGenerator, ForRange, ForList, ForIterable, ForEnumerate, ForZip
+from mypyc.ops_memo import memo_key_type, memo_new_op, memo_lookup_op, memo_store_op
+from mypyc.genops_dataclass import (
+    DataclassGenerator, is_dataclass_decorator, is_plugin_generated, check_dataclass_options,
+    dataclass_options, prepare_dataclass, has_generated_init
+)
+from mypyc.genops_for import (
+    ForGenerator, ForRange, ForList, ForArray, ForIterable, ForEnumerate, ForZip
+)
 from mypyc.rt_subtype import is_runtime_subtype
 from mypyc.subtype import is_subtype
 from mypyc.sametype import is_same_type, is_same_method_signature
@@ -155,6 +179,16 @@ def build_ir(modules: List[MypyFile],
         with catch_errors(module.path, cdef.line):
             prepare_class_def(module.path, module.fullname(), cdef, errors, mapper)
 
+    # Find the always defined attributes before generating any code, since this
+    # determines whether attribute reads can fail.
+    defaults = {}  # type: Dict[ClassIR, Set[str]]
+    for module, cdef in classes:
+        cl = mapper.type_to_ir[cdef.info]
+        defaults[cl] = {cast(NameExpr, stmt.lvalues[0]).name
+                        for stmt in attr_default_assignments(mapper, cdef.info)
+                        if not is_ignored_none_default(cl, stmt)}
+    analyze_always_defined_attrs(defaults, find_deleted_attrs(modules, types, mapper.type_to_ir))
+
     # Collect all the functions also. We collect from the symbol table
     # so that we can easily pick out the right copy of a function that
     # is conditionally defined.
@@ -165,7 +199,11 @@ def build_ir(modules: List[MypyFile],
             # checking that the fullname matches.
             if (isinstance(node.node, (FuncDef, Decorator, OverloadedFuncDef))
                     and node.fullname == module.fullname() + '.' + name):
-                prepare_func_def(module.fullname(), None, get_func_def(node.node), mapper)
+                decl = prepare_func_def(module.fullname(), None, get_func_def(node.node), mapper)
+                if (isinstance(node.node, Decorator) and node.node.decorators
+                        and not is_memoized_func(node.node)):
+                    # The undecorated function is compiled as a helper function
+                    decl.name = decorator_helper_name(decl.name)
             # TODO: what else?
 
     # Generate IR for all modules.
@@ -192,6 +230,10 @@ def build_ir(modules: List[MypyFile],
     # Compute vtables.
     for cir in class_irs:
         compute_vtable(cir)
+        if cir.freelist_size is None:
+            cir.freelist_size = options.freelist_size
+
+    analyze_acyclic_classes(class_irs)
 
     errors.flush_errors()
 
@@ -203,6 +245,84 @@ def is_trait(cdef: ClassDef) -> bool:
                if isinstance(d, NameExpr))
 
 
+def is_freelist_decorator(d: Expression) -> bool:
+    return (isinstance(d, CallExpr)
+            and isinstance(d.callee, RefExpr)
+            and d.callee.fullname == 'mypyc_extensions.freelist')
+
+
+def is_transparent_decorator(d: Expression, options: CompilerOptions) -> bool:
+    """Does a decorator return a function that behaves like the decorated function?
+
+    Decorators are marked as transparent using mypyc_extensions.transparent_decorator
+    or CompilerOptions.transparent_decorators. A call to a decorator factory
+    is transparent if the factory is marked.
+    """
+    if isinstance(d, CallExpr):
+        d = d.callee
+    if not isinstance(d, RefExpr):
+        return False
+    if d.fullname in options.transparent_decorators:
+        return True
+    return (isinstance(d.node, Decorator)
+            and any(isinstance(marker, RefExpr)
+                    and marker.fullname == 'mypyc_extensions.transparent_decorator'
+                    for marker in d.node.original_decorators))
+
+
+def is_memoize_decorator(d: Expression) -> bool:
+    """Is a decorator a call to mypyc_extensions.memoize with a literal maxsize (if any)?"""
+    if not (isinstance(d, CallExpr)
+            and isinstance(d.callee, RefExpr)
+            and d.callee.fullname == 'mypyc_extensions.memoize'):
+        return False
+    if not d.args:
+        return True
+    return (len(d.args) == 1
+            and (d.arg_kinds[0] == ARG_POS or d.arg_names[0] == 'maxsize')
+            and (isinstance(d.args[0], IntExpr)
+                 or (isinstance(d.args[0], NameExpr) and d.args[0].fullname == 'builtins.None')))
+
+
+def memoize_maxsize(d: CallExpr) -> Optional[int]:
+    """Return the maximum cache size of a memoize decorator (None if unbounded)."""
+    if not d.args:
+        return 128
+    arg = d.args[0]
+    return arg.value if isinstance(arg, IntExpr) else None
+
+
+def is_memoized_func(dec: Decorator) -> bool:
+    """Is a function cached natively using a memoize decorator?
+
+    This is only supported for module-level functions with no other decorators
+    that only have positional arguments. Other memoized functions are
+    decorated with functools.lru_cache at runtime.
+    """
+    fdef = dec.func
+    return (len(dec.decorators) == 1
+            and is_memoize_decorator(dec.decorators[0])
+            and not fdef.is_generator
+            and not fdef.is_coroutine
+            and all(kind in (ARG_POS, ARG_OPT) for kind in fdef.arg_kinds))
+
+
+def memo_static_name(fdef: FuncDef) -> str:
+    return '{}.__mypyc_memo__'.format(fdef.fullname())
+
+
+def is_fixed_width_int_call(e: Expression) -> bool:
+    """Is an expression of form i64(x) or i32(x)?
+
+    Since fixed-width integer types are int subclasses for mypy, constants
+    of these types have to be written as calls.
+    """
+    return (isinstance(e, CallExpr)
+            and isinstance(e.callee, RefExpr)
+            and e.callee.fullname in ('mypyc_extensions.i64', 'mypyc_extensions.i32')
+            and e.arg_kinds == [ARG_POS])
+
+
 def get_func_def(op: Union[FuncDef, Decorator, OverloadedFuncDef]) -> FuncDef:
     if isinstance(op, OverloadedFuncDef):
         assert op.impl
@@ -317,6 +437,12 @@ class Mapper:
                 return int_rprimitive
             elif typ.type.fullname() == 'builtins.float':
                 return float_rprimitive
+            elif typ.type.fullname() == 'mypyc_extensions.i64':
+                return int64_rprimitive
+            elif typ.type.fullname() == 'mypyc_extensions.i32':
+                return int32_rprimitive
+            elif typ.type.fullname() in array_rprimitives:
+                return array_rprimitives[typ.type.fullname()]
             elif typ.type.fullname() == 'builtins.str':
                 return str_rprimitive
             elif typ.type.fullname() == 'builtins.bool':
@@ -375,9 +501,18 @@ class Mapper:
         # actually show up, so anything else is a bug somewhere.
         assert False, 'unexpected type %s' % type(typ)
 
+    def arg_to_rtype(self, typ: Optional[Type], arg: Argument) -> RType:
+        rtype = self.type_to_rtype(typ)
+        if is_fixed_width_rtype(rtype) and arg.initializer is not None:
+            # A missing optional argument is passed as the error value, but for
+            # fixed-width integers it can't be distinguished from a valid value.
+            return object_rprimitive
+        return rtype
+
     def fdef_to_sig(self, fdef: FuncDef) -> FuncSignature:
         if isinstance(fdef.type, CallableType):
-            arg_types = [self.type_to_rtype(arg) for arg in fdef.type.arg_types]
+            arg_types = [self.arg_to_rtype(typ, arg)
+                         for typ, arg in zip(fdef.type.arg_types, fdef.arguments)]
             ret = self.type_to_rtype(fdef.type.ret_type)
         else:
             # Handle unannotated functions
@@ -394,11 +529,16 @@ class Mapper:
             ret = object_rprimitive
         return FuncSignature(args, ret)
 
-    def literal_static_name(self, value: Union[int, float, complex, str, bytes]) -> str:
+    def literal_static_name(self, value: LiteralValue) -> str:
         # Include type to distinguish between 1 and 1.0, and so on.
         key = (type(value), value)
         if key not in self.literals:
-            if isinstance(value, str):
+            if isinstance(value, tuple):
+                # The items are initialized before the tuple, so they must come first
+                for item in value:
+                    self.literal_static_name(item)
+                prefix = 'kwnames_'
+            elif isinstance(value, str):
                 prefix = 'unicode_'
             else:
                 prefix = type(value).__name__ + '_'
@@ -430,6 +570,16 @@ def prepare_method_def(ir: ClassIR, module_name: str, cdef: ClassDef, mapper: Ma
             ir.property_types[node.name()] = decl.sig.ret_type
 
 
+def is_inherited_attribute(info: TypeInfo, name: str, mapper: Mapper) -> bool:
+    """Is an attribute redefined in a class already stored in the struct of a base class?"""
+    for base in info.mro[1:]:
+        if base in mapper.type_to_ir and not mapper.type_to_ir[base].is_trait:
+            node = base.names[name].node if name in base.names else None
+            if isinstance(node, Var) and not node.is_classvar:
+                return True
+    return False
+
+
 def prepare_class_def(path: str, module_name: str, cdef: ClassDef,
                       errors: Errors, mapper: Mapper) -> None:
     # The metaclass chain for GenericMeta all works, but in general they don't
@@ -437,15 +587,27 @@ def prepare_class_def(path: str, module_name: str, cdef: ClassDef,
             'abc.ABCMeta', 'typing.TypingMeta', 'typing.GenericMeta')):
         errors.error("Metaclasses are not supported", path, cdef.line)
     if any(not (isinstance(d, NameExpr) and d.fullname == 'mypy_extensions.trait')
+           and not is_dataclass_decorator(d)
+           and not is_freelist_decorator(d)
            for d in cdef.decorators):
         errors.error("Class decorators are not supported", path, cdef.line)
+    for arg in check_dataclass_options(cdef):
+        errors.error("Unsupported dataclass option", path, arg.line)
 
     ir = mapper.type_to_ir[cdef.info]
+    for d in cdef.decorators:
+        if is_freelist_decorator(d):
+            assert isinstance(d, CallExpr)
+            if len(d.args) != 1 or not isinstance(d.args[0], IntExpr):
+                errors.error("freelist() expects an integer literal", path, d.line)
+            else:
+                ir.freelist_size = d.args[0].value
     info = cdef.info
     for name, node in info.names.items():
         if isinstance(node.node, Var):
             assert node.node.type, "Class member missing type"
-            if not node.node.is_classvar and name != '__slots__':
+            if (not node.node.is_classvar and name != '__slots__'
+                    and not is_inherited_attribute(info, name, mapper)):
                 ir.attributes[name] = mapper.type_to_rtype(node.node.type)
         elif isinstance(node.node, (FuncDef, Decorator)):
             prepare_method_def(ir, module_name, cdef, mapper, node.node)
@@ -453,6 +615,9 @@ def prepare_class_def(path: str, module_name: str, cdef: ClassDef,
             assert node.node.impl
             prepare_method_def(ir, module_name, cdef, mapper, node.node.impl)
 
+    if dataclass_options(cdef) is not None:
+        prepare_dataclass(ir, module_name, cdef)
+
     # Check for subclassing from builtin types
     for cls in info.mro:
         # Special case exceptions and dicts
@@ -525,6 +690,48 @@ def prepare_class_def(path: str, module_name: str, cdef: ClassDef,
             base.has_bool = True
 
 
+def attr_default_assignments(mapper: Mapper, info: TypeInfo) -> List[AssignmentStmt]:
+    """Find the assignments in class bodies that give default values to attributes.
+
+    Include all the assignments in classes in the mro. Assignments in
+    subclasses take precedence over those in base classes.
+    """
+    # TODO: Support nested statements
+    default_assignments = []
+    assigned = set()  # type: Set[str]
+    for base in info.mro:
+        if base not in mapper.type_to_ir:
+            continue
+        if has_generated_init(base):
+            # The generated dataclass __init__ sets the default values
+            continue
+        for stmt in base.defn.defs.body:
+            if (isinstance(stmt, AssignmentStmt)
+                    and isinstance(stmt.lvalues[0], NameExpr)
+                    and not is_class_var(stmt.lvalues[0])
+                    and not isinstance(stmt.rvalue, TempNode)):
+                name = stmt.lvalues[0].name
+                if name == '__slots__' or name in assigned:
+                    continue
+
+                assigned.add(name)
+                default_assignments.append(stmt)
+    return default_assignments
+
+
+def is_ignored_none_default(cls: ClassIR, stmt: AssignmentStmt) -> bool:
+    """Is a default value None for an attribute with a type that doesn't allow None?
+
+    Such attributes are left undefined.
+    """
+    lvalue = stmt.lvalues[0]
+    assert isinstance(lvalue, NameExpr)
+    attr_type = cls.attr_type(lvalue.name)
+    return (isinstance(stmt.rvalue, RefExpr) and stmt.rvalue.fullname == 'builtins.None'
+            and not is_optional_type(attr_type) and not is_object_rprimitive(attr_type)
+            and not is_none_rprimitive(attr_type))
+
+
 class FuncInfo(object):
     """Contains information about functions as they are generated."""
     def __init__(self,
@@ -783,6 +990,8 @@ class GeneratorNonlocalControl(BaseNonlocalControl):
         # StopIteration isn't caught by except blocks inside of the generator function.
         builder.error_handlers.append(None)
         builder.goto_new_block()
+        # The value is stored in the StopIteration object, so it needs to be boxed.
+        value = builder.coerce(value, object_rprimitive, line)
         builder.add(RaiseStandardError(RaiseStandardError.STOP_ITERATION, value,
                                        line))
         builder.add(Unreachable())
@@ -822,6 +1031,11 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         self.encapsulating_fitems = pbv.encapsulating_funcs
         self.nested_fitems = pbv.nested_funcs
         self.fdefs_to_decorators = pbv.funcs_to_decorators
+        self.redefined_fdefs = pbv.redefined_funcs
+
+        # Maps nested FuncDefs to the '__call__' methods of their callable classes, for functions
+        # that can be called natively.
+        self.nested_fdef_call_decls = {}  # type: Dict[FuncDef, FuncDecl]
 
         # This list operates similarly to a function call stack for nested functions. Whenever a
         # function definition begins to be generated, a FuncInfo instance is added to the stack,
@@ -930,6 +1144,8 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                     and isinstance(e.expr, (IntExpr, FloatExpr)))
                 or (isinstance(e, TupleExpr)
                     and all(self.is_approximately_constant(e) for e in e.items))
+                or (isinstance(e, CallExpr) and is_fixed_width_int_call(e)
+                    and self.is_approximately_constant(e.args[0]))
                 or (isinstance(e, RefExpr) and e.kind == GDEF
                     and (e.fullname in ('builtins.True', 'builtins.False', 'builtins.None')
                          or (isinstance(e.node, Var) and e.node.is_final))))
@@ -940,21 +1156,11 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         if cls.builtin_base:
             return
 
-        # Pull out all assignments in classes in the mro so we can initialize them
-        # TODO: Support nested statements
-        default_assignments = []
-        for info in cdef.info.mro:
-            if info not in self.mapper.type_to_ir:
-                continue
-            for stmt in info.defn.defs.body:
-                if (isinstance(stmt, AssignmentStmt)
-                        and isinstance(stmt.lvalues[0], NameExpr)
-                        and not is_class_var(stmt.lvalues[0])
-                        and not isinstance(stmt.rvalue, TempNode)):
-                    if stmt.lvalues[0].name == '__slots__':
-                        continue
-
-                    default_assignments.append(stmt)
+        # Constant values are copied from the instance template instead
+        default_assignments = [
+            stmt for stmt in attr_default_assignments(self.mapper, cdef.info)
+            if not self.add_constant_default(cls, stmt)
+        ]
 
         if not default_assignments:
             return
@@ -973,12 +1179,10 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
 
             # If the attribute is initialized to None and type isn't optional,
             # don't initialize it to anything.
-            attr_type = cls.attr_type(lvalue.name)
-            if isinstance(stmt.rvalue, RefExpr) and stmt.rvalue.fullname == 'builtins.None':
-                if (not is_optional_type(attr_type) and not is_object_rprimitive(attr_type)
-                        and not is_none_rprimitive(attr_type)):
-                    continue
+            if is_ignored_none_default(cls, stmt):
+                continue
 
+            attr_type = cls.attr_type(lvalue.name)
             val = self.coerce(self.accept(stmt.rvalue), attr_type, stmt.line)
             self.add(SetAttr(self_var, lvalue.name, val, -1))
 
@@ -993,11 +1197,53 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         self.functions.append(ir)
         cls.methods[ir.name] = ir
 
+    def add_constant_default(self, cls: ClassIR, stmt: AssignmentStmt) -> bool:
+        """Add a default attribute value to the instance template if it's a constant.
+
+        Return False if the value must be assigned by __mypyc_defaults_setup.
+        """
+        lvalue = stmt.lvalues[0]
+        assert isinstance(lvalue, NameExpr)
+        attr_type = cls.attr_type(lvalue.name)
+        e = stmt.rvalue
+        if isinstance(e, CallExpr) and is_fixed_width_int_call(e):
+            e = e.args[0]
+        value = None  # type: ConstantDefault
+        if isinstance(e, (IntExpr, FloatExpr, StrExpr)):
+            value = e.value
+        elif (isinstance(e, UnaryExpr) and e.op == '-'
+              and isinstance(e.expr, (IntExpr, FloatExpr))):
+            value = -e.expr.value
+        elif isinstance(e, RefExpr) and e.fullname in ('builtins.True', 'builtins.False'):
+            value = e.fullname == 'builtins.True'
+        elif not (isinstance(e, RefExpr) and e.fullname == 'builtins.None'):
+            return False
+
+        if isinstance(value, bool):
+            ok = is_bool_rprimitive(attr_type)
+        elif isinstance(value, int):
+            ok = ((is_int_rprimitive(attr_type) or is_fixed_width_rtype(attr_type))
+                  and abs(value) <= MAX_LITERAL_SHORT_INT)
+        elif isinstance(value, float):
+            ok = is_float_rprimitive(attr_type)
+        elif isinstance(value, str):
+            ok = not attr_type.is_unboxed and is_subtype(str_rprimitive, attr_type)
+            value = self.mapper.literal_static_name(value)
+        else:
+            ok = is_none_rprimitive(attr_type) or (not attr_type.is_unboxed
+                                                   and is_subtype(none_rprimitive, attr_type))
+        if ok:
+            cls.constant_defaults[lvalue.name] = value
+        return ok
+
     def visit_class_def(self, cdef: ClassDef) -> None:
         self.allocate_class(cdef)
 
         for stmt in cdef.defs.body:
             if isinstance(stmt, (FuncDef, Decorator, OverloadedFuncDef)):
+                if is_plugin_generated(cdef.info, stmt.name()):
+                    # Method stubs added by the dataclasses plugin
+                    continue
                 with self.catch_errors(stmt.line):
                     self.visit_method(cdef, get_func_def(stmt))
             elif isinstance(stmt, PassStmt):
@@ -1031,6 +1277,12 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             else:
                 self.error("Unsupported statement in class body", stmt.line)
 
+        options = dataclass_options(cdef)
+        if options is not None:
+            dataclass_gen = DataclassGenerator(self, cdef, options)
+            dataclass_gen.gen_methods()
+            dataclass_gen.gen_metadata()
+
         self.generate_attr_defaults(cdef)
         self.create_ne_from_eq(cdef)
 
@@ -1266,6 +1518,46 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             cls.methods['__ne__'] = f
             self.functions.append(f)
 
+    def gen_memo_wrapper(self, fdef: FuncDef, impl: FuncDecl) -> FuncIR:
+        """Generate a function that calls a memoized function through its cache.
+
+        Both native and Python callers call this function, so the arguments
+        with default values are filled in before they are used as the key.
+        """
+        decl = self.mapper.func_to_decl[fdef]
+        line = fdef.line
+        self.enter(FuncInfo(fdef, fdef.name()))
+        self.add_args_to_env(local=True)
+        self.gen_arg_default()
+        self.ret_types[-1] = decl.sig.ret_type
+
+        args = [self.read(self.environment.lookup(arg.variable), line)
+                for arg in fdef.arguments]
+        key_types = [arg.type for arg in args]
+        key = [self.coerce(arg, memo_key_type(arg.type), line) for arg in args]
+
+        # The cache is created when the definition of the function is executed
+        no_memo_block, lookup_block = BasicBlock(), BasicBlock()
+        memo = self.add(LoadStatic(object_rprimitive, memo_static_name(fdef), 'final', line=line))
+        self.add(Branch(memo, no_memo_block, lookup_block, Branch.IS_ERROR, rare=True))
+        self.activate_block(no_memo_block)
+        self.add(Return(self.add(Call(impl, args, line))))
+
+        self.activate_block(lookup_block)
+        cached = self.primitive_op(memo_lookup_op(key_types), [memo] + key, line)
+        miss_block, hit_block = BasicBlock(), BasicBlock()
+        self.add_bool_branch(self.binary_op(cached, memo, 'is', line), miss_block, hit_block)
+        self.activate_block(hit_block)
+        self.add(Return(self.coerce(cached, decl.sig.ret_type, line)))
+
+        self.activate_block(miss_block)
+        result = self.add(Call(impl, args, line))
+        self.primitive_op(memo_store_op(key_types), [memo, self.box(result)] + key, line)
+        self.add(Return(result))
+
+        blocks, env, _, _ = self.leave()
+        return FuncIR(decl, blocks, env)
+
     def gen_arg_default(self) -> None:
         """Generate blocks for arguments that have default values.
 
@@ -1353,6 +1645,12 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
 
         if self.fn_info.is_nested:
             self.setup_callable_class()
+            # Declare '__call__' before generating the body so that recursive calls can be native.
+            # Calls to decorated and conditionally defined functions go through Python.
+            if (isinstance(fitem, FuncDef) and not is_decorated
+                    and fitem not in self.redefined_fdefs):
+                self.nested_fdef_call_decls[fitem] = self.callable_class_call_decl(self.fn_info,
+                                                                                   sig)
 
         # Functions that contain nested functions need an environment class to store variables that
         # are free in their nested functions. Generator functions need an environment class to
@@ -1420,7 +1718,12 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             func_reg = self.instantiate_callable_class(fn_info)
         else:
             assert isinstance(fn_info.fitem, FuncDef)
-            if fn_info.is_decorated:
+            decl = self.mapper.func_to_decl.get(fn_info.fitem)
+            if fn_info.is_decorated and (class_name is not None
+                                         or decl is None
+                                         or decl.name != fn_info.name):
+                # Decorated methods aren't called natively, so they have no declaration yet.
+                # The declaration of a memoized function is used by its caching wrapper.
                 func_decl = FuncDecl(fn_info.name, class_name, self.module_name, sig)
                 func_ir = FuncIR(func_decl, blocks, env)
             else:
@@ -1563,7 +1866,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                 return self.load_static_int(val)
             return self.add(LoadInt(val))
         elif isinstance(val, float):
-            return self.load_static_float(val)
+            return self.add(LoadFloat(val))
         elif isinstance(val, str):
             return self.load_static_unicode(val)
         elif isinstance(val, bytes):
@@ -1936,6 +2239,13 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             for_list.init(expr_reg, target_type, reverse=False)
             return for_list
 
+        if is_array_rprimitive(self.node_type(expr)):
+            # Special case "for x in <typed array>".
+            expr_reg = self.accept(expr)
+            for_array = ForArray(self, index, body_block, loop_exit, line, nested)
+            for_array.init(expr_reg, array_item_type(expr_reg.type), reverse=False)
+            return for_array
+
         if (isinstance(expr, CallExpr)
                 and isinstance(expr.callee, RefExpr)):
             if (expr.callee.fullname == 'builtins.range'
@@ -2002,6 +2312,16 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                 for_list.init(expr_reg, target_type, reverse=True)
                 return for_list
 
+            if (expr.callee.fullname == 'builtins.reversed'
+                    and len(expr.args) == 1
+                    and expr.arg_kinds == [ARG_POS]
+                    and is_array_rprimitive(self.node_type(expr.args[0]))):
+                # Special case "for x in reversed(<typed array>)".
+                expr_reg = self.accept(expr.args[0])
+                for_array = ForArray(self, index, body_block, loop_exit, line, nested)
+                for_array.init(expr_reg, array_item_type(expr_reg.type), reverse=True)
+                return for_array
+
         # Default to a generic for loop.
         expr_reg = self.accept(expr)
         for_obj = ForIterable(self, index, body_block, loop_exit, line, nested)
@@ -2020,6 +2340,12 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
     def visit_op_expr(self, expr: OpExpr) -> Value:
         if expr.op in ('and', 'or'):
             return self.shortcircuit_expr(expr)
+        if self.is_complex_float_power(expr):
+            # Python returns a complex number for a negative float raised to a
+            # fractional power, so the result is an object (see node_type)
+            left = self.coerce(self.accept(expr.left), float_rprimitive, expr.line)
+            right = self.coerce(self.accept(expr.right), float_rprimitive, expr.line)
+            return self.primitive_op(float_power_op, [left, right], expr.line)
         return self.binary_op(self.accept(expr.left), self.accept(expr.right), expr.op, expr.line)
 
     def matching_primitive_op(self,
@@ -2058,15 +2384,171 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                   rreg: Value,
                   expr_op: str,
                   line: int) -> Value:
+        target = self.translate_native_dunder_op(lreg, rreg, expr_op, line)
+        if target:
+            return target
+        if is_float_rprimitive(lreg.type) and self.can_promote_to_float(rreg, expr_op):
+            rreg = self.coerce(rreg, float_rprimitive, line)
+        elif is_float_rprimitive(rreg.type) and self.can_promote_to_float(lreg, expr_op):
+            lreg = self.coerce(lreg, float_rprimitive, line)
+        elif is_fixed_width_rtype(lreg.type) and (is_subtype(rreg.type, int_rprimitive)
+                                                  or is_fixed_width_rtype(rreg.type)):
+            lreg, rreg = self.promote_fixed_width_operands(lreg, rreg, expr_op, line)
+        elif is_fixed_width_rtype(rreg.type) and is_subtype(lreg.type, int_rprimitive):
+            rreg, lreg = self.promote_fixed_width_operands(rreg, lreg, expr_op, line)
         ops = binary_ops.get(expr_op, [])
         target = self.matching_primitive_op(ops, [lreg, rreg], line)
         assert target, 'Unsupported binary operation: %s' % expr_op
         return target
 
+    def translate_native_dunder_op(self,
+                                   lreg: Value,
+                                   rreg: Value,
+                                   expr_op: str,
+                                   line: int) -> Optional[Value]:
+        """Translate a binary operation to a direct call of a method of a native class.
+
+        Return None if Python might not use the method for the operation, for
+        example because another operand could take priority.
+        """
+        if expr_op == 'in':
+            return self.native_dunder_call(rreg, '__contains__', lreg, line)
+        if expr_op.endswith('=') and expr_op[:-1] in ops_with_inplace_method:
+            expr_op = expr_op[:-1]
+            inplace_method = '__i' + op_methods[expr_op][2:]
+            target = self.native_dunder_call(lreg, inplace_method, rreg, line)
+            if target:
+                return target
+            # A subclass could define the in-place method
+            if (isinstance(lreg.type, RInstance)
+                    and any(inplace_method in sub.method_decls
+                            for sub in lreg.type.class_ir.subclasses())):
+                return None
+        method = op_methods.get(expr_op)
+        if method is None:
+            return None
+        reverse = reverse_op_methods.get(method)
+        if isinstance(lreg.type, RInstance):
+            # Python calls the reverse method first if the right operand is an instance
+            # of a subclass that overrides it.
+            if (reverse is not None
+                    and not (isinstance(rreg.type, RPrimitive)
+                             and not is_object_rprimitive(rreg.type))
+                    and any(reverse in sub.method_decls
+                            for sub in lreg.type.class_ir.subclasses())):
+                return None
+            return self.native_dunder_call(lreg, method, rreg, line)
+        if reverse is not None and (is_int_rprimitive(lreg.type)
+                                    or is_short_int_rprimitive(lreg.type)
+                                    or is_float_rprimitive(lreg.type)
+                                    or is_bool_rprimitive(lreg.type)
+                                    or is_fixed_width_rtype(lreg.type)):
+            # Operations on these types return NotImplemented for native class
+            # instances, so the reverse method is used.
+            return self.native_dunder_call(rreg, reverse, lreg, line)
+        return None
+
+    def native_dunder_call(self, base: Value, name: str, arg: Value,
+                           line: int) -> Optional[Value]:
+        """Call an operator method of a native class instance directly if it's safe.
+
+        The method must accept the argument type, and it must not be able to
+        return NotImplemented, since the operation would then need to try the
+        other operand.
+        """
+        if not isinstance(base.type, RInstance) or base.type.class_ir.builtin_base:
+            return None
+        if not base.type.class_ir.has_method(name):
+            return None
+        decl = base.type.class_ir.method_decl(name)
+        args = decl.sig.args
+        if (decl.kind != FUNC_NORMAL
+                or len(args) != 2
+                or args[1].kind not in (ARG_POS, ARG_OPT)
+                or not is_subtype(arg.type, args[1].type)
+                or is_object_rprimitive(decl.sig.ret_type)
+                or (name == '__contains__' and not is_bool_rprimitive(decl.sig.ret_type))):
+            return None
+        return self.gen_method_call(base, name, [arg], decl.sig.ret_type, line)
+
+    def can_promote_to_float(self, value: Value, expr_op: str) -> bool:
+        """Can an int operand be converted to a float if the other operand is a float?
+
+        Python does this for arithmetic, but comparisons between ints and
+        floats are exact, so only int literals that are exactly representable
+        as floats are converted for comparisons.
+        """
+        if not is_subtype(value.type, int_rprimitive):
+            return False
+        if expr_op in promoting_float_ops:
+            return True
+        return (expr_op in float_comparison_ops and isinstance(value, LoadInt)
+                and abs(value.value) <= 2 ** 53)
+
+    def is_complex_float_power(self, expr: OpExpr) -> bool:
+        """Can expr be a float raised to a power with a complex result?
+
+        A negative float raised to a fractional power is a complex number.
+        This can't happen if the exponent is an integral literal or the base
+        is a non-negative literal.
+        """
+        if expr.op != '**':
+            return False
+        types = [self.node_type(expr.left), self.node_type(expr.right)]
+        if not (any(is_float_rprimitive(t) for t in types)
+                and all(is_float_rprimitive(t) or is_int_rprimitive(t) for t in types)):
+            return False
+        exponent = expr.right
+        if isinstance(exponent, UnaryExpr) and exponent.op == '-':
+            exponent = exponent.expr
+        if isinstance(exponent, IntExpr) or (isinstance(exponent, FloatExpr)
+                                             and exponent.value.is_integer()):
+            return False
+        return not isinstance(expr.left, (IntExpr, FloatExpr))
+
+    def promote_fixed_width_operands(self, fixed: Value, other: Value, expr_op: str,
+                                     line: int) -> Tuple[Value, Value]:
+        """Convert operands of a binary op so that a primitive op can be used.
+
+        Here fixed is a fixed-width integer and other is an int or a fixed-width
+        integer. For arithmetic and bitwise operations, other is converted to
+        the type of fixed, which raises OverflowError if it doesn't fit. The
+        result has the type of the left operand if both are fixed-width integers,
+        like in interpreted code. Comparisons have to be exact, so they are
+        performed on ints unless the int operand is a literal that fits in the
+        fixed-width type.
+        """
+        if is_fixed_width_rtype(other.type):
+            if expr_op in fixed_width_comparison_ops:
+                # Widening an i32 doesn't change the value
+                return (self.coerce(fixed, int64_rprimitive, line),
+                        self.coerce(other, int64_rprimitive, line))
+            if expr_op in promoting_fixed_width_ops:
+                return fixed, self.coerce(other, fixed.type, line)
+            return fixed, other
+        if expr_op in promoting_fixed_width_ops:
+            return fixed, self.coerce(other, fixed.type, line)
+        if expr_op in fixed_width_comparison_ops:
+            if isinstance(other, LoadInt) and self.fits_fixed_width(other.value, fixed.type):
+                return fixed, self.coerce(other, fixed.type, line)
+            return self.coerce(fixed, int_rprimitive, line), other
+        return fixed, other
+
+    def fits_fixed_width(self, value: int, rtype: RType) -> bool:
+        lo, hi = fixed_width_ranges[rtype.name]
+        return lo <= value <= hi
+
     def unary_op(self,
                  lreg: Value,
                  expr_op: str,
                  line: int) -> Value:
+        if isinstance(lreg.type, RInstance) and expr_op in unary_op_methods:
+            method = unary_op_methods[expr_op]
+            class_ir = lreg.type.class_ir
+            if (not class_ir.builtin_base and class_ir.has_method(method)
+                    and class_ir.method_decl(method).kind == FUNC_NORMAL
+                    and len(class_ir.method_sig(method).args) == 1):
+                return self.gen_method_call(lreg, method, [], None, line)
         ops = unary_ops.get(expr_op, [])
         target = self.matching_primitive_op(ops, [lreg], line)
         assert target, 'Unsupported unary operation: %s' % expr_op
@@ -2088,7 +2570,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         return self.add(LoadInt(expr.value))
 
     def visit_float_expr(self, expr: FloatExpr) -> Value:
-        return self.load_static_float(expr.value)
+        return self.add(LoadFloat(expr.value))
 
     def visit_complex_expr(self, expr: ComplexExpr) -> Value:
         return self.load_static_complex(expr.value)
@@ -2207,11 +2689,33 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                 return value
 
         if self.is_module_member_expr(expr):
+            if expr.fullname in name_ref_ops:
+                desc = name_ref_ops[expr.fullname]
+                return self.add(PrimitiveOp([], desc, expr.line))
             return self.load_module_attr(expr)
         else:
             obj = self.accept(expr.expr)
+            index = self.named_tuple_field_index(expr)
+            if index is not None and is_tuple_rprimitive(obj.type):
+                # Named tuple fields are read directly from the tuple items
+                item = self.primitive_op(tuple_get_item_op, [obj, self.add(LoadInt(index))],
+                                         expr.line)
+                return self.unbox_or_cast(item, self.node_type(expr), expr.line)
             return self.get_attr(obj, expr.name, self.node_type(expr), expr.line)
 
+    def named_tuple_field_index(self, expr: MemberExpr) -> Optional[int]:
+        """If expr reads a NamedTuple field, return the index of the field."""
+        typ = self.types.get(expr.expr)
+        if not isinstance(typ, TupleType) or not typ.partial_fallback.type.is_named_tuple:
+            return None
+        new = typ.partial_fallback.type.get('__new__')
+        if new is None or not isinstance(new.node, FuncDef):
+            return None
+        names = [arg.variable.name() for arg in new.node.arguments[1:]]
+        if len(names) != len(typ.items) or expr.name not in names:
+            return None
+        return names.index(expr.name)
+
     def get_attr(self, obj: Value, attr: str, result_type: RType, line: int) -> Value:
         if isinstance(obj.type, RInstance) and obj.type.class_ir.has_attr(attr):
             return self.add(GetAttr(obj, attr, line))
@@ -2331,7 +2835,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
 
     def py_get_attr(self, obj: Value, attr: str, line: int) -> Value:
         key = self.load_static_unicode(attr)
-        return self.add(PrimitiveOp([obj, key], py_getattr_op, line))
+        return self.add(PrimitiveOp([obj, key], py_getattr_cached_op, line))
 
     def py_call(self,
                 function: Value,
@@ -2344,9 +2848,16 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         if (arg_kinds is None) or all(kind == ARG_POS for kind in arg_kinds):
             return self.primitive_op(py_call_op, [function] + arg_values, line)
 
-        # Otherwise fallback to py_call_with_kwargs_op.
         assert arg_names is not None
 
+        # If there are no star args, pass the keyword argument values on the stack
+        # after the positional ones, with a static tuple of their names.
+        if all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds):
+            values, kwnames = self.split_kwnames_args(arg_values, arg_kinds, arg_names)
+            return self.primitive_op(py_call_with_kwnames_op, [function, kwnames] + values, line)
+
+        # Otherwise fallback to py_call_with_kwargs_op.
+
         pos_arg_values = []
         kw_arg_key_value_pairs = []  # type: List[DictEntry]
         star_arg_values = []
@@ -2392,10 +2903,37 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         if (arg_kinds is None) or all(kind == ARG_POS for kind in arg_kinds):
             method_name_reg = self.load_static_unicode(method_name)
             return self.primitive_op(py_method_call_op, [obj, method_name_reg] + arg_values, line)
+        elif all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds):
+            assert arg_names is not None
+            method_name_reg = self.load_static_unicode(method_name)
+            values, kwnames = self.split_kwnames_args(arg_values, arg_kinds, arg_names)
+            return self.primitive_op(py_method_call_with_kwnames_op,
+                                     [obj, method_name_reg, kwnames] + values, line)
         else:
             method = self.py_get_attr(obj, method_name, line)
             return self.py_call(method, arg_values, line, arg_kinds=arg_kinds, arg_names=arg_names)
 
+    def split_kwnames_args(self,
+                           arg_values: List[Value],
+                           arg_kinds: List[int],
+                           arg_names: List[Optional[str]]) -> Tuple[List[Value], Value]:
+        """Order positional and keyword arguments for a call that uses a kwnames tuple.
+
+        Return the positional argument values followed by the keyword argument
+        values, and the static tuple of keyword argument names.
+        """
+        pos_values = []
+        kw_values = []
+        names = []  # type: List[str]
+        for value, kind, name in zip(arg_values, arg_kinds, arg_names):
+            if kind == ARG_POS:
+                pos_values.append(value)
+            else:
+                assert name is not None
+                kw_values.append(value)
+                names.append(name)
+        return pos_values + kw_values, self.load_static_kwnames(tuple(names))
+
     def coerce_native_call_args(self,
                                 args: Sequence[Value],
                                 sig: FuncSignature,
@@ -2439,9 +2977,59 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             return self.translate_refexpr_call(expr, callee)
 
         function = self.accept(callee)
-        args = [self.accept(arg) for arg in expr.args]
-        return self.py_call(function, args, expr.line,
-                            arg_kinds=expr.arg_kinds, arg_names=expr.arg_names)
+        args, arg_kinds, arg_names = self.accept_call_args(expr)
+        return self.py_call(function, args, expr.line, arg_kinds=arg_kinds, arg_names=arg_names)
+
+    def accept_call_args(
+            self, expr: CallExpr) -> Tuple[List[Value], List[int], List[Optional[str]]]:
+        """Generate IR for the arguments of a call, expanding statically known star args.
+
+        A *args argument of a fixed-length tuple type (such as a tuple display)
+        is passed as positional arguments, and a **kwargs dict display with
+        string literal keys is passed as keyword arguments. This way calls can
+        be native and no tuple or dict is created.
+
+        Return the argument values, kinds and names.
+        """
+        values = []  # type: List[Value]
+        kinds = []  # type: List[int]
+        names = []  # type: List[Optional[str]]
+        # Names of keyword arguments, so that a keyword given twice is left to Python to report
+        seen_names = {name for name, kind in zip(expr.arg_names, expr.arg_kinds)
+                      if kind == ARG_NAMED}
+        for arg, kind, name in zip(expr.args, expr.arg_kinds, expr.arg_names):
+            if (kind == ARG_STAR
+                    and isinstance(arg, TupleExpr)
+                    and not any(isinstance(item, StarExpr) for item in arg.items)):
+                for item in arg.items:
+                    values.append(self.accept(item))
+                    kinds.append(ARG_POS)
+                    names.append(None)
+            elif kind == ARG_STAR2 and isinstance(arg, DictExpr) and all(
+                    isinstance(key, StrExpr) for key, _ in arg.items):
+                keys = [cast(StrExpr, key).value for key, _ in arg.items]
+                if len(set(keys)) != len(keys) or seen_names & set(keys):
+                    values.append(self.accept(arg))
+                    kinds.append(kind)
+                    names.append(name)
+                    continue
+                seen_names.update(keys)
+                for key, (_, item) in zip(keys, arg.items):
+                    values.append(self.accept(item))
+                    kinds.append(ARG_NAMED)
+                    names.append(key)
+            else:
+                value = self.accept(arg)
+                if kind == ARG_STAR and isinstance(value.type, RTuple):
+                    for i in range(len(value.type.types)):
+                        values.append(self.add(TupleGet(value, i, arg.line)))
+                        kinds.append(ARG_POS)
+                        names.append(None)
+                else:
+                    values.append(value)
+                    kinds.append(kind)
+                    names.append(name)
+        return values, kinds, names
 
     def translate_refexpr_call(self, expr: CallExpr, callee: RefExpr) -> Value:
         """Translate a non-method call."""
@@ -2456,34 +3044,60 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                 return val
 
         # Gen the argument values
-        arg_values = [self.accept(arg) for arg in expr.args]
+        arg_values, arg_kinds, arg_names = self.accept_call_args(expr)
 
-        return self.call_refexpr_with_args(expr, callee, arg_values)
+        return self.call_refexpr_with_args(expr, callee, arg_values, arg_kinds, arg_names)
 
     def call_refexpr_with_args(
-            self, expr: CallExpr, callee: RefExpr, arg_values: List[Value]) -> Value:
+            self, expr: CallExpr, callee: RefExpr, arg_values: List[Value],
+            arg_kinds: Optional[List[int]] = None,
+            arg_names: Optional[List[Optional[str]]] = None) -> Value:
+        """Generate IR for a call with evaluated arguments.
+
+        The argument kinds and names default to those of the call expression.
+        """
+        if arg_kinds is None or arg_names is None:
+            arg_kinds, arg_names = expr.arg_kinds, expr.arg_names
 
         # Handle data-driven special-cased primitive call ops.
-        if callee.fullname is not None and expr.arg_kinds == [ARG_POS] * len(arg_values):
+        if callee.fullname is not None and arg_kinds == [ARG_POS] * len(arg_values):
             ops = func_ops.get(callee.fullname, [])
             target = self.matching_primitive_op(ops, arg_values, expr.line, self.node_type(expr))
             if target:
                 return target
 
+        # Calls to a function whose decorators are all transparent can call the undecorated
+        # function directly. Calls to a memoized function call the wrapper that uses the cache.
+        node = callee.node
+        if (isinstance(node, Decorator)
+                and (all(is_transparent_decorator(d, self.options) for d in node.decorators)
+                     or is_memoized_func(node))):
+            node = node.func
+
         # Standard native call if signature and fullname are good and all arguments are positional
         # or named.
-        if (callee.node is not None
+        if (node is not None
                 and callee.fullname is not None
-                and callee.node in self.mapper.func_to_decl
-                and all(kind in (ARG_POS, ARG_NAMED) for kind in expr.arg_kinds)):
-            decl = self.mapper.func_to_decl[callee.node]
-
-            return self.call(decl, arg_values, expr.arg_kinds, expr.arg_names, expr.line)
+                and node in self.mapper.func_to_decl
+                and all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds)):
+            decl = self.mapper.func_to_decl[node]
+
+            return self.call(decl, arg_values, arg_kinds, arg_names, expr.line)
+
+        # Native call to a nested function, passing the callable object to the '__call__' method
+        # of its callable class directly.
+        if (isinstance(callee.node, FuncDef)
+                and callee.node in self.nested_fdef_call_decls
+                and all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds)):
+            decl = self.nested_fdef_call_decls[callee.node]
+            function = self.accept(callee)
+            return self.call(decl, [function] + arg_values, [ARG_POS] + arg_kinds,
+                             [None] + arg_names, expr.line)
 
         # Fall back to a Python call
         function = self.accept(callee)
         return self.py_call(function, arg_values, expr.line,
-                            arg_kinds=expr.arg_kinds, arg_names=expr.arg_names)
+                            arg_kinds=arg_kinds, arg_names=arg_names)
 
     def missing_args_to_error_values(self,
                                      args: Sequence[Optional[Value]],
@@ -2514,21 +3128,28 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             ir = self.mapper.type_to_ir[callee.expr.node]
             decl = ir.method_decl(callee.name)
             args = []
-            arg_kinds, arg_names = expr.arg_kinds[:], expr.arg_names[:]
             if decl.kind == FUNC_CLASSMETHOD:  # Add the class argument for class methods
                 args.append(self.load_native_type_object(callee.expr.node.fullname()))
+            arg_values, arg_kinds, arg_names = self.accept_call_args(expr)
+            if not all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds):
+                return self.py_call(self.accept(callee), arg_values, expr.line,
+                                    arg_kinds=arg_kinds, arg_names=arg_names)
+            if args:
                 arg_kinds.insert(0, ARG_POS)
                 arg_names.insert(0, None)
-            args += [self.accept(arg) for arg in expr.args]
+            args += arg_values
 
             return self.call(decl, args, arg_kinds, arg_names, expr.line)
 
         elif self.is_module_member_expr(callee):
+            # Use a primitive op if there is one
+            if callee.fullname in func_ops:
+                return self.translate_call(expr, callee)
             # Fall back to a PyCall for non-native module calls
             function = self.accept(callee)
-            args = [self.accept(arg) for arg in expr.args]
+            args, arg_kinds, arg_names = self.accept_call_args(expr)
             return self.py_call(function, args, expr.line,
-                                arg_kinds=expr.arg_kinds, arg_names=expr.arg_names)
+                                arg_kinds=arg_kinds, arg_names=arg_names)
         else:
             receiver_typ = self.node_type(callee.expr)
 
@@ -2539,14 +3160,14 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                     return val
 
             obj = self.accept(callee.expr)
-            args = [self.accept(arg) for arg in expr.args]
+            args, arg_kinds, arg_names = self.accept_call_args(expr)
             return self.gen_method_call(obj,
                                         callee.name,
                                         args,
                                         self.node_type(expr),
                                         expr.line,
-                                        expr.arg_kinds,
-                                        expr.arg_names)
+                                        arg_kinds,
+                                        arg_names)
 
     def translate_super_method_call(self, expr: CallExpr, callee: SuperExpr) -> Value:
         if callee.info is None or callee.call.args:
@@ -2560,8 +3181,10 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             return self.translate_call(expr, callee)
 
         decl = base.method_decl(callee.name)
-        arg_values = [self.accept(arg) for arg in expr.args]
-        arg_kinds, arg_names = expr.arg_kinds[:], expr.arg_names[:]
+        arg_values, arg_kinds, arg_names = self.accept_call_args(expr)
+        if not all(kind in (ARG_POS, ARG_NAMED) for kind in arg_kinds):
+            return self.py_call(self.accept(callee), arg_values, expr.line,
+                                arg_kinds=arg_kinds, arg_names=arg_names)
 
         if decl.kind != FUNC_STATICMETHOD:
             vself = next(iter(self.environment.indexes))  # grab first argument
@@ -2876,6 +3499,9 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         if is_runtime_subtype(value.type, int_rprimitive):
             zero = self.add(LoadInt(0))
             value = self.binary_op(value, zero, '!=', value.line)
+        elif is_float_rprimitive(value.type):
+            zero = self.add(LoadFloat(0.0))
+            value = self.binary_op(value, zero, '!=', value.line)
         elif is_same_type(value.type, list_rprimitive):
             length = self.primitive_op(list_len_op, [value], value.line)
             zero = self.add(LoadInt(0))
@@ -3051,9 +3677,14 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
 
         def gen_return(self, builder: 'IRBuilder', value: Value, line: int) -> None:
             if self.ret_reg is None:
-                self.ret_reg = builder.alloc_temp(builder.ret_types[-1])
-
-            builder.add(Assign(self.ret_reg, value))
+                ret_type = builder.ret_types[-1]
+                # The return register is checked for the error value to see if
+                # there was a return, which doesn't work for fixed-width integers.
+                if is_fixed_width_rtype(ret_type):
+                    ret_type = object_rprimitive
+                self.ret_reg = builder.alloc_temp(ret_type)
+
+            builder.add(Assign(self.ret_reg, builder.coerce(value, self.ret_reg.type, line)))
             builder.add(Goto(self.target))
 
     class FinallyNonlocalControl(CleanupNonlocalControl):
@@ -3107,7 +3738,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         # Entry block for non-exceptional flow
         self.activate_block(main_entry)
         if ret_reg:
-            self.add(Assign(ret_reg, self.add(LoadErrorValue(self.ret_types[-1]))))
+            self.add(Assign(ret_reg, self.add(LoadErrorValue(ret_reg.type))))
         self.goto(return_entry)
 
         self.activate_block(return_entry)
@@ -3117,7 +3748,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         # Entry block for errors
         self.activate_block(err_handler)
         if ret_reg:
-            self.add(Assign(ret_reg, self.add(LoadErrorValue(self.ret_types[-1]))))
+            self.add(Assign(ret_reg, self.add(LoadErrorValue(ret_reg.type))))
         self.add(Assign(old_exc, self.primitive_op(error_catch_op, [], -1)))
         self.goto(finally_block)
 
@@ -3163,7 +3794,8 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             self.add(Branch(ret_reg, rest, return_block, Branch.IS_ERROR))
 
             self.activate_block(return_block)
-            self.nonlocal_control[-1].gen_return(self, ret_reg, -1)
+            value = self.coerce(ret_reg, self.ret_types[-1], -1)
+            self.nonlocal_control[-1].gen_return(self, value, -1)
 
         # TODO: handle break/continue
         self.activate_block(rest)
@@ -3287,7 +3919,8 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         runtime_args = []
         for arg, arg_type in zip(expr.arguments, typ.arg_types):
             arg.variable.type = arg_type
-            runtime_args.append(RuntimeArg(arg.variable.name(), self.type_to_rtype(arg_type)))
+            runtime_args.append(RuntimeArg(arg.variable.name(),
+                                           self.mapper.arg_to_rtype(arg_type, arg)))
         ret_type = self.type_to_rtype(typ.ret_type)
 
         fsig = FuncSignature(runtime_args, ret_type)
@@ -3435,6 +4068,24 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             decorated_func = self.load_decorated_func(dec.func, func_reg)
             self.assign(self.get_func_target(dec.func), decorated_func, dec.func.line)
             func_reg = decorated_func
+        elif is_memoized_func(dec):
+            wrapper = self.gen_memo_wrapper(dec.func, func_ir.decl)
+            self.functions.append(wrapper)
+
+            # Create the cache object that Python code calls instead of the wrapper.
+            key_types = [arg.type for arg in wrapper.sig.args]
+            decorator = dec.decorators[0]
+            assert isinstance(decorator, CallExpr)
+            wrapper_func = self.load_global_str(dec.func.name(), dec.line)
+            orig_func = self.load_global_str(func_ir.name, dec.line)
+            memo = self.primitive_op(memo_new_op(key_types, memoize_maxsize(decorator)),
+                                     [wrapper_func, orig_func], dec.line)
+            self.final_names.append((memo_static_name(dec.func), object_rprimitive))
+            self.add(InitStatic(memo, memo_static_name(dec.func), 'final'))
+            self.primitive_op(dict_set_item_op,
+                              [self.load_globals_dict(),
+                               self.load_static_unicode(dec.func.name()), memo],
+                              dec.line)
         else:
             # Obtain the the function name in order to construct the name of the helper function.
             name = dec.func.fullname().split('.')[-1]
@@ -3603,6 +4254,19 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             return self.load_globals_dict()
         return None
 
+    @specialize_function('mypyc_extensions.i64')
+    @specialize_function('mypyc_extensions.i32')
+    def translate_fixed_width_int(
+            self, expr: CallExpr, callee: RefExpr) -> Optional[Value]:
+        # Convert an int or a fixed-width integer without calling the type object
+        if len(expr.args) == 1 and expr.arg_kinds == [ARG_POS]:
+            target_type = self.node_type(expr)
+            arg_type = self.node_type(expr.args[0])
+            if is_fixed_width_rtype(target_type) and (is_subtype(arg_type, int_rprimitive)
+                                                      or is_fixed_width_rtype(arg_type)):
+                return self.coerce(self.accept(expr.args[0]), target_type, expr.line, force=True)
+        return None
+
     @specialize_function('builtins.len')
     def translate_len(
             self, expr: CallExpr, callee: RefExpr) -> Optional[Value]:
@@ -3615,8 +4279,30 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
                 # though we still need to evaluate it.
                 self.accept(expr.args[0])
                 return self.add(LoadInt(len(expr_rtype.types)))
+            if (isinstance(expr_rtype, RInstance)
+                    and not expr_rtype.class_ir.builtin_base
+                    and expr_rtype.class_ir.has_method('__len__')):
+                decl = expr_rtype.class_ir.method_decl('__len__')
+                if (decl.kind == FUNC_NORMAL and len(decl.sig.args) == 1
+                        and is_int_rprimitive(decl.sig.ret_type)):
+                    return self.translate_native_len(self.accept(expr.args[0]), expr.line)
         return None
 
+    def translate_native_len(self, obj: Value, line: int) -> Value:
+        """Call the __len__ method of a native class directly, checking the result like len()."""
+        length = self.gen_method_call(obj, '__len__', [], int_rprimitive, line)
+        error_block, ok_block = BasicBlock(), BasicBlock()
+        negative = self.binary_op(length, self.add(LoadInt(0)), '<', line)
+        self.add_bool_branch(negative, error_block, ok_block)
+
+        self.activate_block(error_block)
+        self.add(RaiseStandardError(RaiseStandardError.VALUE_ERROR,
+                                    '__len__() should return >= 0', line))
+        self.add(Unreachable())
+
+        self.activate_block(ok_block)
+        return length
+
     # Special cases for things that consume iterators where we know we
     # can safely compile a generator into a list.
     @specialize_function('builtins.tuple')
@@ -3941,6 +4627,8 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             return int_rprimitive
         if node not in self.types:
             return object_rprimitive
+        if isinstance(node, OpExpr) and self.is_complex_float_power(node):
+            return object_rprimitive
         mypy_type = self.types[node]
         return self.type_to_rtype(mypy_type)
 
@@ -4130,12 +4818,12 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         fn_info = self.fn_info
         if local:
             for arg in fn_info.fitem.arguments:
-                rtype = self.type_to_rtype(arg.variable.type)
+                rtype = self.mapper.arg_to_rtype(arg.variable.type, arg)
                 self.environment.add_local_reg(arg.variable, rtype, is_arg=True)
         else:
             for arg in fn_info.fitem.arguments:
                 if self.is_free_variable(arg.variable) or fn_info.is_generator:
-                    rtype = self.type_to_rtype(arg.variable.type)
+                    rtype = self.mapper.arg_to_rtype(arg.variable.type, arg)
                     assert base is not None, 'base cannot be None for adding nonlocal args'
                     self.add_var_to_env_class(arg.variable, rtype, base, reassign=reassign)
 
@@ -4202,12 +4890,16 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         function. Note that a 'self' parameter is added to its list of arguments, as the nested
         function becomes a class method.
         """
-        sig = FuncSignature((RuntimeArg(SELF_NAME, object_rprimitive),) + sig.args, sig.ret_type)
-        call_fn_decl = FuncDecl('__call__', fn_info.callable_class.ir.name, self.module_name, sig)
+        call_fn_decl = self.callable_class_call_decl(fn_info, sig)
         call_fn_ir = FuncIR(call_fn_decl, blocks, env)
         fn_info.callable_class.ir.methods['__call__'] = call_fn_ir
         return call_fn_ir
 
+    def callable_class_call_decl(self, fn_info: FuncInfo, sig: FuncSignature) -> FuncDecl:
+        """Returns the declaration of the '__call__' method of a callable class."""
+        sig = FuncSignature((RuntimeArg(SELF_NAME, object_rprimitive),) + sig.args, sig.ret_type)
+        return FuncDecl('__call__', fn_info.callable_class.ir.name, self.module_name, sig)
+
     def add_get_to_callable_class(self, fn_info: FuncInfo) -> None:
         """Generates the '__get__' method for a callable class."""
         line = fn_info.fitem.line
@@ -4545,7 +5237,7 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
     def load_global_str(self, name: str, line: int) -> Value:
         _globals = self.load_globals_dict()
         reg = self.load_static_unicode(name)
-        return self.primitive_op(dict_get_item_op, [_globals, reg], line)
+        return self.primitive_op(dict_get_item_cached_op, [_globals, reg], line)
 
     def load_globals_dict(self) -> Value:
         return self.add(LoadStatic(dict_rprimitive, 'globals', self.module_name))
@@ -4555,11 +5247,6 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         static_symbol = self.mapper.literal_static_name(value)
         return self.add(LoadStatic(int_rprimitive, static_symbol, ann=value))
 
-    def load_static_float(self, value: float) -> Value:
-        """Loads a static float value into a register."""
-        static_symbol = self.mapper.literal_static_name(value)
-        return self.add(LoadStatic(float_rprimitive, static_symbol, ann=value))
-
     def load_static_bytes(self, value: bytes) -> Value:
         """Loads a static bytes value into a register."""
         static_symbol = self.mapper.literal_static_name(value)
@@ -4579,6 +5266,11 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         static_symbol = self.mapper.literal_static_name(value)
         return self.add(LoadStatic(str_rprimitive, static_symbol, ann=value))
 
+    def load_static_kwnames(self, names: Tuple[str, ...]) -> Value:
+        """Loads a static tuple of interned keyword argument names into a register."""
+        static_symbol = self.mapper.literal_static_name(names)
+        return self.add(LoadStatic(tuple_rprimitive, static_symbol, ann=names))
+
     def load_module(self, name: str) -> Value:
         return self.add(LoadStatic(object_rprimitive, 'module', name))
 
@@ -4589,7 +5281,11 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
     def load_module_attr_by_fullname(self, fullname: str, line: int) -> Value:
         module, _, name = fullname.rpartition('.')
         left = self.load_module(module)
-        return self.py_get_attr(left, name, line)
+        if name.startswith('__'):
+            # These may be found on the module type instead of the module dict
+            return self.py_get_attr(left, name, line)
+        key = self.load_static_unicode(name)
+        return self.add(PrimitiveOp([left, key], py_module_getattr_cached_op, line))
 
     def load_native_type_object(self, fullname: str) -> Value:
         module, name = fullname.rsplit('.', 1)
@@ -4608,6 +5304,13 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
         """
         if src.type.is_unboxed and not target_type.is_unboxed:
             return self.box(src)
+        if is_float_rprimitive(target_type) and (is_int_rprimitive(src.type)
+                                                 or is_short_int_rprimitive(src.type)):
+            return self.add(PrimitiveOp([src], int_to_float_op, line))
+        if is_fixed_width_rtype(target_type) or is_fixed_width_rtype(src.type):
+            result = self.coerce_fixed_width(src, target_type, line)
+            if result is not None:
+                return result
         if ((src.type.is_unboxed and target_type.is_unboxed)
                 and not is_runtime_subtype(src.type, target_type)):
             # To go from one unboxed type to another, we go through a boxed
@@ -4623,6 +5326,30 @@ class IRBuilder(ExpressionVisitor[Value], StatementVisitor[None]):
             return tmp
         return src
 
+    def coerce_fixed_width(self, src: Value, target_type: RType, line: int) -> Optional[Value]:
+        """Convert directly between int and fixed-width integer types, if possible.
+
+        Conversions that may lose information raise OverflowError.
+        """
+        if src.type is target_type:
+            return None
+        is_int = is_int_rprimitive(src.type) or is_short_int_rprimitive(src.type)
+        if is_fixed_width_rtype(target_type) and is_int:
+            if isinstance(src, LoadInt) and self.fits_fixed_width(src.value, target_type):
+                return self.add(LoadInt(src.value, line, rtype=target_type))
+            op = int_to_int64_op if is_int64_rprimitive(target_type) else int_to_int32_op
+            return self.add(PrimitiveOp([src], op, line))
+        if is_int_rprimitive(target_type):
+            if is_int64_rprimitive(src.type):
+                return self.add(PrimitiveOp([src], int64_to_int_op, line))
+            if is_int32_rprimitive(src.type):
+                return self.add(PrimitiveOp([src], int32_to_int_op, line))
+        if is_int64_rprimitive(target_type) and is_int32_rprimitive(src.type):
+            return self.add(PrimitiveOp([src], int32_to_int64_op, line))
+        if is_int32_rprimitive(target_type) and is_int64_rprimitive(src.type):
+            return self.add(PrimitiveOp([src], int64_to_int32_op, line))
+        return None
+
     def keyword_args_to_positional(self,
                                    args: Sequence[Value],
                                    arg_kinds: List[int],
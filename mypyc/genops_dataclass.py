@@ -0,0 +1,462 @@
+"""Helpers for compiling dataclasses to native classes.
+
+A class decorated with @dataclasses.dataclass is compiled like any other
+native class, except that instead of letting the decorator generate the
+special methods at runtime, we generate native __init__, __repr__, __eq__,
+comparison and __hash__ methods that access the attributes directly.
+
+The signature of __init__ comes from the mypy dataclasses plugin. We
+still call the real decorator on a plain class with the same field
+definitions (types, defaults and field() calls) at runtime and copy the
+__dataclass_fields__ and __dataclass_params__ attributes to the native
+class, so that dataclasses.fields(), dataclasses.replace() and friends
+keep working.
+"""
+
+from typing import List, Dict, Optional, NamedTuple, Any
+
+from mypy.nodes import (
+    ClassDef, TypeInfo, Expression, RefExpr, NameExpr, CallExpr, AssignmentStmt, TempNode,
+    FuncDef, Decorator, OverloadedFuncDef, Var, ARG_OPT, ARG_NAMED_OPT
+)
+from mypy.types import Instance
+from mypyc.common import SELF_NAME
+from mypyc.ops import (
+    Value, BasicBlock, Return, GetAttr, SetAttr, TupleSet, PrimitiveOp, ClassIR, FuncIR,
+    FuncDecl, FuncSignature, RuntimeArg, RInstance, RType, AssignmentTargetRegister,
+    object_rprimitive, str_rprimitive, int_rprimitive, none_rprimitive
+)
+from mypyc.ops_primitive import func_ops, name_ref_ops
+from mypyc.ops_misc import (
+    true_op, false_op, type_op, type_is_op, dataclass_setup_op
+)
+from mypyc.ops_dict import new_dict_op, dict_set_item_op
+from mypyc.ops_str import repr_op
+import mypyc.genops
+
+# Options of the dataclass decorator and their default values
+DATACLASS_OPTIONS = {
+    'init': True,
+    'repr': True,
+    'eq': True,
+    'order': False,
+    'unsafe_hash': False,
+    'frozen': False,
+}  # type: Dict[str, bool]
+
+COMPARISON_METHODS = {
+    '__lt__': '<',
+    '__le__': '<=',
+    '__gt__': '>',
+    '__ge__': '>=',
+}  # type: Dict[str, str]
+
+DataclassField = NamedTuple(
+    'DataclassField', [('name', str),
+                       ('in_init', bool),
+                       ('is_init_var', bool),
+                       # The value assigned in the class body, if any
+                       ('definition', Optional[Expression]),
+                       # Default value (or default factory) from the class body
+                       ('default', Optional[Expression]),
+                       ('is_default_factory', bool),
+                       ('repr', bool),
+                       ('compare', bool)])
+
+
+def is_dataclass_decorator(d: Expression) -> bool:
+    if isinstance(d, CallExpr):
+        d = d.callee
+    return isinstance(d, RefExpr) and d.fullname == 'dataclasses.dataclass'
+
+
+def is_bool_literal(e: Expression) -> bool:
+    return isinstance(e, NameExpr) and e.fullname in ('builtins.True', 'builtins.False')
+
+
+def dataclass_options(cdef: ClassDef) -> Optional[Dict[str, bool]]:
+    """Return the decorator options of a dataclass (or None if not a dataclass).
+
+    Only True and False literals are supported as option values;
+    others are reported by check_dataclass_options.
+    """
+    if 'dataclass' not in cdef.info.metadata:
+        return None
+    for d in cdef.decorators:
+        if is_dataclass_decorator(d):
+            options = dict(DATACLASS_OPTIONS)
+            if isinstance(d, CallExpr):
+                for name, arg in zip(d.arg_names, d.args):
+                    if name in options and is_bool_literal(arg):
+                        options[name] = isinstance(arg, NameExpr) and arg.name == 'True'
+            return options
+    return None
+
+
+def check_dataclass_options(cdef: ClassDef) -> List[Expression]:
+    """Return the decorator arguments that we don't support."""
+    bad = []
+    for d in cdef.decorators:
+        if isinstance(d, CallExpr) and is_dataclass_decorator(d):
+            bad.extend(arg for name, arg in zip(d.arg_names, d.args)
+                       if name not in DATACLASS_OPTIONS or not is_bool_literal(arg))
+    return bad
+
+
+def dataclass_methods(cdef: ClassDef, options: Dict[str, bool]) -> List[str]:
+    """Return the names of the special methods we generate for a dataclass."""
+    defined = {stmt.name() for stmt in cdef.defs.body
+               if isinstance(stmt, (FuncDef, Decorator, OverloadedFuncDef))
+               and not is_plugin_generated(cdef.info, stmt.name())}
+    methods = []
+    if options['init']:
+        methods.append('__init__')
+    if options['repr']:
+        methods.append('__repr__')
+    if options['eq']:
+        methods.append('__eq__')
+    if options['order']:
+        methods.extend(COMPARISON_METHODS)
+    if options['unsafe_hash'] or (options['eq'] and options['frozen']):
+        methods.append('__hash__')
+    return [name for name in methods if name not in defined]
+
+
+def is_plugin_generated(info: TypeInfo, name: str) -> bool:
+    """Was a method added to the class body by the mypy dataclasses plugin?"""
+    return name in info.names and info.names[name].plugin_generated
+
+
+def plugin_attributes(info: TypeInfo) -> List[Dict[str, Any]]:
+    """Return the serialized attributes recorded by the mypy dataclasses plugin.
+
+    The plugin stores them in a dict keyed by attribute name, in field order.
+    """
+    return list(info.metadata['dataclass']['attributes'].values())
+
+
+def prepare_dataclass(ir: ClassIR, module_name: str, cdef: ClassDef) -> None:
+    """Set up the attributes and method declarations of a dataclass."""
+    options = dataclass_options(cdef)
+    assert options is not None
+    # Init-only variables are only passed to __post_init__
+    for attr in plugin_attributes(cdef.info):
+        if attr.get('is_init_var', False):
+            ir.attributes.pop(attr['name'], None)
+    for name in dataclass_methods(cdef, options):
+        sig = dataclass_method_sig(ir, name)
+        if sig is not None:
+            ir.method_decls[name] = FuncDecl(name, cdef.name, module_name, sig)
+
+
+def has_generated_init(info: TypeInfo) -> bool:
+    options = dataclass_options(info.defn)
+    return options is not None and '__init__' in dataclass_methods(info.defn, options)
+
+
+def dataclass_method_sig(cls: ClassIR, name: str) -> Optional[FuncSignature]:
+    """Return the signature of a generated dataclass method.
+
+    Return None for __init__, which uses the signature from the mypy plugin.
+    """
+    self_arg = RuntimeArg(SELF_NAME, RInstance(cls))
+    if name == '__eq__' or name in COMPARISON_METHODS:
+        return FuncSignature([self_arg, RuntimeArg('rhs', object_rprimitive)],
+                             object_rprimitive)
+    elif name == '__repr__':
+        return FuncSignature([self_arg], str_rprimitive)
+    elif name == '__hash__':
+        return FuncSignature([self_arg], int_rprimitive)
+    return None
+
+
+def field_call_args(e: Expression) -> Optional[Dict[str, Expression]]:
+    """If e is a call to dataclasses.field(), return the keyword arguments."""
+    if (isinstance(e, CallExpr) and isinstance(e.callee, RefExpr)
+            and e.callee.fullname == 'dataclasses.field'):
+        return {name: arg for name, arg in zip(e.arg_names, e.args) if name}
+    return None
+
+
+def dataclass_fields(info: TypeInfo) -> List[DataclassField]:
+    """Return the fields of a dataclass, including inherited ones, in order."""
+    # Find the default values in the class bodies. Definitions in subclasses
+    # override those in base classes.
+    assignments = {}  # type: Dict[str, Expression]
+    for base in reversed(info.mro):
+        if 'dataclass' not in base.metadata:
+            continue
+        for stmt in base.defn.defs.body:
+            if (isinstance(stmt, AssignmentStmt)
+                    and isinstance(stmt.lvalues[0], NameExpr)
+                    and not isinstance(stmt.rvalue, TempNode)):
+                assignments[stmt.lvalues[0].name] = stmt.rvalue
+
+    fields = []
+    for attr in plugin_attributes(info):
+        name = attr['name']
+        definition = default = assignments.get(name)
+        is_default_factory = False
+        field_repr = field_compare = True
+        field_args = field_call_args(default) if default is not None else None
+        if field_args is not None:
+            default = field_args.get('default')
+            if 'default_factory' in field_args:
+                default = field_args['default_factory']
+                is_default_factory = True
+            for option, value in field_args.items():
+                if is_bool_literal(value) and isinstance(value, NameExpr):
+                    if option == 'repr':
+                        field_repr = value.name == 'True'
+                    elif option == 'compare':
+                        field_compare = value.name == 'True'
+        fields.append(DataclassField(name,
+                                     attr.get('is_in_init', True),
+                                     attr.get('is_init_var', False),
+                                     definition,
+                                     default,
+                                     is_default_factory,
+                                     field_repr,
+                                     field_compare))
+    return fields
+
+
+class DataclassGenerator:
+    """Generate the special methods and runtime metadata of a dataclass."""
+
+    def __init__(self,
+                 builder: 'mypyc.genops.IRBuilder',
+                 cdef: ClassDef,
+                 options: Dict[str, bool]) -> None:
+        self.builder = builder
+        self.cdef = cdef
+        self.options = options
+        self.cls = builder.mapper.type_to_ir[cdef.info]
+        self.fields = dataclass_fields(cdef.info)
+        self.line = cdef.line
+
+    def gen_methods(self) -> None:
+        for name in dataclass_methods(self.cdef, self.options):
+            if name == '__init__':
+                fn = self.gen_init()
+            elif name == '__repr__':
+                fn = self.gen_repr()
+            elif name == '__hash__':
+                fn = self.gen_hash()
+            elif name == '__eq__':
+                fn = self.gen_compare(name, '==')
+            else:
+                fn = self.gen_compare(name, COMPARISON_METHODS[name])
+            self.cls.methods[name] = fn
+            self.builder.functions.append(fn)
+
+    def gen_metadata(self) -> None:
+        """Generate code that sets up __dataclass_fields__ and __dataclass_params__.
+
+        The field definitions from the class body (including any field()
+        calls) are evaluated again for the plain class that the decorator
+        is applied to.
+        """
+        builder = self.builder
+        line = self.line
+        typ = builder.load_native_type_object(self.cdef.fullname)
+        annotations = builder.primitive_op(new_dict_op, [], line)
+        namespace = builder.primitive_op(new_dict_op, [], line)
+        for field in self.fields:
+            name = builder.load_static_unicode(field.name)
+            builder.primitive_op(dict_set_item_op,
+                                 [annotations, name, self.field_type_object(field)], line)
+            if field.definition is not None:
+                builder.primitive_op(dict_set_item_op,
+                                     [namespace, name, self.field_definition(field.definition)],
+                                     line)
+        options = builder.primitive_op(new_dict_op, [], line)
+        for name, value in sorted(self.options.items()):
+            builder.primitive_op(
+                dict_set_item_op,
+                [options, builder.load_static_unicode(name),
+                 builder.box(builder.primitive_op(true_op if value else false_op, [], line))],
+                line)
+        builder.primitive_op(dataclass_setup_op, [typ, annotations, namespace, options], line)
+
+    def field_definition(self, e: Expression) -> Value:
+        """Evaluate the value assigned to a field in the class body.
+
+        A field() call is typed as returning the field type, so it is called
+        generically instead of being coerced to that type.
+        """
+        builder = self.builder
+        if field_call_args(e) is None:
+            return builder.box(builder.accept(e))
+        assert isinstance(e, CallExpr)
+        function = builder.load_module_attr_by_fullname('dataclasses.field', e.line)
+        args = [builder.box(builder.accept(arg)) for arg in e.args]
+        return builder.py_call(function, args, e.line, e.arg_kinds, e.arg_names)
+
+    def field_type_object(self, field: DataclassField) -> Value:
+        """Load the runtime type used as the annotation of a field.
+
+        This is the class of the declared type if it's a builtin class or a
+        class defined in this module, and object otherwise.
+        """
+        builder = self.builder
+        if field.is_init_var:
+            return builder.load_module_attr_by_fullname('dataclasses.InitVar', self.line)
+        typ = self.cdef.info[field.name].type
+        if isinstance(typ, Instance):
+            fullname = typ.type.fullname()
+            if (typ.type in builder.mapper.type_to_ir
+                    and typ.type.module_name == builder.module_name):
+                return builder.load_native_type_object(fullname)
+            if fullname.startswith('builtins.'):
+                return builder.load_module_attr_by_fullname(fullname, self.line)
+        return builder.load_module_attr_by_fullname('builtins.object', self.line)
+
+    def enter(self, name: str) -> List[Value]:
+        """Enter a generated method and return the argument values."""
+        decl = self.cls.method_decls[name]
+        self.builder.enter(mypyc.genops.FuncInfo())
+        self.builder.ret_types[-1] = decl.sig.ret_type
+        return [self.builder.read(self.add_arg(arg.name, arg.type), self.line)
+                for arg in decl.sig.args]
+
+    def add_arg(self, name: str, typ: RType) -> AssignmentTargetRegister:
+        # The environment operates on Vars, so we make some up
+        return self.builder.environment.add_local_reg(Var(name), typ, is_arg=True)
+
+    def leave(self, name: str) -> FuncIR:
+        blocks, env, _, _ = self.builder.leave()
+        return FuncIR(self.cls.method_decls[name], blocks, env)
+
+    def default_value(self, field: DataclassField) -> Value:
+        builder = self.builder
+        assert field.default is not None
+        if field.is_default_factory:
+            return builder.py_call(builder.accept(field.default), [], field.default.line)
+        if not builder.is_approximately_constant(field.default):
+            builder.warning('Unsupported default attribute value', field.default.line)
+        return builder.accept(field.default)
+
+    def gen_init(self) -> FuncIR:
+        builder = self.builder
+        line = self.line
+        decl = self.cls.method_decls['__init__']
+        builder.enter(mypyc.genops.FuncInfo())
+        builder.ret_types[-1] = none_rprimitive
+        args = {}  # type: Dict[str, AssignmentTargetRegister]
+        for arg in decl.sig.args:
+            args[arg.name] = self.add_arg(arg.name, arg.type)
+        self_reg = builder.read(args[decl.sig.args[0].name], line)
+
+        fields = {field.name: field for field in self.fields}
+        for arg in decl.sig.args[1:]:
+            if arg.kind in (ARG_OPT, ARG_NAMED_OPT):
+                field = fields[arg.name]
+                builder.assign_if_null(args[arg.name],
+                                       lambda: self.default_value(field),
+                                       line)
+
+        for field in self.fields:
+            if field.is_init_var:
+                continue
+            if field.in_init:
+                value = builder.read(args[field.name], line)
+            elif field.default is not None:
+                value = self.default_value(field)
+            else:
+                continue
+            value = builder.coerce(value, self.cls.attr_type(field.name), line)
+            builder.add(SetAttr(self_reg, field.name, value, line))
+
+        if self.cls.has_method('__post_init__'):
+            init_vars = [builder.read(args[field.name], line)
+                         for field in self.fields if field.is_init_var]
+            builder.gen_method_call(self_reg, '__post_init__', init_vars, none_rprimitive, line)
+        builder.add(Return(builder.none()))
+
+        blocks, env, _, _ = builder.leave()
+        return FuncIR(decl, blocks, env)
+
+    def gen_repr(self) -> FuncIR:
+        # Like the dataclass decorator, we produce "Name(x=1, y='a')"
+        builder = self.builder
+        line = self.line
+        self_reg, = self.enter('__repr__')
+        typ = builder.primitive_op(type_op, [self_reg], line)
+        result = builder.coerce(builder.py_get_attr(typ, '__qualname__', line),
+                                str_rprimitive, line)
+        sep = '('
+        for field in self.fields:
+            if field.is_init_var or not field.repr:
+                continue
+            result = builder.binary_op(
+                result, builder.load_static_unicode('%s%s=' % (sep, field.name)), '+', line)
+            value = builder.box(builder.add(GetAttr(self_reg, field.name, line)))
+            result = builder.binary_op(
+                result, builder.primitive_op(repr_op, [value], line), '+', line)
+            sep = ', '
+        if sep == '(':
+            result = builder.binary_op(result, builder.load_static_unicode('()'), '+', line)
+        else:
+            result = builder.binary_op(result, builder.load_static_unicode(')'), '+', line)
+        builder.add(Return(result))
+        return self.leave('__repr__')
+
+    def gen_hash(self) -> FuncIR:
+        # The hash value is the hash of a tuple of the compared fields
+        builder = self.builder
+        line = self.line
+        self_reg, = self.enter('__hash__')
+        items = [builder.box(builder.add(GetAttr(self_reg, field.name, line)))
+                 for field in self.fields if field.compare and not field.is_init_var]
+        value = builder.box(builder.add(TupleSet(items, line)))
+        result = builder.matching_primitive_op(func_ops['builtins.hash'], [value], line)
+        assert result is not None
+        builder.add(Return(result))
+        return self.leave('__hash__')
+
+    def gen_compare(self, name: str, op: str) -> FuncIR:
+        """Generate __eq__ or an ordering method.
+
+        Like the dataclass decorator, we compare the fields as if they were
+        tuples, and return NotImplemented if the other object has a different
+        type.
+        """
+        builder = self.builder
+        line = self.line
+        self_reg, rhs = self.enter(name)
+
+        same_type, not_implemented = BasicBlock(), BasicBlock()
+        typ = builder.primitive_op(type_op, [self_reg], line)
+        builder.add_bool_branch(builder.primitive_op(type_is_op, [rhs, typ], line),
+                                same_type, not_implemented)
+        builder.activate_block(not_implemented)
+        builder.add(Return(builder.add(PrimitiveOp(
+            [], name_ref_ops['builtins.NotImplemented'], line))))
+
+        builder.activate_block(same_type)
+        other = builder.coerce(rhs, RInstance(self.cls), line)
+        false_block = BasicBlock()
+        for field in self.fields:
+            if field.is_init_var or not field.compare:
+                continue
+            left = builder.add(GetAttr(self_reg, field.name, line))
+            right = builder.add(GetAttr(other, field.name, line))
+            equal, different = BasicBlock(), BasicBlock()
+            builder.add_bool_branch(builder.binary_op(left, right, '==', line),
+                                    equal, false_block if op == '==' else different)
+            if op != '==':
+                # The first pair of fields that differ determines the result
+                builder.activate_block(different)
+                result = builder.binary_op(left, right, op, line)
+                builder.add(Return(builder.coerce(result, object_rprimitive, line)))
+            builder.activate_block(equal)
+
+        # All compared fields are equal
+        result = builder.primitive_op(true_op if op in ('==', '<=', '>=') else false_op, [],
+                                      line)
+        builder.add(Return(builder.box(result)))
+        if op == '==':
+            builder.activate_block(false_block)
+            builder.add(Return(builder.box(builder.primitive_op(false_op, [], line))))
+        return self.leave(name)
@@ -14,6 +14,7 @@ from mypyc.ops import (
 )
 from mypyc.ops_int import unsafe_short_add
 from mypyc.ops_list import list_len_op, list_get_item_unsafe_op
+from mypyc.ops_array import array_len_ops, array_get_item_unsafe_ops
 from mypyc.ops_misc import iter_op, next_op
 from mypyc.ops_exc import no_err_occurred_op
 import mypyc.genops
@@ -187,6 +188,28 @@ class ForList(ForGenerator):
              builder.add(LoadInt(step))], line), line)
 
 
+class ForArray(ForList):
+    """Generate optimized IR for a for loop over a typed array.
+
+    The items are read directly from the array buffer without boxing."""
+
+    def load_len(self) -> Value:
+        expr_reg = self.builder.read(self.expr_target, self.line)
+        return self.builder.add(PrimitiveOp([expr_reg], array_len_ops[expr_reg.type.name],
+                                            self.line))
+
+    def begin_body(self) -> None:
+        builder = self.builder
+        line = self.line
+        expr_reg = builder.read(self.expr_target, line)
+        value = builder.add(PrimitiveOp(
+            [expr_reg, builder.read(self.index_target, line)],
+            array_get_item_unsafe_ops[expr_reg.type.name],
+            line))
+        builder.assign(builder.get_assignment_target(self.index),
+                       builder.coerce(value, self.target_type, line), line)
+
+
 class ForRange(ForGenerator):
     """Generate optimized IR for a for loop over an integer range."""
 
@@ -0,0 +1,80 @@
+"""Consistency checks for the IR of a function.
+
+These are used to catch bugs in IR transforms early: a transform that
+leaves the IR in a malformed state usually results in C compiler
+errors or crashes that are hard to trace back to the culprit.
+"""
+
+from typing import List, Set
+
+from mypyc.ops import (
+    FuncIR, BasicBlock, Op, ControlOp, Goto, Branch, Assign, Register, Value, format_func
+)
+
+
+def check_func_ir(fn: FuncIR, errors_lowered: bool = False) -> List[str]:
+    """Check the IR of a function and return a list of error messages.
+
+    If errors_lowered is true, exception handling has already been made
+    explicit and blocks must no longer have error handlers.
+    """
+    errors = []  # type: List[str]
+
+    def fail(block: BasicBlock, msg: str) -> None:
+        errors.append('block {}: {}'.format(fn.blocks.index(block), msg))
+
+    if not fn.blocks:
+        return ['function has no blocks']
+
+    blocks = set(fn.blocks)
+    defined = set(fn.env.regs())  # type: Set[Value]
+    seen = set()  # type: Set[Op]
+
+    for block in fn.blocks:
+        if not block.ops:
+            fail(block, 'empty block')
+            continue
+        if not isinstance(block.ops[-1], ControlOp):
+            fail(block, 'block does not end in a control op')
+        for op in block.ops[:-1]:
+            if isinstance(op, ControlOp):
+                fail(block, 'control op in the middle of a block: {}'.format(
+                    op.to_str(fn.env)))
+        if block.error_handler is not None:
+            if errors_lowered:
+                fail(block, 'error handler remains after exception insertion')
+            elif block.error_handler not in blocks:
+                fail(block, 'error handler is not part of the function')
+
+        for op in block.ops:
+            if op in seen:
+                fail(block, 'op appears more than once: {}'.format(op.to_str(fn.env)))
+            seen.add(op)
+            if not op.is_void and not isinstance(op, ControlOp) and op not in defined:
+                fail(block, 'op result is not in the environment: {}'.format(
+                    op.to_str(fn.env)))
+            if isinstance(op, Goto) and op.label not in blocks:
+                fail(block, 'goto target is not part of the function')
+            elif isinstance(op, Branch) and (op.true not in blocks or op.false not in blocks):
+                fail(block, 'branch target is not part of the function')
+            elif isinstance(op, Assign) and op.dest not in defined:
+                fail(block, 'assignment to unknown register {}'.format(op.dest.name))
+
+    for block in fn.blocks:
+        for op in block.ops:
+            for src in op.sources():
+                if isinstance(src, Register):
+                    if src not in defined:
+                        fail(block, 'use of unknown register {}'.format(src.name))
+                elif src not in seen:
+                    fail(block, 'use of value not defined in the function: {}'.format(
+                        op.to_str(fn.env)))
+
+    return errors
+
+
+def assert_func_ir_valid(fn: FuncIR, errors_lowered: bool = False) -> None:
+    errors = check_func_ir(fn, errors_lowered)
+    if errors:
+        raise AssertionError('Invalid IR for {}:\n  {}\n{}'.format(
+            fn.name, '\n  '.join(errors), '\n'.join(format_func(fn))))
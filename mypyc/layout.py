@@ -0,0 +1,144 @@
+"""Layout of the C structs that represent instances of native classes.
+
+By default the fields of a native instance are in declaration order,
+with the attributes of base classes first. The compact layout reorders
+fields to reduce padding and packs bool and None attributes, and the
+flags that record whether fixed-width attributes are defined, into
+bitfields.
+
+Code compiled for a base class accesses the attributes of subclass
+instances using the struct of the base class, so the struct of a
+subclass must start with the fields of its base classes laid out
+exactly as in the base class. Only the attributes defined in a single
+class are reordered. (Bitfields of a subclass may share a byte with the
+trailing bitfields of its base class, but this doesn't move any fields
+of the base class.)
+
+The sizes and alignments below assume a typical 64-bit platform. They
+are only used for reporting, since the C compiler decides the actual
+layout.
+"""
+
+from typing import List, Tuple, NamedTuple
+
+from mypyc.ops import (
+    ClassIR, RType, RTuple, is_bool_rprimitive, is_none_rprimitive, is_fixed_width_rtype,
+    is_int32_rprimitive
+)
+
+# A field of an instance struct. The field is either the attribute itself
+# or, if is_flag is true, the flag recording whether a fixed-width
+# attribute is defined.
+StructField = NamedTuple('StructField', [('attr', str),
+                                         ('rtype', RType),
+                                         ('is_flag', bool)])
+
+# Size of PyObject_HEAD and the vtable pointer
+HEADER_SIZE = 24
+POINTER_SIZE = 8
+
+# Bool and None attributes need two bits, since 2 is the undefined value
+VALUE_BITS = 2
+FLAG_BITS = 1
+
+
+def class_fields(cl: ClassIR) -> List[StructField]:
+    """Return the fields for the attributes defined in a class, in declaration order."""
+    fields = []  # type: List[StructField]
+    for attr, rtype in cl.attributes.items():
+        fields.append(StructField(attr, rtype, False))
+        if is_fixed_width_rtype(rtype):
+            fields.append(StructField(attr, rtype, True))
+    return fields
+
+
+def struct_layout(cl: ClassIR, compact: bool) -> List[List[StructField]]:
+    """Return the fields of the instance struct of a class (excluding the header).
+
+    The fields are grouped by the class that defines them, starting
+    from the root of the class hierarchy.
+    """
+    groups = []  # type: List[List[StructField]]
+    for base in reversed(cl.base_mro):
+        if not base.is_trait:
+            fields = class_fields(base)
+            if compact:
+                fields = compact_fields(fields)
+            groups.append(fields)
+    return groups
+
+
+def compact_fields(fields: List[StructField]) -> List[StructField]:
+    """Order fields by decreasing alignment, with bitfields at the end."""
+    return (sorted([field for field in fields if not is_bitfield(field)],
+                   key=lambda field: -size_and_align(field.rtype)[1])
+            + [field for field in fields if is_bitfield(field)])
+
+
+def is_bitfield(field: StructField) -> bool:
+    """Is a field packed into a bitfield when using the compact layout?"""
+    return (field.is_flag
+            or is_bool_rprimitive(field.rtype)
+            or is_none_rprimitive(field.rtype))
+
+
+def field_bits(field: StructField) -> int:
+    return FLAG_BITS if field.is_flag else VALUE_BITS
+
+
+def size_and_align(rtype: RType) -> Tuple[int, int]:
+    """Return the size and alignment of the C type of an attribute."""
+    if isinstance(rtype, RTuple):
+        return struct_size_and_align([size_and_align(item) for item in rtype.types])
+    if is_bool_rprimitive(rtype) or is_none_rprimitive(rtype):
+        return 1, 1
+    if is_int32_rprimitive(rtype):
+        return 4, 4
+    # Everything else is a pointer, a tagged int, a double or an int64_t
+    return POINTER_SIZE, POINTER_SIZE
+
+
+def struct_size_and_align(fields: List[Tuple[int, int]]) -> Tuple[int, int]:
+    size = 0
+    align = 1
+    for field_size, field_align in fields:
+        size = align_up(size, field_align) + field_size
+        align = max(align, field_align)
+    return align_up(size, align), align
+
+
+def align_up(offset: int, align: int) -> int:
+    return (offset + align - 1) // align * align
+
+
+def instance_size(cl: ClassIR, compact: bool) -> int:
+    """Estimate the size of an instance of a native class in bytes."""
+    offset = HEADER_SIZE
+    # Bits used in the current bitfield byte, or 0 if there's none
+    bits = 0
+    for group in struct_layout(cl, compact):
+        for field in group:
+            if compact and is_bitfield(field):
+                n = field_bits(field)
+                if bits == 0 or bits + n > 8:
+                    offset += 1
+                    bits = 0
+                bits += n
+            else:
+                bits = 0
+                size, align = size_and_align(field.rtype) if not field.is_flag else (1, 1)
+                offset = align_up(offset, align) + size
+    return align_up(offset, POINTER_SIZE)
+
+
+def format_size_report(classes: List[ClassIR]) -> List[str]:
+    """Describe how much the compact layout saves per instance of each class."""
+    lines = []
+    for cl in classes:
+        if cl.is_trait or cl.builtin_base:
+            continue
+        old = instance_size(cl, compact=False)
+        new = instance_size(cl, compact=True)
+        lines.append('{}.{}: {} -> {} bytes per instance ({} saved)'.format(
+            cl.module_name, cl.name, old, new, old - new))
+    return lines
@@ -18,3 +18,153 @@ PyObject *_CPy_ExcDummy = (PyObject *)&_CPy_ExcDummyStruct;
 void CPy_Init(void) {
     _CPy_ExcDummyStruct.ob_base.ob_type = &PyBaseObject_Type;
 }
+
+// Memo objects of memoized functions (see CPyMemoFunctionObject)
+
+static void CPyMemo_Clear(CPyMemoFunctionObject *memo) {
+    CPyMemoEntry *entry = memo->first;
+    PyMem_Free(memo->buckets);
+    memo->buckets = NULL;
+    memo->nbuckets = 0;
+    memo->first = memo->last = NULL;
+    memo->size = 0;
+    memo->version++;
+    while (entry != NULL) {
+        CPyMemoEntry *next = entry->next;
+        CPyMemo_FreeEntry(memo, entry);
+        entry = next;
+    }
+}
+
+static PyObject *CPyMemo_CacheInfo(PyObject *self, PyObject *unused) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    if (memo->maxsize < 0) {
+        return Py_BuildValue("(nnOn)", memo->hits, memo->misses, Py_None, memo->size);
+    }
+    return Py_BuildValue("(nnnn)", memo->hits, memo->misses, memo->maxsize, memo->size);
+}
+
+static PyObject *CPyMemo_CacheClear(PyObject *self, PyObject *unused) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    memo->hits = memo->misses = 0;
+    CPyMemo_Clear(memo);
+    Py_RETURN_NONE;
+}
+
+static PyObject *CPyMemo_Call(PyObject *self, PyObject *args, PyObject *kwargs) {
+    return PyObject_Call(((CPyMemoFunctionObject *)self)->func, args, kwargs);
+}
+
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+static PyObject *CPyMemo_Vectorcall(PyObject *self, PyObject *const *args, size_t nargsf,
+                                    PyObject *kwnames) {
+    return CPyObject_Vectorcall(((CPyMemoFunctionObject *)self)->func, args,
+                                PyVectorcall_NARGS(nargsf), kwnames);
+}
+#endif
+
+static PyObject *CPyMemo_GetFuncAttr(PyObject *self, void *name) {
+    return PyObject_GetAttrString(((CPyMemoFunctionObject *)self)->func, (const char *)name);
+}
+
+static int CPyMemo_Traverse(PyObject *self, visitproc visit, void *arg) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    CPyMemoEntry *entry;
+    for (entry = memo->first; entry != NULL; entry = entry->next) {
+        Py_ssize_t i;
+        for (i = 0; i < memo->nargs; i++) {
+            if (memo->kinds[i] == 'o') {
+                Py_VISIT(entry->key[i].o);
+            }
+        }
+        Py_VISIT(entry->result);
+    }
+    Py_VISIT(memo->func);
+    Py_VISIT(memo->wrapped);
+    return 0;
+}
+
+static int CPyMemo_TpClear(PyObject *self) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    CPyMemo_Clear(memo);
+    Py_CLEAR(memo->func);
+    Py_CLEAR(memo->wrapped);
+    return 0;
+}
+
+static void CPyMemo_Dealloc(PyObject *self) {
+    PyObject_GC_UnTrack(self);
+    CPyMemo_TpClear(self);
+    PyObject_GC_Del(self);
+}
+
+static PyMethodDef CPyMemo_Methods[] = {
+    {"cache_info", CPyMemo_CacheInfo, METH_NOARGS, NULL},
+    {"cache_clear", CPyMemo_CacheClear, METH_NOARGS, NULL},
+    {NULL, NULL, 0, NULL},
+};
+
+static PyMemberDef CPyMemo_Members[] = {
+    {"__wrapped__", T_OBJECT, offsetof(CPyMemoFunctionObject, wrapped), READONLY, NULL},
+    {NULL, 0, 0, 0, NULL},
+};
+
+static PyGetSetDef CPyMemo_GetSet[] = {
+    {"__name__", CPyMemo_GetFuncAttr, NULL, NULL, "__name__"},
+    {"__qualname__", CPyMemo_GetFuncAttr, NULL, NULL, "__qualname__"},
+    {"__module__", CPyMemo_GetFuncAttr, NULL, NULL, "__module__"},
+    {"__doc__", CPyMemo_GetFuncAttr, NULL, NULL, "__doc__"},
+    {NULL, NULL, NULL, NULL, NULL},
+};
+
+PyTypeObject CPyMemo_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "memoized_function",                    /* tp_name */
+    sizeof(CPyMemoFunctionObject),          /* tp_basicsize */
+};
+
+PyObject *CPyMemo_New(PyObject *func, PyObject *wrapped, Py_ssize_t maxsize, const char *kinds) {
+    if (!(CPyMemo_Type.tp_flags & Py_TPFLAGS_READY)) {
+        CPyMemo_Type.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC;
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 9
+        CPyMemo_Type.tp_flags |= Py_TPFLAGS_HAVE_VECTORCALL;
+#elif PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+        CPyMemo_Type.tp_flags |= _Py_TPFLAGS_HAVE_VECTORCALL;
+#endif
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+        CPyMemo_Type.tp_vectorcall_offset = offsetof(CPyMemoFunctionObject, vectorcall);
+#endif
+        CPyMemo_Type.tp_dealloc = CPyMemo_Dealloc;
+        CPyMemo_Type.tp_call = CPyMemo_Call;
+        CPyMemo_Type.tp_traverse = CPyMemo_Traverse;
+        CPyMemo_Type.tp_clear = CPyMemo_TpClear;
+        CPyMemo_Type.tp_methods = CPyMemo_Methods;
+        CPyMemo_Type.tp_members = CPyMemo_Members;
+        CPyMemo_Type.tp_getset = CPyMemo_GetSet;
+        if (PyType_Ready(&CPyMemo_Type) < 0) {
+            return NULL;
+        }
+    }
+    CPyMemoFunctionObject *memo = PyObject_GC_New(CPyMemoFunctionObject, &CPyMemo_Type);
+    if (memo == NULL) {
+        return NULL;
+    }
+    Py_INCREF(func);
+    memo->func = func;
+    Py_INCREF(wrapped);
+    memo->wrapped = wrapped;
+    memo->kinds = kinds;
+    memo->nargs = (Py_ssize_t)strlen(kinds);
+    memo->maxsize = maxsize < 0 ? -1 : maxsize;
+    memo->size = 0;
+    memo->nbuckets = 0;
+    memo->buckets = NULL;
+    memo->first = memo->last = NULL;
+    memo->hits = memo->misses = 0;
+    memo->version = 0;
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+    memo->vectorcall = CPyMemo_Vectorcall;
+#endif
+    PyObject_GC_Track(memo);
+    return (PyObject *)memo;
+}
@@ -235,6 +235,67 @@ error:
     return NULL;
 }
 
+// Set up the __dataclass_fields__ and __dataclass_params__ attributes of a
+// native dataclass. Applying the dataclass decorator to the native class
+// would replace its methods, so instead we apply it to a plain class with
+// the same field annotations and class body values (defaults and field()
+// calls), and copy the attributes.
+static bool CPyDataclass_SetupMetadata(PyTypeObject *tp, PyObject *annotations,
+                                       PyObject *values, PyObject *options) {
+    PyObject *ns = NULL, *name = NULL, *module = NULL, *shadow = NULL;
+    PyObject *dataclasses = NULL, *decorator = NULL, *args = NULL, *result = NULL;
+    static const char *attrs[] = {"__dataclass_fields__", "__dataclass_params__"};
+    bool ok = false;
+    Py_ssize_t i;
+
+    ns = PyDict_Copy(values);
+    if (!ns || PyDict_SetItemString(ns, "__annotations__", annotations) < 0)
+        goto done;
+    name = PyObject_GetAttrString((PyObject *)tp, "__name__");
+    module = PyObject_GetAttrString((PyObject *)tp, "__module__");
+    if (!name || !module || PyDict_SetItemString(ns, "__module__", module) < 0)
+        goto done;
+    shadow = PyObject_CallFunction((PyObject *)&PyType_Type, "O(O)O",
+                                   name, (PyObject *)&PyBaseObject_Type, ns);
+    if (!shadow)
+        goto done;
+
+    dataclasses = PyImport_ImportModule("dataclasses");
+    if (!dataclasses)
+        goto done;
+    decorator = PyObject_GetAttrString(dataclasses, "dataclass");
+    if (!decorator)
+        goto done;
+    args = PyTuple_Pack(1, shadow);
+    if (!args)
+        goto done;
+    result = PyObject_Call(decorator, args, options);
+    if (!result)
+        goto done;
+
+    for (i = 0; i < 2; i++) {
+        PyObject *value = PyObject_GetAttrString(result, attrs[i]);
+        if (!value)
+            goto done;
+        int res = PyObject_SetAttrString((PyObject *)tp, attrs[i], value);
+        Py_DECREF(value);
+        if (res < 0)
+            goto done;
+    }
+    ok = true;
+
+done:
+    Py_XDECREF(ns);
+    Py_XDECREF(name);
+    Py_XDECREF(module);
+    Py_XDECREF(shadow);
+    Py_XDECREF(dataclasses);
+    Py_XDECREF(decorator);
+    Py_XDECREF(args);
+    Py_XDECREF(result);
+    return ok;
+}
+
 // Get attribute value using vtable (may return an undefined value)
 #define CPY_GET_ATTR(obj, type, vtable_index, object_type, attr_type)    \
     ((attr_type (*)(object_type *))((object_type *)obj)->vtable[vtable_index])((object_type *)obj)
@@ -528,6 +589,99 @@ static CPyTagged CPyTagged_Remainder(CPyTagged left, CPyTagged right) {
     return CPyTagged_StealFromObject(result);
 }
 
+// Bitwise operations. The tag bit of a short int is zero, so &, | and ^
+// can operate directly on tagged short values.
+
+static CPyTagged CPyTagged_BitwiseLongOp(CPyTagged left, CPyTagged right,
+                                         PyObject *(*op)(PyObject *, PyObject *)) {
+    PyObject *left_obj = CPyTagged_AsObject(left);
+    PyObject *right_obj = CPyTagged_AsObject(right);
+    PyObject *result = op(left_obj, right_obj);
+    Py_DECREF(left_obj);
+    Py_DECREF(right_obj);
+    if (result == NULL) {
+        return CPY_INT_TAG;
+    }
+    return CPyTagged_StealFromObject(result);
+}
+
+static CPyTagged CPyTagged_And(CPyTagged left, CPyTagged right) {
+    if (likely(CPyTagged_CheckShort(left) && CPyTagged_CheckShort(right))) {
+        return left & right;
+    }
+    CPyTagged result = CPyTagged_BitwiseLongOp(left, right, PyNumber_And);
+    if (result == CPY_INT_TAG) {
+        CPyError_OutOfMemory();
+    }
+    return result;
+}
+
+static CPyTagged CPyTagged_Or(CPyTagged left, CPyTagged right) {
+    if (likely(CPyTagged_CheckShort(left) && CPyTagged_CheckShort(right))) {
+        return left | right;
+    }
+    CPyTagged result = CPyTagged_BitwiseLongOp(left, right, PyNumber_Or);
+    if (result == CPY_INT_TAG) {
+        CPyError_OutOfMemory();
+    }
+    return result;
+}
+
+static CPyTagged CPyTagged_Xor(CPyTagged left, CPyTagged right) {
+    if (likely(CPyTagged_CheckShort(left) && CPyTagged_CheckShort(right))) {
+        return left ^ right;
+    }
+    CPyTagged result = CPyTagged_BitwiseLongOp(left, right, PyNumber_Xor);
+    if (result == CPY_INT_TAG) {
+        CPyError_OutOfMemory();
+    }
+    return result;
+}
+
+static CPyTagged CPyTagged_Invert(CPyTagged num) {
+    if (likely(CPyTagged_CheckShort(num))) {
+        // ~x can't overflow, and the result only needs its tag bit cleared
+        return ~num & ~(CPyTagged)CPY_INT_TAG;
+    }
+    PyObject *num_obj = CPyTagged_AsObject(num);
+    PyObject *result = PyNumber_Invert(num_obj);
+    if (result == NULL) {
+        CPyError_OutOfMemory();
+    }
+    Py_DECREF(num_obj);
+    return CPyTagged_StealFromObject(result);
+}
+
+// Shifts may raise an exception (negative shift count or a result that is
+// too large), so these return CPY_INT_TAG on error.
+
+static CPyTagged CPyTagged_LeftShift(CPyTagged left, CPyTagged right) {
+    if (likely(CPyTagged_CheckShort(left) && CPyTagged_CheckShort(right))) {
+        Py_ssize_t shift = CPyTagged_ShortAsSsize_t(right);
+        if (shift >= 0 && shift < (Py_ssize_t)CPY_INT_BITS) {
+            Py_ssize_t result = (Py_ssize_t)((size_t)left << shift);
+            // If shifting back doesn't restore the value, bits were lost
+            if ((result >> shift) == (Py_ssize_t)left) {
+                return result;
+            }
+        }
+    }
+    return CPyTagged_BitwiseLongOp(left, right, PyNumber_Lshift);
+}
+
+static CPyTagged CPyTagged_RightShift(CPyTagged left, CPyTagged right) {
+    if (likely(CPyTagged_CheckShort(left) && CPyTagged_CheckShort(right))) {
+        Py_ssize_t shift = CPyTagged_ShortAsSsize_t(right);
+        if (shift >= (Py_ssize_t)CPY_INT_BITS) {
+            // The result is 0 or -1 depending on the sign
+            return (Py_ssize_t)left < 0 ? (CPyTagged)-2 : 0;
+        } else if (shift >= 0) {
+            return ((Py_ssize_t)left >> shift) & ~(Py_ssize_t)CPY_INT_TAG;
+        }
+    }
+    return CPyTagged_BitwiseLongOp(left, right, PyNumber_Rshift);
+}
+
 static bool CPyTagged_IsEq_(CPyTagged left, CPyTagged right) {
     if (CPyTagged_CheckShort(right)) {
         return false;
@@ -797,6 +951,70 @@ static PyObject *CPyDict_GetItem(PyObject *dict, PyObject *key) {
     }
 }
 
+// Inline cache for looking up a fixed key in a dict that rarely changes,
+// such as module globals. Every modification of a dict gives it a new
+// globally unique version tag (PEP 509), so the cached value is valid
+// while the dict has the cached version. The value is borrowed, since
+// the dict keeps it alive until the version changes.
+typedef struct {
+    PyObject *dict;
+    uint64_t version;
+    PyObject *value;
+} CPyDictCache;
+
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 6 && PY_MINOR_VERSION < 12
+#define CPY_DICT_VERSION(dict) (((PyDictObject *)(dict))->ma_version_tag)
+#endif
+
+// Equivalent to CPyDict_GetItem(dict, key), but uses an inline cache
+static PyObject *CPyDict_GetItemCached(PyObject *dict, PyObject *key, CPyDictCache *cache) {
+#ifdef CPY_DICT_VERSION
+    if (cache->dict == dict && cache->version == CPY_DICT_VERSION(dict)) {
+        Py_INCREF(cache->value);
+        return cache->value;
+    }
+    PyObject *res = CPyDict_GetItem(dict, key);
+    if (res != NULL && PyDict_CheckExact(dict)) {
+        cache->dict = dict;
+        cache->version = CPY_DICT_VERSION(dict);
+        cache->value = res;
+    }
+    return res;
+#else
+    (void)cache;
+    return CPyDict_GetItem(dict, key);
+#endif
+}
+
+// Equivalent to PyObject_GetAttr(module, name) for a name that isn't
+// defined by the module type (such as a dunder name), but uses an inline
+// cache for the module dict
+static PyObject *CPyModule_GetAttrCached(PyObject *module, PyObject *name, CPyDictCache *cache) {
+#ifdef CPY_DICT_VERSION
+    if (PyModule_CheckExact(module)) {
+        PyObject *dict = PyModule_GetDict(module);
+        if (cache->dict == dict && cache->version == CPY_DICT_VERSION(dict)) {
+            Py_INCREF(cache->value);
+            return cache->value;
+        }
+        PyObject *res = PyDict_GetItemWithError(dict, name);
+        if (res != NULL) {
+            cache->dict = dict;
+            cache->version = CPY_DICT_VERSION(dict);
+            cache->value = res;
+            Py_INCREF(res);
+            return res;
+        } else if (PyErr_Occurred()) {
+            return NULL;
+        }
+        // Fall back to module __getattr__ (or raise AttributeError)
+    }
+#else
+    (void)cache;
+#endif
+    return PyObject_GetAttr(module, name);
+}
+
 static PyObject *CPyDict_Get(PyObject *dict, PyObject *key, PyObject *fallback) {
     // We are dodgily assuming that get on a subclass doesn't have
     // different behavior.
@@ -913,13 +1131,614 @@ static inline bool CPyFloat_Check(PyObject *o) {
     return PyFloat_Check(o) || PyLong_Check(o);
 }
 
-static PyObject *CPyLong_FromFloat(PyObject *o) {
-    if (PyLong_Check(o)) {
-        CPy_INCREF(o);
-        return o;
+static inline bool CPyFloat_IsError(double x) {
+    // NaNs never compare equal, so compare the bit patterns
+    CPyFloatBits u;
+    u.value = x;
+    return u.bits == CPY_FLOAT_ERROR_BITS;
+}
+
+// Unbox a float (or an int, see above); the caller must check the type
+static double CPyFloat_FromObject(PyObject *o) {
+    double result;
+    if (PyFloat_Check(o)) {
+        result = PyFloat_AS_DOUBLE(o);
+    } else {
+        result = PyLong_AsDouble(o);
+        if (result == -1.0 && PyErr_Occurred()) {
+            return CPY_FLOAT_ERROR;
+        }
+    }
+    if (CPyFloat_IsError(result)) {
+        // Don't let a float object with the bit pattern of the error value
+        // look like an error
+        result = Py_NAN;
+    }
+    return result;
+}
+
+static double CPyFloat_FromTagged(CPyTagged x) {
+    if (CPyTagged_CheckShort(x)) {
+        return (double)CPyTagged_ShortAsSsize_t(x);
+    }
+    double result = PyLong_AsDouble(CPyTagged_LongAsObject(x));
+    if (result == -1.0 && PyErr_Occurred()) {
+        return CPY_FLOAT_ERROR;
+    }
+    return result;
+}
+
+static CPyTagged CPyTagged_FromFloat(double f) {
+    if (f > (double)CPY_TAGGED_MIN && f < (double)CPY_TAGGED_MAX) {
+        return CPyTagged_ShortFromSsize_t((Py_ssize_t)f);
+    }
+    // This also handles errors for infinities and NaNs
+    PyObject *o = PyLong_FromDouble(f);
+    if (o == NULL) {
+        return CPY_INT_TAG;
+    }
+    return CPyTagged_StealFromObject(o);
+}
+
+static double CPyFloat_TrueDivide(double x, double y) {
+    if (unlikely(y == 0.0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "float division by zero");
+        return CPY_FLOAT_ERROR;
+    }
+    return x / y;
+}
+
+// Floor division and modulo follow float_divmod and float_rem in CPython
+static double CPyFloat_FloorDivide(double x, double y) {
+    if (unlikely(y == 0.0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "float divmod()");
+        return CPY_FLOAT_ERROR;
+    }
+    double mod = fmod(x, y);
+    double div = (x - mod) / y;
+    if (mod && ((y < 0) != (mod < 0))) {
+        div -= 1.0;
+    }
+    if (div) {
+        double floordiv = floor(div);
+        if (div - floordiv > 0.5) {
+            floordiv += 1.0;
+        }
+        return floordiv;
+    }
+    return copysign(0.0, x / y);
+}
+
+static double CPyFloat_Remainder(double x, double y) {
+    if (unlikely(y == 0.0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "float modulo");
+        return CPY_FLOAT_ERROR;
+    }
+    double mod = fmod(x, y);
+    if (mod) {
+        if ((y < 0) != (mod < 0)) {
+            mod += y;
+        }
+    } else {
+        mod = copysign(0.0, y);
+    }
+    return mod;
+}
+
+static double CPyFloat_Power(double x, double y) {
+    if (x > 0.0 && isfinite(x) && isfinite(y)) {
+        double result = pow(x, y);
+        if (unlikely(isinf(result))) {
+            PyErr_SetString(PyExc_OverflowError, "(34, 'Numerical result out of range')");
+            return CPY_FLOAT_ERROR;
+        }
+        return result;
+    }
+    // Let Python deal with the special cases
+    PyObject *left = PyFloat_FromDouble(x);
+    PyObject *right = PyFloat_FromDouble(y);
+    PyObject *result = NULL;
+    if (left != NULL && right != NULL) {
+        result = PyNumber_Power(left, right, Py_None);
+    }
+    Py_XDECREF(left);
+    Py_XDECREF(right);
+    if (result == NULL) {
+        return CPY_FLOAT_ERROR;
+    }
+    double value = CPY_FLOAT_ERROR;
+    if (PyFloat_Check(result)) {
+        value = PyFloat_AS_DOUBLE(result);
     } else {
-        return PyLong_FromDouble(PyFloat_AS_DOUBLE(o));
+        // A negative number raised to a fractional power is complex
+        PyErr_SetString(PyExc_TypeError, "float object expected; got complex");
+    }
+    Py_DECREF(result);
+    return value;
+}
+
+// A negative number raised to a fractional power is a complex number, so
+// the result is an object. Other cases produce a float.
+static PyObject *CPyFloat_PowerObject(double x, double y) {
+    if (x >= 0.0 || floor(y) == y) {
+        double result = CPyFloat_Power(x, y);
+        if (unlikely(CPyFloat_IsError(result))) {
+            return NULL;
+        }
+        return PyFloat_FromDouble(result);
+    }
+    PyObject *left = PyFloat_FromDouble(x);
+    PyObject *right = PyFloat_FromDouble(y);
+    PyObject *result = NULL;
+    if (left != NULL && right != NULL) {
+        result = PyNumber_Power(left, right, Py_None);
+    }
+    Py_XDECREF(left);
+    Py_XDECREF(right);
+    return result;
+}
+
+static double CPyFloat_MathDomainError(void) {
+    PyErr_SetString(PyExc_ValueError, "math domain error");
+    return CPY_FLOAT_ERROR;
+}
+
+static double CPyFloat_Sqrt(double x) {
+    if (unlikely(x < 0.0)) {
+        return CPyFloat_MathDomainError();
+    }
+    return sqrt(x);
+}
+
+static double CPyFloat_Exp(double x) {
+    double result = exp(x);
+    if (unlikely(isinf(result) && isfinite(x))) {
+        PyErr_SetString(PyExc_OverflowError, "math range error");
+        return CPY_FLOAT_ERROR;
+    }
+    return result;
+}
+
+static double CPyFloat_Log(double x) {
+    if (unlikely(x <= 0.0)) {
+        return CPyFloat_MathDomainError();
+    }
+    return log(x);
+}
+
+static double CPyFloat_Sin(double x) {
+    if (unlikely(isinf(x))) {
+        return CPyFloat_MathDomainError();
+    }
+    return sin(x);
+}
+
+static double CPyFloat_Cos(double x) {
+    if (unlikely(isinf(x))) {
+        return CPyFloat_MathDomainError();
+    }
+    return cos(x);
+}
+
+static double CPyFloat_Tan(double x) {
+    if (unlikely(isinf(x))) {
+        return CPyFloat_MathDomainError();
+    }
+    return tan(x);
+}
+
+static CPyTagged CPyFloat_Floor(double x) {
+    return CPyTagged_FromFloat(floor(x));
+}
+
+static CPyTagged CPyFloat_Ceil(double x) {
+    return CPyTagged_FromFloat(ceil(x));
+}
+
+// Fixed-width integers (i64 and i32)
+//
+// Conversions from int raise OverflowError if the value doesn't fit,
+// while arithmetic wraps around. The error value CPY_LL_INT_ERROR is
+// also a valid value, so errors must be checked using CPyLLInt_IsError.
+
+static inline bool CPyLLInt_IsError(int64_t x) {
+    return x == CPY_LL_INT_ERROR && PyErr_Occurred() != NULL;
+}
+
+static int64_t CPyLong_AsInt64(PyObject *o) {
+    int overflow;
+    long long result = PyLong_AsLongLongAndOverflow(o, &overflow);
+    if (unlikely(overflow != 0)) {
+        PyErr_SetString(PyExc_OverflowError, "int too large to convert to i64");
+        return CPY_LL_INT_ERROR;
+    }
+    if (result == -1 && PyErr_Occurred()) {
+        return CPY_LL_INT_ERROR;
+    }
+    return result;
+}
+
+static int32_t CPyLong_AsInt32(PyObject *o) {
+    int overflow;
+    long result = PyLong_AsLongAndOverflow(o, &overflow);
+    if (unlikely(overflow != 0 || result > INT32_MAX || result < INT32_MIN)) {
+        PyErr_SetString(PyExc_OverflowError, "int too large to convert to i32");
+        return CPY_LL_INT_ERROR;
+    }
+    if (result == -1 && PyErr_Occurred()) {
+        return CPY_LL_INT_ERROR;
+    }
+    return result;
+}
+
+static int64_t CPyTagged_AsInt64(CPyTagged x) {
+    if (likely(CPyTagged_CheckShort(x))) {
+        return CPyTagged_ShortAsSsize_t(x);
+    }
+    return CPyLong_AsInt64(CPyTagged_LongAsObject(x));
+}
+
+static int32_t CPyTagged_AsInt32(CPyTagged x) {
+    if (likely(CPyTagged_CheckShort(x))) {
+        Py_ssize_t value = CPyTagged_ShortAsSsize_t(x);
+        if (likely(value >= INT32_MIN && value <= INT32_MAX)) {
+            return value;
+        }
+        PyErr_SetString(PyExc_OverflowError, "int too large to convert to i32");
+        return CPY_LL_INT_ERROR;
+    }
+    return CPyLong_AsInt32(CPyTagged_LongAsObject(x));
+}
+
+static CPyTagged CPyTagged_FromInt64(int64_t x) {
+    if (x >= CPY_TAGGED_MIN && x <= CPY_TAGGED_MAX) {
+        return CPyTagged_ShortFromSsize_t(x);
+    }
+    PyObject *o = PyLong_FromLongLong(x);
+    if (o == NULL) {
+        return CPY_INT_TAG;
+    }
+    return CPyTagged_StealFromObject(o);
+}
+
+static int32_t CPyInt32_FromInt64(int64_t x) {
+    if (unlikely(x > INT32_MAX || x < INT32_MIN)) {
+        PyErr_SetString(PyExc_OverflowError, "int too large to convert to i32");
+        return CPY_LL_INT_ERROR;
+    }
+    return x;
+}
+
+// Division and remainder round towards negative infinity, as for int
+
+static int64_t CPyInt64_Divide(int64_t x, int64_t y) {
+    if (unlikely(y == 0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "integer division or modulo by zero");
+        return CPY_LL_INT_ERROR;
+    }
+    if (unlikely(y == -1)) {
+        // Avoid overflow for INT64_MIN // -1, which wraps around
+        return (int64_t)(0 - (uint64_t)x);
+    }
+    int64_t d = x / y;
+    if (((x < 0) != (y < 0)) && d * y != x) {
+        d--;
+    }
+    return d;
+}
+
+static int64_t CPyInt64_Remainder(int64_t x, int64_t y) {
+    if (unlikely(y == 0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "integer division or modulo by zero");
+        return CPY_LL_INT_ERROR;
+    }
+    if (unlikely(y == -1)) {
+        return 0;
+    }
+    int64_t d = x % y;
+    if (((x < 0) != (y < 0)) && d != 0) {
+        d += y;
+    }
+    return d;
+}
+
+static int32_t CPyInt32_Divide(int32_t x, int32_t y) {
+    if (unlikely(y == 0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "integer division or modulo by zero");
+        return CPY_LL_INT_ERROR;
+    }
+    if (unlikely(y == -1)) {
+        return (int32_t)(0 - (uint32_t)x);
+    }
+    int32_t d = x / y;
+    if (((x < 0) != (y < 0)) && d * y != x) {
+        d--;
+    }
+    return d;
+}
+
+static int32_t CPyInt32_Remainder(int32_t x, int32_t y) {
+    if (unlikely(y == 0)) {
+        PyErr_SetString(PyExc_ZeroDivisionError, "integer division or modulo by zero");
+        return CPY_LL_INT_ERROR;
+    }
+    if (unlikely(y == -1)) {
+        return 0;
+    }
+    int32_t d = x % y;
+    if (((x < 0) != (y < 0)) && d != 0) {
+        d += y;
+    }
+    return d;
+}
+
+// Bits shifted out on the left are discarded, and shifting by at least the
+// width of the type produces 0 (or -1 for right shifts of negative values).
+
+static int64_t CPyInt64_LeftShift(int64_t x, int64_t y) {
+    if (unlikely(y < 0)) {
+        PyErr_SetString(PyExc_ValueError, "negative shift count");
+        return CPY_LL_INT_ERROR;
+    }
+    if (y >= 64) {
+        return 0;
+    }
+    return (int64_t)((uint64_t)x << y);
+}
+
+static int64_t CPyInt64_RightShift(int64_t x, int64_t y) {
+    if (unlikely(y < 0)) {
+        PyErr_SetString(PyExc_ValueError, "negative shift count");
+        return CPY_LL_INT_ERROR;
+    }
+    if (y >= 64) {
+        return x < 0 ? -1 : 0;
+    }
+    return x >> y;
+}
+
+static int32_t CPyInt32_LeftShift(int32_t x, int32_t y) {
+    if (unlikely(y < 0)) {
+        PyErr_SetString(PyExc_ValueError, "negative shift count");
+        return CPY_LL_INT_ERROR;
+    }
+    if (y >= 32) {
+        return 0;
+    }
+    return (int32_t)((uint32_t)x << y);
+}
+
+static int32_t CPyInt32_RightShift(int32_t x, int32_t y) {
+    if (unlikely(y < 0)) {
+        PyErr_SetString(PyExc_ValueError, "negative shift count");
+        return CPY_LL_INT_ERROR;
+    }
+    if (y >= 32) {
+        return x < 0 ? -1 : 0;
+    }
+    return x >> y;
+}
+
+// Typed arrays (FloatArray, IntArray, I64Array and I32Array)
+//
+// These are array.array objects. The array type doesn't have a C API,
+// so we mirror the start of its object layout (which has been stable
+// across Python versions) and access the item buffer directly.
+
+typedef struct {
+    char typecode;
+    int itemsize;
+} CPyArrayDescr;
+
+typedef struct {
+    PyObject_VAR_HEAD
+    char *ob_item;
+    Py_ssize_t allocated;
+    const CPyArrayDescr *ob_descr;
+    PyObject *weakreflist;
+    Py_ssize_t ob_exports;
+} CPyArrayObject;
+
+#define CPyArray_ITEMS(a, ctype) ((ctype *)((CPyArrayObject *)(a))->ob_item)
+
+static PyTypeObject *CPyArray_Type = NULL;
+
+// Check if an object is an array.array with the given type code
+static bool CPyArray_Check(PyObject *o, char typecode) {
+    if (unlikely(CPyArray_Type == NULL)) {
+        PyObject *module = PyImport_ImportModule("array");
+        if (module == NULL) {
+            PyErr_Clear();
+            return false;
+        }
+        CPyArray_Type = (PyTypeObject *)PyObject_GetAttrString(module, "array");
+        Py_DECREF(module);
+        if (CPyArray_Type == NULL) {
+            PyErr_Clear();
+            return false;
+        }
+    }
+    return PyObject_TypeCheck(o, CPyArray_Type)
+        && ((CPyArrayObject *)o)->ob_descr->typecode == typecode;
+}
+
+// Convert an index to a non-negative in-bounds index, or return -1 and
+// raise IndexError if out of bounds
+static Py_ssize_t CPyArray_AdjustIndex(PyObject *a, CPyTagged index) {
+    if (CPyTagged_CheckShort(index)) {
+        Py_ssize_t n = CPyTagged_ShortAsSsize_t(index);
+        Py_ssize_t size = Py_SIZE(a);
+        if (n < 0) {
+            n += size;
+        }
+        if (n >= 0 && n < size) {
+            return n;
+        }
+    }
+    PyErr_SetString(PyExc_IndexError, "array index out of range");
+    return -1;
+}
+
+// Make room for one more item, using the same growth pattern as array.array.
+// Returns the index of the new item, or -1 on error.
+static Py_ssize_t CPyArray_Grow(PyObject *a) {
+    CPyArrayObject *array = (CPyArrayObject *)a;
+    Py_ssize_t size = Py_SIZE(a);
+    if (unlikely(array->ob_exports > 0)) {
+        PyErr_SetString(PyExc_BufferError,
+                        "cannot resize an array that is exporting buffers");
+        return -1;
+    }
+    if (likely(size < array->allocated)) {
+        ((PyVarObject *)a)->ob_size = size + 1;
+        return size;
+    }
+    Py_ssize_t allocated = size + 1 + ((size + 1) >> 4) + (size < 8 ? 3 : 7);
+    int itemsize = array->ob_descr->itemsize;
+    if (allocated > PY_SSIZE_T_MAX / itemsize) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    char *items = PyMem_Realloc(array->ob_item, allocated * itemsize);
+    if (items == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    array->ob_item = items;
+    array->allocated = allocated;
+    ((PyVarObject *)a)->ob_size = size + 1;
+    return size;
+}
+
+static inline double CPyFloatArray_GetItemUnsafe(PyObject *a, CPyTagged index) {
+    double result = CPyArray_ITEMS(a, double)[CPyTagged_ShortAsSsize_t(index)];
+    if (unlikely(CPyFloat_IsError(result))) {
+        // Don't let an item with the bit pattern of the error value look like an error
+        result = Py_NAN;
+    }
+    return result;
+}
+
+static double CPyFloatArray_GetItem(PyObject *a, CPyTagged index) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return CPY_FLOAT_ERROR;
+    }
+    return CPyFloatArray_GetItemUnsafe(a, CPyTagged_ShortFromSsize_t(n));
+}
+
+static bool CPyFloatArray_SetItem(PyObject *a, CPyTagged index, double value) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, double)[n] = value;
+    return true;
+}
+
+static bool CPyFloatArray_Append(PyObject *a, double value) {
+    Py_ssize_t n = CPyArray_Grow(a);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, double)[n] = value;
+    return true;
+}
+
+static inline int64_t CPyInt64Array_GetItemUnsafe(PyObject *a, CPyTagged index) {
+    return CPyArray_ITEMS(a, int64_t)[CPyTagged_ShortAsSsize_t(index)];
+}
+
+static int64_t CPyInt64Array_GetItem(PyObject *a, CPyTagged index) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return CPY_LL_INT_ERROR;
+    }
+    return CPyArray_ITEMS(a, int64_t)[n];
+}
+
+static bool CPyInt64Array_SetItem(PyObject *a, CPyTagged index, int64_t value) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, int64_t)[n] = value;
+    return true;
+}
+
+static bool CPyInt64Array_Append(PyObject *a, int64_t value) {
+    Py_ssize_t n = CPyArray_Grow(a);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, int64_t)[n] = value;
+    return true;
+}
+
+static inline int32_t CPyInt32Array_GetItemUnsafe(PyObject *a, CPyTagged index) {
+    return CPyArray_ITEMS(a, int32_t)[CPyTagged_ShortAsSsize_t(index)];
+}
+
+static int32_t CPyInt32Array_GetItem(PyObject *a, CPyTagged index) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return CPY_LL_INT_ERROR;
+    }
+    return CPyArray_ITEMS(a, int32_t)[n];
+}
+
+static bool CPyInt32Array_SetItem(PyObject *a, CPyTagged index, int32_t value) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, int32_t)[n] = value;
+    return true;
+}
+
+static bool CPyInt32Array_Append(PyObject *a, int32_t value) {
+    Py_ssize_t n = CPyArray_Grow(a);
+    if (n < 0) {
+        return false;
+    }
+    CPyArray_ITEMS(a, int32_t)[n] = value;
+    return true;
+}
+
+// IntArray items are stored as int64_t, so reads may need to allocate a long
+// int and writes raise OverflowError if the value is too large.
+
+static inline CPyTagged CPyIntArray_GetItemUnsafe(PyObject *a, CPyTagged index) {
+    return CPyTagged_FromInt64(CPyInt64Array_GetItemUnsafe(a, index));
+}
+
+static CPyTagged CPyIntArray_GetItem(PyObject *a, CPyTagged index) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return CPY_INT_TAG;
+    }
+    return CPyTagged_FromInt64(CPyArray_ITEMS(a, int64_t)[n]);
+}
+
+static bool CPyIntArray_SetItem(PyObject *a, CPyTagged index, CPyTagged value) {
+    Py_ssize_t n = CPyArray_AdjustIndex(a, index);
+    if (n < 0) {
+        return false;
+    }
+    int64_t x = CPyTagged_AsInt64(value);
+    if (unlikely(CPyLLInt_IsError(x))) {
+        return false;
+    }
+    CPyArray_ITEMS(a, int64_t)[n] = x;
+    return true;
+}
+
+static bool CPyIntArray_Append(PyObject *a, CPyTagged value) {
+    int64_t x = CPyTagged_AsInt64(value);
+    if (unlikely(CPyLLInt_IsError(x))) {
+        return false;
     }
+    return CPyInt64Array_Append(a, x);
 }
 
 // These functions are basically exactly PyCode_NewEmpty and
@@ -1178,9 +1997,608 @@ static int CPy_YieldFromErrorHandle(PyObject *iter, PyObject **outp)
     return 2;
 }
 
+// Call a Python object with nargs positional arguments followed by the
+// values of the keyword arguments named in kwnames (which may be NULL).
+// This avoids building an argument tuple and a keyword dict if the
+// Python version supports the vectorcall (or fastcall) protocol.
+static PyObject *CPyObject_Vectorcall(PyObject *callable, PyObject *const *args,
+                                      Py_ssize_t nargs, PyObject *kwnames) {
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 9
+    return PyObject_Vectorcall(callable, args, nargs, kwnames);
+#elif PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+    return _PyObject_Vectorcall(callable, args, nargs, kwnames);
+#elif PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 6
+    return _PyObject_FastCallKeywords(callable, (PyObject **)args, nargs, kwnames);
+#else
+    Py_ssize_t nkwargs = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    PyObject *tuple = PyTuple_New(nargs);
+    if (tuple == NULL) {
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < nargs; i++) {
+        Py_INCREF(args[i]);
+        PyTuple_SET_ITEM(tuple, i, args[i]);
+    }
+    PyObject *kwargs = NULL;
+    if (nkwargs > 0) {
+        kwargs = PyDict_New();
+        if (kwargs == NULL) {
+            Py_DECREF(tuple);
+            return NULL;
+        }
+        for (Py_ssize_t i = 0; i < nkwargs; i++) {
+            if (PyDict_SetItem(kwargs, PyTuple_GET_ITEM(kwnames, i), args[nargs + i]) < 0) {
+                Py_DECREF(tuple);
+                Py_DECREF(kwargs);
+                return NULL;
+            }
+        }
+    }
+    PyObject *result = PyObject_Call(callable, tuple, kwargs);
+    Py_DECREF(tuple);
+    Py_XDECREF(kwargs);
+    return result;
+#endif
+}
+
+// Look up a method like _PyObject_GetMethod, which isn't part of the C
+// API before Python 3.9. If the attribute is a function or a method
+// descriptor defined in the type (and not shadowed by an instance
+// attribute), store the unbound method in *method and return 1.
+// Otherwise store the attribute (or NULL on error) and return 0.
+static int CPy_GetMethod(PyObject *obj, PyObject *name, PyObject **method) {
+    PyTypeObject *type = Py_TYPE(obj);
+    if (type->tp_getattro == PyObject_GenericGetAttr && PyUnicode_CheckExact(name)) {
+        PyObject *descr = _PyType_Lookup(type, name);
+        if (descr != NULL && (PyFunction_Check(descr)
+                              || Py_TYPE(descr) == &PyMethodDescr_Type)) {
+            PyObject **dictptr = _PyObject_GetDictPtr(obj);
+            if (dictptr == NULL || *dictptr == NULL || PyDict_GetItem(*dictptr, name) == NULL) {
+                Py_INCREF(descr);
+                *method = descr;
+                return 1;
+            }
+        }
+    }
+    *method = PyObject_GetAttr(obj, name);
+    return 0;
+}
+
+// Call a method of args[0] with the rest of args as arguments (see
+// CPyObject_Vectorcall). If the attribute is a plain method, it's called
+// with args[0] as self instead of creating a bound method object.
+static PyObject *CPyObject_VectorcallMethod(PyObject *name, PyObject *const *args,
+                                            Py_ssize_t nargs, PyObject *kwnames) {
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 9
+    return PyObject_VectorcallMethod(name, args, nargs, kwnames);
+#else
+    PyObject *method;
+    PyObject *result;
+    int unbound = CPy_GetMethod(args[0], name, &method);
+    if (method == NULL) {
+        return NULL;
+    }
+    if (unbound) {
+        result = CPyObject_Vectorcall(method, args, nargs, kwnames);
+    } else {
+        result = CPyObject_Vectorcall(method, args + 1, nargs - 1, kwnames);
+    }
+    Py_DECREF(method);
+    return result;
+#endif
+}
+
+// Inline cache for reading a fixed attribute of non-native objects at a
+// single site in the generated code. It records how the attribute is
+// found on one type, and is valid while the version tag of the type is
+// unchanged. (A version tag changes whenever the type or one of its
+// bases is modified.) The type pointer is also compared in case version
+// tags wrap around. The cached descriptor is borrowed, since the type
+// keeps it alive as long as the version tag is valid.
+typedef struct {
+    PyTypeObject *type;
+    unsigned int version;
+    int kind;
+    PyObject *descr;
+    Py_ssize_t offset;
+} CPyAttrCache;
+
+// Attribute not defined in the type: look it up in the instance __dict__
+#define CPY_ATTR_INSTANCE 0
+// Object __slots__ member at a fixed offset
+#define CPY_ATTR_SLOT 1
+// Other data descriptor (such as a property)
+#define CPY_ATTR_DATA_DESCR 2
+// Non-data descriptor (such as a method) or a plain class attribute,
+// which can be shadowed by the instance __dict__
+#define CPY_ATTR_CLASS 3
+
+// Record how an attribute is found on a type. Return false if the type
+// can't be cached (it has custom attribute lookup or no valid version tag).
+static bool CPyAttrCache_Fill(CPyAttrCache *cache, PyTypeObject *type, PyObject *name) {
+    if (type->tp_getattro != PyObject_GenericGetAttr) {
+        return false;
+    }
+    PyObject *descr = _PyType_Lookup(type, name);
+    if (!PyType_HasFeature(type, Py_TPFLAGS_VALID_VERSION_TAG) || type->tp_version_tag == 0) {
+        return false;
+    }
+    cache->type = type;
+    cache->version = type->tp_version_tag;
+    cache->descr = descr;
+    if (descr == NULL) {
+        cache->kind = CPY_ATTR_INSTANCE;
+    } else if (Py_TYPE(descr) == &PyMemberDescr_Type
+               && ((PyMemberDescrObject *)descr)->d_member->type == T_OBJECT_EX) {
+        cache->kind = CPY_ATTR_SLOT;
+        cache->offset = ((PyMemberDescrObject *)descr)->d_member->offset;
+    } else if (Py_TYPE(descr)->tp_descr_get != NULL && Py_TYPE(descr)->tp_descr_set != NULL) {
+        cache->kind = CPY_ATTR_DATA_DESCR;
+    } else {
+        cache->kind = CPY_ATTR_CLASS;
+    }
+    return true;
+}
+
+// Equivalent to PyObject_GetAttr(obj, name), but uses an inline cache
+// for the type of obj. Misses (and errors) use the generic path.
+static PyObject *CPyObject_GetAttrCached(PyObject *obj, PyObject *name, CPyAttrCache *cache) {
+    PyTypeObject *type = Py_TYPE(obj);
+    if (type != cache->type
+        || type->tp_version_tag != cache->version
+        || !PyType_HasFeature(type, Py_TPFLAGS_VALID_VERSION_TAG)) {
+        if (!CPyAttrCache_Fill(cache, type, name)) {
+            return PyObject_GetAttr(obj, name);
+        }
+    }
+
+    PyObject *descr = cache->descr;
+    PyObject *result;
+    switch (cache->kind) {
+    case CPY_ATTR_SLOT:
+        result = *(PyObject **)((char *)obj + cache->offset);
+        if (result != NULL) {
+            Py_INCREF(result);
+            return result;
+        }
+        break;
+    case CPY_ATTR_DATA_DESCR:
+        Py_INCREF(descr);
+        result = Py_TYPE(descr)->tp_descr_get(descr, obj, (PyObject *)type);
+        Py_DECREF(descr);
+        return result;
+    default:
+        // The dict lookup may run arbitrary code, so hold on to the descriptor
+        Py_XINCREF(descr);
+        if (type->tp_dictoffset != 0) {
+            PyObject **dictptr = _PyObject_GetDictPtr(obj);
+            if (dictptr != NULL && *dictptr != NULL) {
+                result = PyDict_GetItemWithError(*dictptr, name);
+                if (result != NULL || PyErr_Occurred()) {
+                    Py_XINCREF(result);
+                    Py_XDECREF(descr);
+                    return result;
+                }
+            }
+        }
+        if (descr != NULL) {
+            descrgetfunc get = Py_TYPE(descr)->tp_descr_get;
+            if (get == NULL) {
+                return descr;
+            }
+            result = get(descr, obj, (PyObject *)type);
+            Py_DECREF(descr);
+            return result;
+        }
+        break;
+    }
+    // Let the generic path raise AttributeError
+    return PyObject_GetAttr(obj, name);
+}
+
 int CPyArg_ParseTupleAndKeywords(PyObject *, PyObject *,
                                  const char *, char **, ...);
 
+// A precompiled argument parser spec for the METH_FASTCALL wrapper of a
+// compiled function. Only the fields format and keywords are set
+// statically; the rest are filled in from them on first use. Only
+// the 'O' format unit is supported.
+typedef struct {
+    const char *format;
+    const char * const *keywords;
+    const char *fname;
+    int min;
+    int max;
+    PyObject *kwtuple;  // Interned keyword names
+} CPyArg_Parser;
+
+int CPyArg_ParseStackAndKeywords(PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames,
+                                 CPyArg_Parser *parser, ...);
+
+typedef PyObject *(*CPyFastcallWrapper)(PyObject *, PyObject *const *, Py_ssize_t, PyObject *);
+
+// Call a METH_FASTCALL wrapper with a tuple of positional arguments
+// and a dict of keyword arguments (which may be NULL)
+static PyObject *CPy_CallFastcallWrapper(CPyFastcallWrapper wrapper, PyObject *self,
+                                         PyObject *args, PyObject *kwds) {
+    Py_ssize_t nargs = PyTuple_GET_SIZE(args);
+    Py_ssize_t nkwargs = kwds == NULL ? 0 : PyDict_Size(kwds);
+    if (nkwargs == 0) {
+        return wrapper(self, ((PyTupleObject *)args)->ob_item, nargs, NULL);
+    }
+
+    PyObject **stack = PyMem_New(PyObject *, nargs + nkwargs);
+    if (stack == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    PyObject *kwnames = PyTuple_New(nkwargs);
+    if (kwnames == NULL) {
+        PyMem_Free(stack);
+        return NULL;
+    }
+    memcpy(stack, ((PyTupleObject *)args)->ob_item, nargs * sizeof(PyObject *));
+    Py_ssize_t pos = 0, i = 0;
+    PyObject *key, *value;
+    while (PyDict_Next(kwds, &pos, &key, &value)) {
+        Py_INCREF(key);
+        PyTuple_SET_ITEM(kwnames, i, key);
+        stack[nargs + i] = value;
+        i++;
+    }
+    PyObject *result = wrapper(self, stack, nargs, kwnames);
+    Py_DECREF(kwnames);
+    PyMem_Free(stack);
+    return result;
+}
+
+// Method table entry (function pointer and flags) for a compiled
+// function, using the fastcall wrapper if the Python version has
+// METH_FASTCALL | METH_KEYWORDS
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 7
+#define CPY_FASTCALL_METHOD(fastcall, varargs) \
+    (PyCFunction)(void(*)(void))fastcall, METH_FASTCALL | METH_KEYWORDS
+#else
+#define CPY_FASTCALL_METHOD(fastcall, varargs) \
+    (PyCFunction)varargs, METH_VARARGS | METH_KEYWORDS
+#endif
+
+// Memoization caches for functions decorated with mypyc_extensions.memoize.
+//
+// Python sees a memoized function as a CPyMemoFunction object that
+// wraps the compiled function and owns the cache. The compiled function
+// looks up and stores results itself, so native calls bypass the
+// wrapper object. Keys are built from unboxed argument values; the
+// kind of each key item is one of
+//
+//   't': tagged int
+//   'f': double
+//   'w': other unboxed value, stored as int64_t
+//   'o': object
+//
+// Entries are kept in a hash table with chaining and in a
+// doubly-linked list in LRU order (most recently used first).
+
+typedef union {
+    CPyTagged t;
+    double f;
+    int64_t w;
+    PyObject *o;
+} CPyMemoWord;
+
+typedef struct CPyMemoEntry {
+    struct CPyMemoEntry *chain;  // Next entry in the same bucket
+    struct CPyMemoEntry *prev;
+    struct CPyMemoEntry *next;
+    Py_hash_t hash;
+    PyObject *result;
+    CPyMemoWord key[1];
+} CPyMemoEntry;
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *func;
+    PyObject *wrapped;  // The undecorated function (__wrapped__)
+    const char *kinds;
+    Py_ssize_t nargs;
+    Py_ssize_t maxsize;  // -1 if unbounded
+    Py_ssize_t size;
+    Py_ssize_t nbuckets;  // Zero or a power of two
+    CPyMemoEntry **buckets;
+    CPyMemoEntry *first;
+    CPyMemoEntry *last;
+    Py_ssize_t hits;
+    Py_ssize_t misses;
+    // Changed whenever an entry is removed or the table is resized, so
+    // that a lookup can tell if Python code run by __eq__ modified it
+    size_t version;
+#if PY_MAJOR_VERSION >= 3 && PY_MINOR_VERSION >= 8
+    vectorcallfunc vectorcall;
+#endif
+} CPyMemoFunctionObject;
+
+static Py_hash_t CPyMemo_Hash(CPyMemoFunctionObject *memo, CPyMemoWord *key) {
+    Py_uhash_t hash = 0x345678UL;
+    Py_ssize_t i;
+    for (i = 0; i < memo->nargs; i++) {
+        Py_hash_t item;
+        switch (memo->kinds[i]) {
+        case 't':
+            if (CPyTagged_CheckShort(key[i].t)) {
+                item = CPyTagged_ShortAsSsize_t(key[i].t);
+            } else {
+                item = PyObject_Hash(CPyTagged_LongAsObject(key[i].t));
+                if (item == -1) {
+                    return -1;
+                }
+            }
+            break;
+        case 'f':
+            if (key[i].f == 0.0) {
+                // 0.0 == -0.0
+                item = 0;
+            } else {
+                int64_t bits;
+                memcpy(&bits, &key[i].f, sizeof(bits));
+                item = (Py_hash_t)bits;
+            }
+            break;
+        case 'w':
+            item = (Py_hash_t)key[i].w;
+            break;
+        default:
+            item = PyObject_Hash(key[i].o);
+            if (item == -1) {
+                return -1;
+            }
+        }
+        hash = (hash ^ (Py_uhash_t)item) * 1000003UL;
+    }
+    if (hash == (Py_uhash_t)-1) {
+        hash = (Py_uhash_t)-2;
+    }
+    return (Py_hash_t)hash;
+}
+
+// Compare the key of an entry with a key. Return 1 if equal, 0 if not,
+// -1 on error and 2 if the cache was modified by the comparison.
+static int CPyMemo_KeyEq(CPyMemoFunctionObject *memo, CPyMemoWord *entry_key,
+                         CPyMemoWord *key) {
+    Py_ssize_t i;
+    for (i = 0; i < memo->nargs; i++) {
+        switch (memo->kinds[i]) {
+        case 't':
+            if (entry_key[i].t != key[i].t
+                    && (CPyTagged_CheckShort(entry_key[i].t) || CPyTagged_CheckShort(key[i].t)
+                        || !CPyTagged_IsEq(entry_key[i].t, key[i].t))) {
+                return 0;
+            }
+            break;
+        case 'f':
+            // Compare the bits first (like the identity check of objects), so
+            // that a NaN matches itself
+            if (entry_key[i].f != key[i].f
+                    && memcmp(&entry_key[i].f, &key[i].f, sizeof(double)) != 0) {
+                return 0;
+            }
+            break;
+        case 'w':
+            if (entry_key[i].w != key[i].w) {
+                return 0;
+            }
+            break;
+        default:
+            if (entry_key[i].o != key[i].o) {
+                size_t version = memo->version;
+                PyObject *item = entry_key[i].o;
+                // The entry may be removed while __eq__ runs
+                Py_INCREF(item);
+                int res = PyObject_RichCompareBool(item, key[i].o, Py_EQ);
+                Py_DECREF(item);
+                if (memo->version != version) {
+                    return res < 0 ? -1 : 2;
+                }
+                if (res <= 0) {
+                    return res;
+                }
+            }
+        }
+    }
+    return 1;
+}
+
+// Find the entry for a key. Return 1 and set *found if there is one,
+// 0 if not and -1 on error.
+static int CPyMemo_Find(CPyMemoFunctionObject *memo, CPyMemoWord *key, Py_hash_t hash,
+                        CPyMemoEntry **found) {
+    CPyMemoEntry *entry;
+  restart:
+    if (memo->nbuckets == 0) {
+        return 0;
+    }
+    for (entry = memo->buckets[(size_t)hash & (size_t)(memo->nbuckets - 1)];
+         entry != NULL;
+         entry = entry->chain) {
+        if (entry->hash == hash) {
+            int res = CPyMemo_KeyEq(memo, entry->key, key);
+            if (res == 2) {
+                goto restart;
+            } else if (res != 0) {
+                *found = entry;
+                return res;
+            }
+        }
+    }
+    return 0;
+}
+
+static void CPyMemo_Unlink(CPyMemoFunctionObject *memo, CPyMemoEntry *entry) {
+    CPyMemoEntry **link = &memo->buckets[(size_t)entry->hash & (size_t)(memo->nbuckets - 1)];
+    while (*link != entry) {
+        link = &(*link)->chain;
+    }
+    *link = entry->chain;
+    if (entry->prev != NULL) {
+        entry->prev->next = entry->next;
+    } else {
+        memo->first = entry->next;
+    }
+    if (entry->next != NULL) {
+        entry->next->prev = entry->prev;
+    } else {
+        memo->last = entry->prev;
+    }
+    memo->size--;
+    memo->version++;
+}
+
+static void CPyMemo_PushFront(CPyMemoFunctionObject *memo, CPyMemoEntry *entry) {
+    entry->prev = NULL;
+    entry->next = memo->first;
+    if (memo->first != NULL) {
+        memo->first->prev = entry;
+    } else {
+        memo->last = entry;
+    }
+    memo->first = entry;
+}
+
+static void CPyMemo_FreeEntry(CPyMemoFunctionObject *memo, CPyMemoEntry *entry) {
+    Py_ssize_t i;
+    for (i = 0; i < memo->nargs; i++) {
+        if (memo->kinds[i] == 't') {
+            CPyTagged_DecRef(entry->key[i].t);
+        } else if (memo->kinds[i] == 'o') {
+            Py_DECREF(entry->key[i].o);
+        }
+    }
+    Py_DECREF(entry->result);
+    PyMem_Free(entry);
+}
+
+static int CPyMemo_Resize(CPyMemoFunctionObject *memo, Py_ssize_t nbuckets) {
+    CPyMemoEntry **buckets = PyMem_Calloc(nbuckets, sizeof(CPyMemoEntry *));
+    if (buckets == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    Py_ssize_t i;
+    for (i = 0; i < memo->nbuckets; i++) {
+        CPyMemoEntry *entry = memo->buckets[i];
+        while (entry != NULL) {
+            CPyMemoEntry *next = entry->chain;
+            size_t index = (size_t)entry->hash & (size_t)(nbuckets - 1);
+            entry->chain = buckets[index];
+            buckets[index] = entry;
+            entry = next;
+        }
+    }
+    PyMem_Free(memo->buckets);
+    memo->buckets = buckets;
+    memo->nbuckets = nbuckets;
+    memo->version++;
+    return 0;
+}
+
+// Look up the cached result of a call. Return a new reference to the
+// result, a new reference to the memo object itself if there is no
+// cached result, or NULL on error.
+static PyObject *CPyMemo_Lookup(PyObject *self, CPyMemoWord *key) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    Py_hash_t hash = CPyMemo_Hash(memo, key);
+    if (hash == -1) {
+        return NULL;
+    }
+    CPyMemoEntry *entry;
+    int res = CPyMemo_Find(memo, key, hash, &entry);
+    if (res < 0) {
+        return NULL;
+    } else if (res == 0) {
+        memo->misses++;
+        Py_INCREF(self);
+        return self;
+    }
+    memo->hits++;
+    if (entry != memo->first) {
+        entry->prev->next = entry->next;
+        if (entry->next != NULL) {
+            entry->next->prev = entry->prev;
+        } else {
+            memo->last = entry->prev;
+        }
+        CPyMemo_PushFront(memo, entry);
+    }
+    Py_INCREF(entry->result);
+    return entry->result;
+}
+
+// Add the result of a call to the cache, evicting the least recently
+// used entry if the cache is full. Return 0 on error.
+static char CPyMemo_Store(PyObject *self, PyObject *result, CPyMemoWord *key) {
+    CPyMemoFunctionObject *memo = (CPyMemoFunctionObject *)self;
+    if (memo->maxsize == 0) {
+        return 1;
+    }
+    Py_hash_t hash = CPyMemo_Hash(memo, key);
+    if (hash == -1) {
+        return 0;
+    }
+    CPyMemoEntry *entry;
+    int res = CPyMemo_Find(memo, key, hash, &entry);
+    if (res < 0) {
+        return 0;
+    } else if (res == 1) {
+        // A recursive call with the same arguments already stored a result
+        return 1;
+    }
+    if (memo->size + 1 > memo->nbuckets / 4 * 3
+            && CPyMemo_Resize(memo, memo->nbuckets == 0 ? 8 : memo->nbuckets * 2) < 0) {
+        return 0;
+    }
+    entry = PyMem_Malloc(sizeof(CPyMemoEntry) + memo->nargs * sizeof(CPyMemoWord));
+    if (entry == NULL) {
+        PyErr_NoMemory();
+        return 0;
+    }
+    Py_ssize_t i;
+    for (i = 0; i < memo->nargs; i++) {
+        entry->key[i] = key[i];
+        if (memo->kinds[i] == 't') {
+            CPyTagged_IncRef(key[i].t);
+        } else if (memo->kinds[i] == 'o') {
+            Py_INCREF(key[i].o);
+        }
+    }
+    Py_INCREF(result);
+    entry->result = result;
+    entry->hash = hash;
+    CPyMemoEntry **bucket = &memo->buckets[(size_t)hash & (size_t)(memo->nbuckets - 1)];
+    entry->chain = *bucket;
+    *bucket = entry;
+    CPyMemo_PushFront(memo, entry);
+    memo->size++;
+
+    // Free the evicted entry only after the cache is consistent again,
+    // since freeing it may run arbitrary code
+    if (memo->maxsize > 0 && memo->size > memo->maxsize) {
+        CPyMemoEntry *evicted = memo->last;
+        CPyMemo_Unlink(memo, evicted);
+        CPyMemo_FreeEntry(memo, evicted);
+    }
+    return 1;
+}
+
+// The type of memo objects (defined in CPy.c, so that there is a single
+// copy of it)
+extern PyTypeObject CPyMemo_Type;
+
+// Create the memo object of a compiled function. Here func is the
+// function that Python code calls (which uses the cache), and wrapped is
+// the undecorated function. Each function has its own key kinds string
+// (which must be a string literal). A negative maxsize means that the
+// cache is unbounded.
+PyObject *CPyMemo_New(PyObject *func, PyObject *wrapped, Py_ssize_t maxsize, const char *kinds);
+
 #ifdef __cplusplus
 }
 #endif
@@ -25,6 +25,19 @@ int CPyArg_ParseTupleAndKeywords(PyObject *, PyObject *,
 int CPyArg_VaParseTupleAndKeywords(PyObject *, PyObject *,
                                    const char *, char **, va_list);
 
+/* Keep in sync with CPy.h */
+typedef struct {
+    const char *format;
+    const char * const *keywords;
+    const char *fname;
+    int min;
+    int max;
+    PyObject *kwtuple;
+} CPyArg_Parser;
+
+int CPyArg_ParseStackAndKeywords(PyObject *const *, Py_ssize_t, PyObject *,
+                                 CPyArg_Parser *, ...);
+
 
 #define FLAG_COMPAT 1
 #define FLAG_SIZE_T 2
@@ -1419,6 +1432,183 @@ vgetargskeywords(PyObject *args, PyObject *kwargs, const char *format,
 }
 
 
+/* Fill in the derived fields of a parser spec on first use. */
+static int
+parser_init(CPyArg_Parser *parser)
+{
+    const char *format;
+    PyObject *kwtuple;
+    int i, len;
+
+    if (parser->kwtuple != NULL)
+        return 1;
+
+    for (len = 0; parser->keywords[len]; len++) {
+    }
+    parser->min = -1;
+    i = 0;
+    for (format = parser->format; !IS_END_OF_FORMAT(*format); format++) {
+        if (*format == '|' && parser->min < 0) {
+            parser->min = i;
+        }
+        else if (*format == 'O') {
+            i++;
+        }
+        else {
+            PyErr_Format(PyExc_SystemError,
+                         "unsupported parser format: '%s'", parser->format);
+            return 0;
+        }
+    }
+    if (i != len) {
+        PyErr_Format(PyExc_SystemError,
+                     "keyword list and format have different lengths (%d and %d)",
+                     len, i);
+        return 0;
+    }
+    parser->max = len;
+    if (parser->min < 0)
+        parser->min = len;
+    parser->fname = (*format == ':') ? format + 1 : NULL;
+
+    kwtuple = PyTuple_New(len);
+    if (kwtuple == NULL)
+        return 0;
+    for (i = 0; i < len; i++) {
+        PyObject *name = PyUnicode_InternFromString(parser->keywords[i]);
+        if (name == NULL) {
+            Py_DECREF(kwtuple);
+            return 0;
+        }
+        PyTuple_SET_ITEM(kwtuple, i, name);
+    }
+    parser->kwtuple = kwtuple;
+    return 1;
+}
+
+/* Return the index of a keyword name, or -1 if not found (or on error). */
+static Py_ssize_t
+find_keyword(PyObject *kwtuple, PyObject *key)
+{
+    Py_ssize_t i, n = PyTuple_GET_SIZE(kwtuple);
+
+    /* Keyword names in calls are usually interned */
+    for (i = 0; i < n; i++) {
+        if (PyTuple_GET_ITEM(kwtuple, i) == key)
+            return i;
+    }
+    if (!PyUnicode_Check(key)) {
+        PyErr_SetString(PyExc_TypeError, "keywords must be strings");
+        return -1;
+    }
+    for (i = 0; i < n; i++) {
+        if (PyUnicode_Compare(PyTuple_GET_ITEM(kwtuple, i), key) == 0)
+            return i;
+    }
+    return -1;
+}
+
+#define STACK_VALUES 8
+
+/* Parse arguments passed using the METH_FASTCALL | METH_KEYWORDS
+   convention: nargs positional arguments followed by the values of the
+   keyword arguments named in kwnames (which may be NULL). Each output
+   is a PyObject ** and is only assigned if the argument was given. */
+int
+CPyArg_ParseStackAndKeywords(PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames,
+                             CPyArg_Parser *parser, ...)
+{
+    PyObject *stack_values[STACK_VALUES];
+    PyObject **values = stack_values;
+    const char *fname;
+    Py_ssize_t i, j, nkwargs;
+    int max;
+    int retval = 0;
+    va_list va;
+
+    if (!parser_init(parser))
+        return 0;
+    fname = parser->fname;
+    max = parser->max;
+    nkwargs = (kwnames == NULL) ? 0 : PyTuple_GET_SIZE(kwnames);
+
+    if (nargs + nkwargs > max) {
+        PyErr_Format(PyExc_TypeError,
+                     "%.200s%s takes at most %d %sargument%s (%zd given)",
+                     (fname == NULL) ? "function" : fname,
+                     (fname == NULL) ? "" : "()",
+                     max,
+                     (nargs == 0) ? "keyword " : "",
+                     (max == 1) ? "" : "s",
+                     nargs + nkwargs);
+        return 0;
+    }
+
+    if (max > STACK_VALUES) {
+        values = PyMem_NEW(PyObject *, max);
+        if (values == NULL) {
+            PyErr_NoMemory();
+            return 0;
+        }
+    }
+    for (i = 0; i < nargs; i++)
+        values[i] = args[i];
+    for (; i < max; i++)
+        values[i] = NULL;
+
+    for (j = 0; j < nkwargs; j++) {
+        PyObject *key = PyTuple_GET_ITEM(kwnames, j);
+        i = find_keyword(parser->kwtuple, key);
+        if (i < 0) {
+            if (!PyErr_Occurred()) {
+                PyErr_Format(PyExc_TypeError,
+                             "'%U' is an invalid keyword "
+                             "argument for %.200s%s",
+                             key,
+                             (fname == NULL) ? "this function" : fname,
+                             (fname == NULL) ? "" : "()");
+            }
+            goto done;
+        }
+        if (values[i] != NULL) {
+            PyErr_Format(PyExc_TypeError,
+                         "argument for %.200s%s given by name ('%s') "
+                         "and position (%zd)",
+                         (fname == NULL) ? "function" : fname,
+                         (fname == NULL) ? "" : "()",
+                         parser->keywords[i], i+1);
+            goto done;
+        }
+        values[i] = args[nargs + j];
+    }
+
+    for (i = nargs; i < parser->min; i++) {
+        if (values[i] == NULL) {
+            PyErr_Format(PyExc_TypeError,  "%.200s%s missing required "
+                         "argument '%s' (pos %zd)",
+                         (fname == NULL) ? "function" : fname,
+                         (fname == NULL) ? "" : "()",
+                         parser->keywords[i], i+1);
+            goto done;
+        }
+    }
+
+    va_start(va, parser);
+    for (i = 0; i < max; i++) {
+        PyObject **p = va_arg(va, PyObject **);
+        if (values[i] != NULL)
+            *p = values[i];
+    }
+    va_end(va);
+    retval = 1;
+
+done:
+    if (values != stack_values)
+        PyMem_FREE(values);
+    return retval;
+}
+
+
 static const char *
 skipitem(const char **p_format, va_list *p_va, int flags)
 {
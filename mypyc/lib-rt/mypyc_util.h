@@ -4,6 +4,7 @@
 #include <Python.h>
 #include <frameobject.h>
 #include <assert.h>
+#include <stdint.h>
 
 #if defined(__clang__) || defined(__GNUC__)
 #define likely(x)       __builtin_expect((x),1)
@@ -42,6 +43,27 @@ typedef PyObject CPyModule;
 
 #define CPY_INT_TAG 1
 
+// Floats are represented as C doubles. The error value is a NaN with a
+// payload that arithmetic operations never produce, and values unboxed
+// from Python objects never have this bit pattern, so it can't clash with
+// a valid float. C has no portable constant expression for such a NaN, so
+// it is read from a union initialized with the bit pattern. This means that
+// it can't be used in static initializers.
+#define CPY_FLOAT_ERROR_BITS 0x7ff80000deadbeefULL
+
+typedef union {
+    uint64_t bits;
+    double value;
+} CPyFloatBits;
+
+static const CPyFloatBits CPyFloat_ErrorValue = { CPY_FLOAT_ERROR_BITS };
+
+#define CPY_FLOAT_ERROR (CPyFloat_ErrorValue.value)
+
+// Error value for the fixed-width integer types i64 and i32. Every value
+// is valid, so an error is only indicated if an exception is also set.
+#define CPY_LL_INT_ERROR -113
+
 typedef void (*CPyVTableItem)(void);
 
 static inline CPyTagged CPyTagged_ShortFromInt(int x) {
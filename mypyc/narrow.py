@@ -0,0 +1,178 @@
+"""Transform that uses type checks in conditions to remove redundant casts.
+
+Mypy narrows the types of variables after checks such as 'x is None'
+and isinstance(), and genops generates a checked cast to the narrowed
+type on each use of a narrowed variable:
+
+    def sum_tree(x: Optional[Node]) -> int:
+        if x is None:
+            return 0
+        return x.value + sum_tree(x.left) + sum_tree(x.right)  # 3 casts
+
+We find the branches that test a register with 'is None', 'is not None',
+type_is or a fast isinstance check. A forward data-flow analysis
+propagates the narrowed types along the corresponding edges until the
+register is assigned to again. A cast of a register that is already
+known to have a subtype of the target type is replaced with a plain
+assignment to a register of the target type, which doesn't perform a
+runtime type check and can't fail.
+
+Checks combined using 'and'/'or' are only used when the combined
+branches end up testing the individual checks directly.
+"""
+
+from typing import List, Dict, Tuple, Optional
+
+from mypyc.analysis import get_cfg
+from mypyc.ops import (
+    FuncIR, BasicBlock, Op, Value, Register, Assign, Branch, Cast, Box, PrimitiveOp,
+    LoadStatic, RType, RUnion, RInstance, ClassIR, NAMESPACE_TYPE,
+    none_rprimitive, bool_rprimitive
+)
+from mypyc.ops_misc import none_object_op, fast_isinstance_op, type_is_op
+from mypyc.subtype import is_subtype
+
+# Map from register to its narrowed type
+Facts = Dict[Value, RType]
+
+
+def remove_narrowed_casts(ir: FuncIR) -> None:
+    facts = analyze_narrowed_types(ir.blocks)
+
+    replacements = {}  # type: Dict[Value, Value]
+    for block in ir.blocks:
+        current = dict(facts[block])
+        for i, op in enumerate(block.ops):
+            if (isinstance(op, Cast) and op.src in current
+                    and is_subtype(current[op.src], op.type)):
+                reg = ir.env.add_temp(op.type)
+                block.ops[i] = Assign(reg, op.src, op.line)
+                del ir.env.indexes[op]
+                replacements[op] = reg
+            elif isinstance(op, Assign):
+                current.pop(op.dest, None)
+
+    if replacements:
+        for block in ir.blocks:
+            for op in block.ops:
+                srcs = op.sources()
+                if any(src in replacements for src in srcs):
+                    op.set_sources([replacements.get(src, src) for src in srcs])
+
+
+def analyze_narrowed_types(blocks: List[BasicBlock]) -> Dict[BasicBlock, Facts]:
+    """Calculate the registers known to have a narrower type at the start of each block."""
+    cfg = get_cfg(blocks)
+    # None means that no facts have been propagated to a block yet (this
+    # is the top value that includes all facts).
+    before = {block: None for block in blocks}  # type: Dict[BasicBlock, Optional[Facts]]
+    before[blocks[0]] = {}
+    changed = True
+    while changed:
+        changed = False
+        for block in blocks:
+            if block is not blocks[0]:
+                new = None  # type: Optional[Facts]
+                for pred in cfg.pred[block]:
+                    if before[pred] is None:
+                        continue
+                    edge = edge_facts(pred, block, before[pred])
+                    new = edge if new is None else meet(new, edge)
+                if new is None or new == before[block]:
+                    continue
+                before[block] = new
+                changed = True
+    return {block: facts or {} for block, facts in before.items()}
+
+
+def edge_facts(block: BasicBlock, target: BasicBlock, facts: Facts) -> Facts:
+    """Return the facts that hold when control flows from block to target."""
+    result = dict(facts)
+    for op in block.ops:
+        if isinstance(op, Assign):
+            result.pop(op.dest, None)
+    branch = block.ops[-1]
+    if (isinstance(branch, Branch) and branch.op == Branch.BOOL_EXPR
+            and branch.true is not branch.false and target is not block.error_handler):
+        if_true, if_false = condition_facts(block, branch.left)
+        if branch.negated:
+            if_true, if_false = if_false, if_true
+        result.update(if_true if target is branch.true else if_false)
+    return result
+
+
+def meet(left: Facts, right: Facts) -> Facts:
+    return {reg: typ for reg, typ in left.items() if right.get(reg) == typ}
+
+
+def condition_facts(block: BasicBlock, cond: Value) -> Tuple[Facts, Facts]:
+    """Return narrowed types implied by cond being true and false, respectively.
+
+    Only conditions computed in block (which ends with a branch on cond) are
+    understood, and the tested register must not be assigned to afterwards.
+    """
+    if not isinstance(cond, PrimitiveOp) or cond not in block.ops:
+        return {}, {}
+    desc = cond.desc
+    if desc.name == 'not' and desc.arg_types == [bool_rprimitive]:
+        if_true, if_false = condition_facts(block, cond.args[0])
+        return if_false, if_true
+    if len(cond.args) != 2:
+        return {}, {}
+    reg, other = cond.args
+    if not isinstance(reg, Register) or is_assigned_after(block, cond, reg):
+        return {}, {}
+    if desc.name in ('is', 'is not') and is_none_value(other):
+        typ = remove_none(reg.type)
+        if typ is None:
+            return {}, {}
+        if desc.name == 'is':
+            return {}, {reg: typ}
+        return {reg: typ}, {}
+    if desc is fast_isinstance_op or desc is type_is_op:
+        typ = native_type_of_type_object(reg.type, other)
+        if typ is None:
+            return {}, {}
+        return {reg: typ}, {}
+    return {}, {}
+
+
+def is_assigned_after(block: BasicBlock, op: Op, reg: Value) -> bool:
+    ops = block.ops[block.ops.index(op) + 1:]
+    return any(isinstance(later, Assign) and later.dest is reg for later in ops)
+
+
+def is_none_value(value: Value) -> bool:
+    if isinstance(value, Box):
+        return value.src.type == none_rprimitive
+    return isinstance(value, PrimitiveOp) and value.desc is none_object_op
+
+
+def remove_none(typ: RType) -> Optional[RType]:
+    """Return the type of a value of type typ that is known not to be None."""
+    if not isinstance(typ, RUnion) or none_rprimitive not in typ.items:
+        return None
+    items = [item for item in typ.items if item != none_rprimitive]
+    if len(items) == 1:
+        return items[0]
+    return RUnion(items)
+
+
+def native_type_of_type_object(typ: RType, type_obj: Value) -> Optional[RType]:
+    """Find the native class type referred to by a type object, if it's loaded directly.
+
+    Only classes that are related to typ are considered.
+    """
+    if not isinstance(type_obj, LoadStatic) or type_obj.namespace != NAMESPACE_TYPE:
+        return None
+    items = typ.items if isinstance(typ, RUnion) else [typ]
+    for item in items:
+        if isinstance(item, RInstance):
+            for cls in [item.class_ir] + list(item.class_ir.subclasses()):
+                if is_type_object_for(cls, type_obj):
+                    return RInstance(cls)
+    return None
+
+
+def is_type_object_for(cls: ClassIR, type_obj: LoadStatic) -> bool:
+    return cls.name == type_obj.identifier and cls.module_name == type_obj.module_name
@@ -96,6 +96,10 @@ class RPrimitive(RType):
             self.c_undefined = 'NULL'
         elif ctype == 'char':
             self.c_undefined = '2'
+        elif ctype == 'double':
+            self.c_undefined = 'CPY_FLOAT_ERROR'
+        elif ctype in ('int64_t', 'int32_t'):
+            self.c_undefined = 'CPY_LL_INT_ERROR'
         else:
             assert False, 'Unrecognized ctype: %r' % ctype
 
@@ -114,7 +118,18 @@ int_rprimitive = RPrimitive('builtins.int', is_unboxed=True, is_refcounted=True,
 short_int_rprimitive = RPrimitive('short_int', is_unboxed=True, is_refcounted=False,
                                   ctype='CPyTagged')
 
-float_rprimitive = RPrimitive('builtins.float', is_unboxed=False, is_refcounted=True)
+# Floats are represented as C doubles. The error value is a NaN with a
+# specific payload, so it can't clash with values computed at runtime.
+float_rprimitive = RPrimitive('builtins.float', is_unboxed=True, is_refcounted=False,
+                              ctype='double')
+
+# Opt-in fixed-width integers (see mypyc_extensions). Every value of the C
+# type is valid, so the error value must be combined with an exception check.
+int64_rprimitive = RPrimitive('mypyc_extensions.i64', is_unboxed=True, is_refcounted=False,
+                              ctype='int64_t')
+
+int32_rprimitive = RPrimitive('mypyc_extensions.i32', is_unboxed=True, is_refcounted=False,
+                              ctype='int32_t')
 
 bool_rprimitive = RPrimitive('builtins.bool', is_unboxed=True, is_refcounted=False, ctype='char')
 
@@ -133,6 +148,35 @@ str_rprimitive = RPrimitive('builtins.str', is_unboxed=False, is_refcounted=True
 # Tuple of an arbitrary length (corresponds to Tuple[t, ...], with explicit '...')
 tuple_rprimitive = RPrimitive('builtins.tuple', is_unboxed=False, is_refcounted=True)
 
+# Opt-in typed arrays (see mypyc_extensions). These are array.array objects
+# and compiled code accesses the unboxed items in the array buffer directly.
+float_array_rprimitive = RPrimitive('mypyc_extensions.FloatArray', is_unboxed=False,
+                                    is_refcounted=True)
+
+int_array_rprimitive = RPrimitive('mypyc_extensions.IntArray', is_unboxed=False,
+                                  is_refcounted=True)
+
+int64_array_rprimitive = RPrimitive('mypyc_extensions.I64Array', is_unboxed=False,
+                                    is_refcounted=True)
+
+int32_array_rprimitive = RPrimitive('mypyc_extensions.I32Array', is_unboxed=False,
+                                    is_refcounted=True)
+
+array_rprimitives = {
+    rtype.name: rtype
+    for rtype in (float_array_rprimitive, int_array_rprimitive, int64_array_rprimitive,
+                  int32_array_rprimitive)
+}  # type: Dict[str, RPrimitive]
+
+# Map typed array type name to the array.array type code and the item type.
+# IntArray items are stored as 64-bit integers, like I64Array items.
+array_types = {
+    float_array_rprimitive.name: ('d', float_rprimitive),
+    int_array_rprimitive.name: ('q', int_rprimitive),
+    int64_array_rprimitive.name: ('q', int64_rprimitive),
+    int32_array_rprimitive.name: ('i', int32_rprimitive),
+}  # type: Dict[str, Tuple[str, RType]]
+
 
 def is_int_rprimitive(rtype: RType) -> bool:
     return rtype is int_rprimitive
@@ -142,6 +186,18 @@ def is_short_int_rprimitive(rtype: RType) -> bool:
     return rtype is short_int_rprimitive
 
 
+def is_int64_rprimitive(rtype: RType) -> bool:
+    return rtype is int64_rprimitive
+
+
+def is_int32_rprimitive(rtype: RType) -> bool:
+    return rtype is int32_rprimitive
+
+
+def is_fixed_width_rtype(rtype: RType) -> bool:
+    return rtype is int64_rprimitive or rtype is int32_rprimitive
+
+
 def is_float_rprimitive(rtype: RType) -> bool:
     return isinstance(rtype, RPrimitive) and rtype.name == 'builtins.float'
 
@@ -178,6 +234,15 @@ def is_tuple_rprimitive(rtype: RType) -> bool:
     return isinstance(rtype, RPrimitive) and rtype.name == 'builtins.tuple'
 
 
+def is_array_rprimitive(rtype: RType) -> bool:
+    return isinstance(rtype, RPrimitive) and rtype.name in array_types
+
+
+def array_item_type(rtype: RType) -> RType:
+    assert is_array_rprimitive(rtype), rtype
+    return array_types[rtype.name][1]
+
+
 class RTuple(RType):
     """Fixed-length unboxed tuple (represented as a C struct)."""
 
@@ -539,6 +604,11 @@ class Op(Value):
     def sources(self) -> List[Value]:
         pass
 
+    @abstractmethod
+    def set_sources(self, new: List[Value]) -> None:
+        """Replace the sources of the op (in the order of sources())"""
+        pass
+
     def stolen(self) -> List[Value]:
         """Return arguments that have a reference count stolen by this op"""
         return []
@@ -576,6 +646,9 @@ class Goto(ControlOp):
     def sources(self) -> List[Value]:
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
     def to_str(self, env: Environment) -> str:
         return env.format('goto %l', self.label)
 
@@ -613,6 +686,9 @@ class Branch(ControlOp):
     def sources(self) -> List[Value]:
         return [self.left]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.left, = new
+
     def to_str(self, env: Environment) -> str:
         fmt, typ = self.op_names[self.op]
         if self.negated:
@@ -644,6 +720,9 @@ class Return(ControlOp):
     def sources(self) -> List[Value]:
         return [self.reg]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.reg, = new
+
     def stolen(self) -> List[Value]:
         return [self.reg]
 
@@ -675,6 +754,9 @@ class Unreachable(ControlOp):
     def sources(self) -> List[Value]:
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_unreachable(self)
 
@@ -717,6 +799,9 @@ class IncRef(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_inc_ref(self)
 
@@ -748,6 +833,9 @@ class DecRef(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_dec_ref(self)
 
@@ -780,6 +868,9 @@ class Call(RegisterOp):
     def sources(self) -> List[Value]:
         return list(self.args[:])
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.args = new[:]
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_call(self)
 
@@ -815,6 +906,10 @@ class MethodCall(RegisterOp):
     def sources(self) -> List[Value]:
         return self.args[:] + [self.obj]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.args = new[:-1]
+        self.obj = new[-1]
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_method_call(self)
 
@@ -896,6 +991,9 @@ class PrimitiveOp(RegisterOp):
     def sources(self) -> List[Value]:
         return list(self.args)
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.args = new[:]
+
     def stolen(self) -> List[Value]:
         if isinstance(self.desc.steals, list):
             assert len(self.desc.steals) == len(self.args)
@@ -933,6 +1031,9 @@ class Assign(Op):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def stolen(self) -> List[Value]:
         return [self.src]
 
@@ -948,14 +1049,17 @@ class LoadInt(RegisterOp):
 
     error_kind = ERR_NEVER
 
-    def __init__(self, value: int, line: int = -1) -> None:
+    def __init__(self, value: int, line: int = -1, rtype: RType = short_int_rprimitive) -> None:
         super().__init__(line)
         self.value = value
-        self.type = short_int_rprimitive
+        self.type = rtype
 
     def sources(self) -> List[Value]:
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
     def to_str(self, env: Environment) -> str:
         return env.format('%r = %d', self, self.value)
 
@@ -963,6 +1067,29 @@ class LoadInt(RegisterOp):
         return visitor.visit_load_int(self)
 
 
+class LoadFloat(RegisterOp):
+    """dest = float"""
+
+    error_kind = ERR_NEVER
+
+    def __init__(self, value: float, line: int = -1) -> None:
+        super().__init__(line)
+        self.value = value
+        self.type = float_rprimitive
+
+    def sources(self) -> List[Value]:
+        return []
+
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
+    def to_str(self, env: Environment) -> str:
+        return env.format('%r = %s', self, repr(self.value))
+
+    def accept(self, visitor: 'OpVisitor[T]') -> T:
+        return visitor.visit_load_float(self)
+
+
 class LoadErrorValue(RegisterOp):
     """dest = <error value for type>"""
 
@@ -982,6 +1109,9 @@ class LoadErrorValue(RegisterOp):
     def sources(self) -> List[Value]:
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
     def to_str(self, env: Environment) -> str:
         return env.format('%r = <error> :: %s', self, self.type)
 
@@ -1001,10 +1131,17 @@ class GetAttr(RegisterOp):
         assert isinstance(obj.type, RInstance), 'Attribute access not supported: %s' % obj.type
         self.class_type = obj.type
         self.type = obj.type.attr_type(attr)
+        # Reads of always defined attributes can't fail, unless tp_clear may have
+        # cleared the attribute (see mypyc.attrdefined)
+        if obj.type.class_ir.is_always_defined(attr) and not self.type.is_refcounted:
+            self.error_kind = ERR_NEVER
 
     def sources(self) -> List[Value]:
         return [self.obj]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.obj, = new
+
     def to_str(self, env: Environment) -> str:
         return env.format('%r = %r.%s', self, self.obj, self.attr)
 
@@ -1032,6 +1169,9 @@ class SetAttr(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.obj, self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.obj, self.src = new
+
     def stolen(self) -> List[Value]:
         return [self.src]
 
@@ -1079,6 +1219,9 @@ class LoadStatic(RegisterOp):
     def sources(self) -> List[Value]:
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        assert not new
+
     def to_str(self, env: Environment) -> str:
         ann = '  ({})'.format(repr(self.ann)) if self.ann else ''
         name = self.identifier
@@ -1113,6 +1256,9 @@ class InitStatic(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.value]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.value, = new
+
     def to_str(self, env: Environment) -> str:
         name = self.identifier
         if self.module_name is not None:
@@ -1142,6 +1288,9 @@ class TupleSet(RegisterOp):
     def sources(self) -> List[Value]:
         return self.items[:]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.items = new[:]
+
     def to_str(self, env: Environment) -> str:
         item_str = ', '.join(env.format('%r', item) for item in self.items)
         return env.format('%r = (%s)', self, item_str)
@@ -1165,6 +1314,9 @@ class TupleGet(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def to_str(self, env: Environment) -> str:
         return env.format('%r = %r[%d]', self, self.src, self.index)
 
@@ -1190,6 +1342,9 @@ class Cast(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def stolen(self) -> List[Value]:
         return [self.src]
 
@@ -1220,6 +1375,9 @@ class Box(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def stolen(self) -> List[Value]:
         return [self.src]
 
@@ -1247,6 +1405,9 @@ class Unbox(RegisterOp):
     def sources(self) -> List[Value]:
         return [self.src]
 
+    def set_sources(self, new: List[Value]) -> None:
+        self.src, = new
+
     def to_str(self, env: Environment) -> str:
         return env.format('%r = unbox(%s, %r)', self, self.type, self.src)
 
@@ -1289,8 +1450,16 @@ class RaiseStandardError(RegisterOp):
             return 'raise %s' % self.class_name
 
     def sources(self) -> List[Value]:
+        if isinstance(self.value, Value):
+            return [self.value]
         return []
 
+    def set_sources(self, new: List[Value]) -> None:
+        if isinstance(self.value, Value):
+            self.value, = new
+        else:
+            assert not new
+
     def accept(self, visitor: 'OpVisitor[T]') -> T:
         return visitor.visit_raise_standard_error(self)
 
@@ -1456,6 +1625,10 @@ VTableAttr = NamedTuple(
 
 VTableEntries = List[Union[VTableMethod, VTableAttr]]
 
+# A constant default attribute value. A str value is the name of a static
+# str literal (see Mapper.literal_static_name), not the value of the string.
+ConstantDefault = Union[bool, int, float, str, None]
+
 
 class ClassIR:
     """Intermediate representation of a class.
@@ -1507,6 +1680,18 @@ class ClassIR:
         self.children = []  # type: List[ClassIR]
         # Does this class or any subclass have a __bool__method
         self.has_bool = False
+        # Attributes that are always defined on instances of this class and its
+        # subclasses, so reading them can't fail (see mypyc.attrdefined)
+        self.always_defined = set()  # type: Set[str]
+        # Maximum number of deleted instances whose memory is kept for reuse (set
+        # using the freelist class decorator or the freelist_size compiler option)
+        self.freelist_size = None  # type: Optional[int]
+        # Do instances need support for the cyclic GC (see mypyc.acyclic)
+        self.needs_gc = True
+        # Default attribute values that are copied from a per-class instance template
+        # when an instance is created (other defaults are assigned by the
+        # __mypyc_defaults_setup method)
+        self.constant_defaults = OrderedDict()  # type: OrderedDict[str, ConstantDefault]
         # If this a subclass of some built-in python class, the name
         # of the object for that class. We currently only support this
         # in a few ad-hoc cases.
@@ -1534,6 +1719,13 @@ class ClassIR:
     def attr_type(self, name: str) -> RType:
         return self.attr_details(name)[0]
 
+    def is_always_defined(self, name: str) -> bool:
+        return name in self.always_defined
+
+    def is_deletable(self, name: str) -> bool:
+        """Can a native attribute be deleted (is it never always defined in a subclass)?"""
+        return not any(cl.is_always_defined(name) for cl in {self} | self.subclasses())
+
     def method_decl(self, name: str) -> FuncDecl:
         for ir in self.mro:
             if name in ir.method_decls:
@@ -1595,7 +1787,10 @@ class ClassIR:
         return sorted(concrete, key=lambda c: (len(c.children), c.name))
 
 
-LiteralsMap = Dict[Tuple[Type[object], Union[int, float, str, bytes, complex]], str]
+# A tuple literal is a tuple of str literals (used for the keyword argument
+# names of calls)
+LiteralValue = Union[int, float, str, bytes, complex, Tuple[str, ...]]
+LiteralsMap = Dict[Tuple[Type[object], LiteralValue], str]
 
 
 class ModuleIR:
@@ -1641,6 +1836,10 @@ class OpVisitor(Generic[T]):
     def visit_load_int(self, op: LoadInt) -> T:
         raise NotImplementedError
 
+    @abstractmethod
+    def visit_load_float(self, op: LoadFloat) -> T:
+        raise NotImplementedError
+
     @abstractmethod
     def visit_load_error_value(self, op: LoadErrorValue) -> T:
         raise NotImplementedError
@@ -1779,6 +1978,9 @@ class RTypeVisitor(Generic[T]):
 
 # Import various modules that set up global state.
 import mypyc.ops_int
+import mypyc.ops_float
+import mypyc.ops_fixed_int
+import mypyc.ops_array
 import mypyc.ops_str
 import mypyc.ops_list
 import mypyc.ops_dict
@@ -0,0 +1,78 @@
+"""Primitive ops for the typed array types in mypyc_extensions.
+
+Typed arrays (FloatArray, IntArray, I64Array and I32Array) are array.array
+objects with a fixed type code. Indexing, item assignment, append and len()
+operate directly on the array buffer, so items are never boxed. IntArray
+items are stored as 64-bit integers and storing an int that doesn't fit
+raises OverflowError.
+
+Slicing and other operations use the generic array.array implementation.
+"""
+
+from typing import List, Dict
+
+from mypyc.ops import (
+    RType, OpDescription, EmitterInterface, int_rprimitive, short_int_rprimitive,
+    bool_rprimitive, float_array_rprimitive, int_array_rprimitive, int64_array_rprimitive,
+    int32_array_rprimitive, float_rprimitive, int64_rprimitive, int32_rprimitive,
+    ERR_NEVER, ERR_MAGIC, ERR_FALSE
+)
+from mypyc.ops_primitive import func_op, method_op, custom_op, call_emit
+
+# Ops used by genops for loops over typed arrays, keyed by array type name
+array_len_ops = {}  # type: Dict[str, OpDescription]
+array_get_item_unsafe_ops = {}  # type: Dict[str, OpDescription]
+
+
+def emit_len(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+    emitter.emit_line('%s = CPyTagged_ShortFromSsize_t(Py_SIZE(%s));' % (dest, args[0]))
+
+
+def array_ops(rtype: RType, item_type: RType, prefix: str, unsafe_error_kind: int) -> None:
+    """Define the primitive ops of a typed array type.
+
+    Here prefix is the prefix of the C helper functions.
+    """
+    method_op(
+        name='__getitem__',
+        arg_types=[rtype, int_rprimitive],
+        result_type=item_type,
+        error_kind=ERR_MAGIC,
+        emit=call_emit('%s_GetItem' % prefix))
+
+    method_op(
+        name='__setitem__',
+        arg_types=[rtype, int_rprimitive, item_type],
+        result_type=bool_rprimitive,
+        error_kind=ERR_FALSE,
+        emit=call_emit('%s_SetItem' % prefix))
+
+    method_op(
+        name='append',
+        arg_types=[rtype, item_type],
+        result_type=bool_rprimitive,
+        error_kind=ERR_FALSE,
+        emit=call_emit('%s_Append' % prefix))
+
+    array_len_ops[rtype.name] = func_op(
+        name='builtins.len',
+        arg_types=[rtype],
+        result_type=short_int_rprimitive,
+        error_kind=ERR_NEVER,
+        emit=emit_len)
+
+    # This is unsafe because it assumes that the index is a non-negative short integer
+    # that is in-bounds for the array.
+    array_get_item_unsafe_ops[rtype.name] = custom_op(
+        arg_types=[rtype, short_int_rprimitive],
+        result_type=item_type,
+        error_kind=unsafe_error_kind,
+        format_str='{dest} = {args[0]}[{args[1]}] :: unsafe array',
+        emit=call_emit('%s_GetItemUnsafe' % prefix))
+
+
+array_ops(float_array_rprimitive, float_rprimitive, 'CPyFloatArray', ERR_NEVER)
+# Reading an IntArray item may need to allocate a long int
+array_ops(int_array_rprimitive, int_rprimitive, 'CPyIntArray', ERR_MAGIC)
+array_ops(int64_array_rprimitive, int64_rprimitive, 'CPyInt64Array', ERR_NEVER)
+array_ops(int32_array_rprimitive, int32_rprimitive, 'CPyInt32Array', ERR_NEVER)
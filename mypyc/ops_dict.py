@@ -10,7 +10,7 @@ from mypyc.ops import (
 from mypyc.ops_primitive import (
     name_ref_op, method_op, binary_op, func_op, custom_op,
     simple_emit, negative_int_emit,
-    call_emit, call_negative_bool_emit, call_negative_magic_emit,
+    call_emit, call_negative_bool_emit, call_negative_magic_emit, cached_call_emit,
 )
 
 
@@ -27,6 +27,16 @@ dict_get_item_op = method_op(
     error_kind=ERR_MAGIC,
     emit=call_emit('CPyDict_GetItem'))
 
+# Like dict_get_item_op, but the key must always be the same static str.
+# Each use site caches the value while the dict is unchanged (see
+# CPyDict_GetItemCached). This is used for module globals.
+dict_get_item_cached_op = custom_op(
+    arg_types=[dict_rprimitive, object_rprimitive],
+    result_type=object_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = {args[0]}[{args[1]}] :: dict',
+    emit=cached_call_emit('CPyDict_GetItemCached', 'CPyDictCache'))
+
 
 dict_set_item_op = method_op(
     name='__setitem__',
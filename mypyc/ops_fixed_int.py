@@ -0,0 +1,158 @@
+"""Primitive ops for the fixed-width integer types i64 and i32.
+
+These are opt-in types defined in mypyc_extensions. Values are unboxed C
+integers, and arithmetic wraps around on overflow like it does in C
+(the operations are performed on unsigned values to avoid undefined
+behavior). Conversions from int are checked and raise OverflowError.
+
+Every value of a fixed-width integer is valid, so the error value
+CPY_LL_INT_ERROR only indicates an error if an exception is also set.
+
+When one operand of an arithmetic or bitwise operation is a fixed-width
+integer and the other one is an int, genops converts the int operand to
+the fixed-width type. Comparisons are only done natively if the int
+operand is a literal that fits in the fixed-width type.
+"""
+
+from typing import List, Optional
+
+from mypyc.ops import (
+    RType, int64_rprimitive, int32_rprimitive, int_rprimitive, bool_rprimitive,
+    ERR_NEVER, ERR_MAGIC
+)
+from mypyc.ops_primitive import binary_op, unary_op, func_op, custom_op, simple_emit, call_emit
+
+# Binary operations that convert an int operand to a fixed-width integer if
+# the other operand is a fixed-width integer
+promoting_fixed_width_ops = []  # type: List[str]
+
+fixed_width_comparison_ops = ['==', '!=', '<', '<=', '>', '>=']
+
+# Minimum and maximum values of each fixed-width type
+fixed_width_ranges = {
+    int64_rprimitive.name: (-2 ** 63, 2 ** 63 - 1),
+    int32_rprimitive.name: (-2 ** 31, 2 ** 31 - 1),
+}
+
+
+def fixed_width_binary_op(rtype: RType, name: str, op: str, emit_template: str,
+                          error_kind: int = ERR_NEVER,
+                          result_type: Optional[RType] = None) -> None:
+    binary_op(op=op,
+              arg_types=[rtype, rtype],
+              result_type=result_type or rtype,
+              error_kind=error_kind,
+              format_str='{dest} = {args[0]} %s {args[1]} :: %s' % (op, name),
+              emit=simple_emit(emit_template))
+
+
+def fixed_width_ops(rtype: RType, name: str, ctype: str, utype: str, prefix: str) -> None:
+    """Define the primitive ops of a fixed-width integer type.
+
+    Here utype is the unsigned C type of the same width and prefix is the
+    prefix of the C helper functions.
+    """
+    def arith_op(op: str, emit_template: str, error_kind: int = ERR_NEVER) -> None:
+        # This works for the augmented assignment operators as well, since genops
+        # does the assignment regardless of whether the operator works in place.
+        for op_name in (op, op + '='):
+            fixed_width_binary_op(rtype, name, op_name, emit_template, error_kind)
+            if op_name not in promoting_fixed_width_ops:
+                promoting_fixed_width_ops.append(op_name)
+
+    def wrapping_op(op: str) -> None:
+        arith_op(op, '{dest} = (%s)((%s){args[0]} %s (%s){args[1]});' % (
+            ctype, utype, op, utype))
+
+    def helper_op(op: str, c_func_name: str) -> None:
+        arith_op(op, '{dest} = %s_%s({args[0]}, {args[1]});' % (prefix, c_func_name),
+                 ERR_MAGIC)
+
+    wrapping_op('+')
+    wrapping_op('-')
+    wrapping_op('*')
+    helper_op('//', 'Divide')
+    helper_op('%', 'Remainder')
+    arith_op('&', '{dest} = {args[0]} & {args[1]};')
+    arith_op('|', '{dest} = {args[0]} | {args[1]};')
+    arith_op('^', '{dest} = {args[0]} ^ {args[1]};')
+    helper_op('<<', 'LeftShift')
+    helper_op('>>', 'RightShift')
+
+    for op in fixed_width_comparison_ops:
+        fixed_width_binary_op(rtype, name, op, '{dest} = {args[0]} %s {args[1]};' % op,
+                              result_type=bool_rprimitive)
+
+    def fixed_width_unary_op(op: str, emit_template: str) -> None:
+        unary_op(op=op,
+                 arg_type=rtype,
+                 result_type=rtype,
+                 error_kind=ERR_NEVER,
+                 format_str='{dest} = %s{args[0]} :: %s' % (op, name),
+                 emit=simple_emit(emit_template))
+
+    fixed_width_unary_op('-', '{dest} = (%s)(0 - (%s){args[0]});' % (ctype, utype))
+    fixed_width_unary_op('~', '{dest} = ~{args[0]};')
+    fixed_width_unary_op('+', '{dest} = {args[0]};')
+
+
+fixed_width_ops(int64_rprimitive, 'i64', 'int64_t', 'uint64_t', 'CPyInt64')
+fixed_width_ops(int32_rprimitive, 'i32', 'int32_t', 'uint32_t', 'CPyInt32')
+
+# Conversions used by genops when coercing between int and fixed-width types
+
+int_to_int64_op = custom_op(
+    arg_types=[int_rprimitive],
+    result_type=int64_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = int_to_i64 {args[0]}',
+    emit=call_emit('CPyTagged_AsInt64'))
+
+int_to_int32_op = custom_op(
+    arg_types=[int_rprimitive],
+    result_type=int32_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = int_to_i32 {args[0]}',
+    emit=call_emit('CPyTagged_AsInt32'))
+
+int64_to_int_op = custom_op(
+    arg_types=[int64_rprimitive],
+    result_type=int_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = i64_to_int {args[0]}',
+    emit=call_emit('CPyTagged_FromInt64'))
+
+int32_to_int_op = custom_op(
+    arg_types=[int32_rprimitive],
+    result_type=int_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = i32_to_int {args[0]}',
+    emit=call_emit('CPyTagged_FromInt64'))
+
+int32_to_int64_op = custom_op(
+    arg_types=[int32_rprimitive],
+    result_type=int64_rprimitive,
+    error_kind=ERR_NEVER,
+    format_str='{dest} = i32_to_i64 {args[0]}',
+    emit=simple_emit('{dest} = {args[0]};'))
+
+int64_to_int32_op = custom_op(
+    arg_types=[int64_rprimitive],
+    result_type=int32_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = i64_to_i32 {args[0]}',
+    emit=call_emit('CPyInt32_FromInt64'))
+
+func_op(
+    name='builtins.int',
+    arg_types=[int64_rprimitive],
+    result_type=int_rprimitive,
+    error_kind=ERR_MAGIC,
+    emit=call_emit('CPyTagged_FromInt64'))
+
+func_op(
+    name='builtins.int',
+    arg_types=[int32_rprimitive],
+    result_type=int_rprimitive,
+    error_kind=ERR_MAGIC,
+    emit=call_emit('CPyTagged_FromInt64'))
@@ -0,0 +1,137 @@
+"""Primitive float ops.
+
+Floats are unboxed C doubles. Arithmetic that can't fail is performed
+inline, and operations that may raise an exception (such as division by
+zero) call helpers that return CPY_FLOAT_ERROR on error.
+
+When one operand of an arithmetic operation is an int and the other one
+is a float, genops converts the int operand to a float first (just like
+Python does). Comparisons are only promoted for small int literals, since
+converting a large int to a float loses precision.
+"""
+
+from typing import List
+
+from mypyc.ops import (
+    OpDescription, RType, float_rprimitive, int_rprimitive, bool_rprimitive, object_rprimitive,
+    ERR_NEVER, ERR_MAGIC
+)
+from mypyc.ops_primitive import (
+    binary_op, unary_op, func_op, name_ref_op, custom_op, simple_emit, call_emit
+)
+
+# Binary operations that convert an int operand to a float if the other
+# operand is a float
+promoting_float_ops = []  # type: List[str]
+
+
+def float_binary_op(op: str, emit_template: str, error_kind: int = ERR_NEVER,
+                    result_type: RType = float_rprimitive) -> None:
+    binary_op(op=op,
+              arg_types=[float_rprimitive, float_rprimitive],
+              result_type=result_type,
+              error_kind=error_kind,
+              format_str='{dest} = {args[0]} %s {args[1]} :: float' % op,
+              emit=simple_emit(emit_template))
+
+
+def float_arith_op(op: str, emit_template: str, error_kind: int = ERR_NEVER) -> None:
+    # This works for the augmented assignment operators as well, since genops
+    # does the assignment regardless of whether the operator works in place.
+    for name in (op, op + '='):
+        float_binary_op(name, emit_template, error_kind)
+        promoting_float_ops.append(name)
+
+
+float_arith_op('+', '{dest} = {args[0]} + {args[1]};')
+float_arith_op('-', '{dest} = {args[0]} - {args[1]};')
+float_arith_op('*', '{dest} = {args[0]} * {args[1]};')
+float_arith_op('/', '{dest} = CPyFloat_TrueDivide({args[0]}, {args[1]});', ERR_MAGIC)
+float_arith_op('//', '{dest} = CPyFloat_FloorDivide({args[0]}, {args[1]});', ERR_MAGIC)
+float_arith_op('%', '{dest} = CPyFloat_Remainder({args[0]}, {args[1]});', ERR_MAGIC)
+float_arith_op('**', '{dest} = CPyFloat_Power({args[0]}, {args[1]});', ERR_MAGIC)
+
+# A negative float raised to a fractional power is a complex number, so
+# genops uses this op unless the result is known to be a float
+float_power_op = custom_op(
+    arg_types=[float_rprimitive, float_rprimitive],
+    result_type=object_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = {args[0]} ** {args[1]} :: float',
+    emit=call_emit('CPyFloat_PowerObject'))
+
+float_comparison_ops = ['==', '!=', '<', '<=', '>', '>=']
+
+for op in float_comparison_ops:
+    float_binary_op(op, '{dest} = {args[0]} %s {args[1]};' % op, result_type=bool_rprimitive)
+
+
+def float_unary_op(op: str, emit_template: str) -> OpDescription:
+    return unary_op(op=op,
+                    arg_type=float_rprimitive,
+                    result_type=float_rprimitive,
+                    error_kind=ERR_NEVER,
+                    format_str='{dest} = %s{args[0]} :: float' % op,
+                    emit=simple_emit(emit_template))
+
+
+float_unary_op('-', '{dest} = -{args[0]};')
+float_unary_op('+', '{dest} = {args[0]};')
+
+int_to_float_op = custom_op(
+    arg_types=[int_rprimitive],
+    result_type=float_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = int_to_float {args[0]}',
+    emit=call_emit('CPyFloat_FromTagged'))
+
+func_op(
+    name='builtins.float',
+    arg_types=[int_rprimitive],
+    result_type=float_rprimitive,
+    error_kind=ERR_MAGIC,
+    emit=call_emit('CPyFloat_FromTagged'))
+
+func_op(
+    name='builtins.float',
+    arg_types=[float_rprimitive],
+    result_type=float_rprimitive,
+    error_kind=ERR_NEVER,
+    emit=simple_emit('{dest} = {args[0]};'))
+
+func_op(
+    name='builtins.abs',
+    arg_types=[float_rprimitive],
+    result_type=float_rprimitive,
+    error_kind=ERR_NEVER,
+    emit=call_emit('fabs'))
+
+
+def math_func_op(name: str, c_func_name: str, error_kind: int = ERR_MAGIC,
+                 result_type: RType = float_rprimitive) -> None:
+    func_op(name='math.' + name,
+            arg_types=[float_rprimitive],
+            result_type=result_type,
+            error_kind=error_kind,
+            emit=call_emit(c_func_name))
+
+
+math_func_op('sqrt', 'CPyFloat_Sqrt')
+math_func_op('exp', 'CPyFloat_Exp')
+math_func_op('log', 'CPyFloat_Log')
+math_func_op('sin', 'CPyFloat_Sin')
+math_func_op('cos', 'CPyFloat_Cos')
+math_func_op('tan', 'CPyFloat_Tan')
+math_func_op('fabs', 'fabs', ERR_NEVER)
+math_func_op('floor', 'CPyFloat_Floor', result_type=int_rprimitive)
+math_func_op('ceil', 'CPyFloat_Ceil', result_type=int_rprimitive)
+
+name_ref_op('math.pi',
+            result_type=float_rprimitive,
+            error_kind=ERR_NEVER,
+            emit=simple_emit('{dest} = Py_MATH_PI;'))
+
+name_ref_op('math.e',
+            result_type=float_rprimitive,
+            error_kind=ERR_NEVER,
+            emit=simple_emit('{dest} = Py_MATH_E;'))
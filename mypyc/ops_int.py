@@ -22,21 +22,22 @@ name_ref_op('builtins.int',
             emit=simple_emit('{dest} = (PyObject *)&PyLong_Type;'),
             is_borrowed=True)
 
-# Convert from a float. We could do a bit better directly.
+# Convert from a float
 func_op(
     name='builtins.int',
     arg_types=[float_rprimitive],
-    result_type=object_rprimitive,
+    result_type=int_rprimitive,
     error_kind=ERR_MAGIC,
-    emit=call_emit('CPyLong_FromFloat'),
+    emit=call_emit('CPyTagged_FromFloat'),
     priority=1)
 
 
-def int_binary_op(op: str, c_func_name: str, result_type: RType = int_rprimitive) -> None:
+def int_binary_op(op: str, c_func_name: str, result_type: RType = int_rprimitive,
+                  error_kind: int = ERR_NEVER) -> None:
     binary_op(op=op,
               arg_types=[int_rprimitive, int_rprimitive],
               result_type=result_type,
-              error_kind=ERR_NEVER,
+              error_kind=error_kind,
               format_str='{dest} = {args[0]} %s {args[1]} :: int' % op,
               emit=call_emit(c_func_name))
 
@@ -59,6 +60,12 @@ int_binary_op('-', 'CPyTagged_Subtract')
 int_binary_op('*', 'CPyTagged_Multiply')
 int_binary_op('//', 'CPyTagged_FloorDivide')
 int_binary_op('%', 'CPyTagged_Remainder')
+int_binary_op('&', 'CPyTagged_And')
+int_binary_op('|', 'CPyTagged_Or')
+int_binary_op('^', 'CPyTagged_Xor')
+# Shifts raise an exception if the shift count is negative
+int_binary_op('<<', 'CPyTagged_LeftShift', error_kind=ERR_MAGIC)
+int_binary_op('>>', 'CPyTagged_RightShift', error_kind=ERR_MAGIC)
 
 # this should work because assignment operators are parsed differently
 # and the code in genops that handles it does the assignment
@@ -68,6 +75,11 @@ int_binary_op('-=', 'CPyTagged_Subtract')
 int_binary_op('*=', 'CPyTagged_Multiply')
 int_binary_op('//=', 'CPyTagged_FloorDivide')
 int_binary_op('%=', 'CPyTagged_Remainder')
+int_binary_op('&=', 'CPyTagged_And')
+int_binary_op('|=', 'CPyTagged_Or')
+int_binary_op('^=', 'CPyTagged_Xor')
+int_binary_op('<<=', 'CPyTagged_LeftShift', error_kind=ERR_MAGIC)
+int_binary_op('>>=', 'CPyTagged_RightShift', error_kind=ERR_MAGIC)
 
 int_compare_op('==', 'CPyTagged_IsEq')
 int_compare_op('!=', 'CPyTagged_IsNe')
@@ -94,3 +106,4 @@ def int_unary_op(op: str, c_func_name: str) -> OpDescription:
 
 
 int_neg_op = int_unary_op('-', 'CPyTagged_Negate')
+int_unary_op('~', 'CPyTagged_Invert')
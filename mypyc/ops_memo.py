@@ -0,0 +1,102 @@
+"""Primitive ops for the caches of memoized functions.
+
+A function decorated with mypyc_extensions.memoize has a cache object
+(see CPyMemo_New) that maps argument values to results. Keys are built
+from the unboxed argument values, so each function needs ops specialized
+for the types of its arguments.
+"""
+
+from typing import List, Optional
+
+from mypyc.ops import (
+    EmitterInterface, OpDescription, RType, object_rprimitive, bool_rprimitive,
+    is_int_rprimitive, is_short_int_rprimitive, is_float_rprimitive, is_bool_rprimitive,
+    is_none_rprimitive, is_fixed_width_rtype, ERR_MAGIC, ERR_FALSE
+)
+from mypyc.ops_primitive import custom_op
+
+
+def memo_key_kind(rtype: RType) -> str:
+    """Return the kind of a key item of the given type (see CPyMemoWord)."""
+    if is_int_rprimitive(rtype) or is_short_int_rprimitive(rtype):
+        return 't'
+    elif is_float_rprimitive(rtype):
+        return 'f'
+    elif is_bool_rprimitive(rtype) or is_none_rprimitive(rtype) or is_fixed_width_rtype(rtype):
+        return 'w'
+    return 'o'
+
+
+def memo_key_type(rtype: RType) -> RType:
+    """Return the type that a key item of the given type is passed as."""
+    return object_rprimitive if memo_key_kind(rtype) == 'o' else rtype
+
+
+def emit_memo_key(emitter: EmitterInterface, key_types: List[RType], args: List[str]) -> str:
+    """Emit a C array of key items and return its name."""
+    temp = emitter.temp_name()
+    emitter.emit_line('CPyMemoWord %s[%d];' % (temp, max(len(args), 1)))
+    for i, (rtype, arg) in enumerate(zip(key_types, args)):
+        kind = memo_key_kind(rtype)
+        if kind == 'w':
+            emitter.emit_line('%s[%d].w = (int64_t)%s;' % (temp, i, arg))
+        else:
+            emitter.emit_line('%s[%d].%s = %s;' % (temp, i, kind, arg))
+    return temp
+
+
+def memo_new_op(key_types: List[RType], maxsize: Optional[int]) -> OpDescription:
+    """Create an op that creates the cache of a function.
+
+    The arguments are the function that uses the cache and the undecorated
+    function. The cache is unbounded if maxsize is None.
+    """
+    kinds = ''.join(memo_key_kind(rtype) for rtype in key_types)
+    c_maxsize = -1 if maxsize is None else maxsize
+
+    def emit(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+        emitter.emit_line('%s = CPyMemo_New(%s, %s, %d, "%s");' % (
+            dest, args[0], args[1], c_maxsize, kinds))
+
+    return custom_op(
+        arg_types=[object_rprimitive, object_rprimitive],
+        result_type=object_rprimitive,
+        error_kind=ERR_MAGIC,
+        format_str='{dest} = memo_new {args[0]}, {args[1]}, %r, %r' % (maxsize, kinds),
+        emit=emit)
+
+
+def memo_lookup_op(key_types: List[RType]) -> OpDescription:
+    """Create an op that looks up a cached result.
+
+    The arguments are the cache followed by the key items. The result is
+    the cache itself if there is no cached result.
+    """
+    def emit(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+        key = emit_memo_key(emitter, key_types, args[1:])
+        emitter.emit_line('%s = CPyMemo_Lookup(%s, %s);' % (dest, args[0], key))
+
+    return custom_op(
+        arg_types=[object_rprimitive] + [memo_key_type(rtype) for rtype in key_types],
+        result_type=object_rprimitive,
+        error_kind=ERR_MAGIC,
+        format_str='{dest} = memo_lookup {comma_args}',
+        emit=emit)
+
+
+def memo_store_op(key_types: List[RType]) -> OpDescription:
+    """Create an op that caches a result.
+
+    The arguments are the cache and the boxed result followed by the key items.
+    """
+    def emit(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+        key = emit_memo_key(emitter, key_types, args[2:])
+        emitter.emit_line('%s = CPyMemo_Store(%s, %s, %s);' % (dest, args[0], args[1], key))
+
+    return custom_op(
+        arg_types=([object_rprimitive, object_rprimitive]
+                   + [memo_key_type(rtype) for rtype in key_types]),
+        result_type=bool_rprimitive,
+        error_kind=ERR_FALSE,
+        format_str='{dest} = memo_store {comma_args}',
+        emit=emit)
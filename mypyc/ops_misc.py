@@ -11,7 +11,7 @@ from mypyc.ops import (
 from mypyc.ops_primitive import (
     name_ref_op, simple_emit, binary_op, unary_op, func_op, method_op, custom_op,
     simple_emit, negative_int_emit,
-    call_emit, name_emit, call_negative_bool_emit, call_negative_magic_emit,
+    call_emit, name_emit, call_negative_bool_emit, call_negative_magic_emit, cached_call_emit,
 )
 
 
@@ -268,6 +268,26 @@ py_getattr_op = func_op(
     emit=call_emit('PyObject_GetAttr')
 )
 
+# Get an attribute with a fixed name (the second argument must always be the
+# same static str). Each use site has an inline cache keyed on the type of
+# the object (see CPyObject_GetAttrCached).
+py_getattr_cached_op = custom_op(
+    arg_types=[object_rprimitive, str_rprimitive],
+    result_type=object_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = getattr {args[0]}, {args[1]}',
+    emit=cached_call_emit('CPyObject_GetAttrCached', 'CPyAttrCache'))
+
+# Get an attribute of a module with a fixed name (that isn't a dunder name).
+# Each use site caches the value while the module dict is unchanged (see
+# CPyModule_GetAttrCached).
+py_module_getattr_cached_op = custom_op(
+    arg_types=[object_rprimitive, str_rprimitive],
+    result_type=object_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = getattr {args[0]}, {args[1]}',
+    emit=cached_call_emit('CPyModule_GetAttrCached', 'CPyDictCache'))
+
 py_setattr_op = func_op(
     name='builtins.setattr',
     arg_types=[object_rprimitive, object_rprimitive, object_rprimitive],
@@ -292,13 +312,64 @@ py_delattr_op = func_op(
     emit=call_negative_bool_emit('PyObject_DelAttr')
 )
 
+
+def emit_arg_stack(emitter: EmitterInterface, args: List[str]) -> str:
+    """Emit a C array of call arguments and return its name (or NULL if there are none)."""
+    if not args:
+        return 'NULL'
+    temp = emitter.temp_name()
+    emitter.emit_line('PyObject *%s[%d] = {%s};' % (temp, len(args), ', '.join(args)))
+    return temp
+
+
+def emit_call(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+    stack = emit_arg_stack(emitter, args[1:])
+    emitter.emit_line('%s = CPyObject_Vectorcall(%s, %s, %d, NULL);' % (
+        dest, args[0], stack, len(args) - 1))
+
+
+def emit_call_with_kwnames(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+    func, kwnames = args[:2]
+    stack = emit_arg_stack(emitter, args[2:])
+    emitter.emit_line('%s = CPyObject_Vectorcall(%s, %s, %d - PyTuple_GET_SIZE(%s), %s);' % (
+        dest, func, stack, len(args) - 2, kwnames, kwnames))
+
+
+def emit_method_call(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+    obj, name = args[:2]
+    stack = emit_arg_stack(emitter, [obj] + args[2:])
+    emitter.emit_line('%s = CPyObject_VectorcallMethod(%s, %s, %d, NULL);' % (
+        dest, name, stack, len(args) - 1))
+
+
+def emit_method_call_with_kwnames(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+    obj, name, kwnames = args[:3]
+    stack = emit_arg_stack(emitter, [obj] + args[3:])
+    emitter.emit_line(
+        '%s = CPyObject_VectorcallMethod(%s, %s, %d - PyTuple_GET_SIZE(%s), %s);' % (
+            dest, name, stack, len(args) - 2, kwnames, kwnames))
+
+
+# Python calls pass the arguments in a C array, which avoids building
+# an argument tuple (see CPyObject_Vectorcall)
 py_call_op = custom_op(
     arg_types=[object_rprimitive],
     result_type=object_rprimitive,
     is_var_arg=True,
     error_kind=ERR_MAGIC,
     format_str='{dest} = py_call({comma_args})',
-    emit=simple_emit('{dest} = PyObject_CallFunctionObjArgs({comma_args}, NULL);'))
+    emit=emit_call)
+
+# Call with positional arguments followed by keyword arguments, with the
+# keyword argument names in a static tuple (the second argument). There's
+# always at least one keyword argument.
+py_call_with_kwnames_op = custom_op(
+    arg_types=[object_rprimitive, tuple_rprimitive, object_rprimitive],
+    result_type=object_rprimitive,
+    is_var_arg=True,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = py_call_with_kwnames({comma_args})',
+    emit=emit_call_with_kwnames)
 
 py_call_with_kwargs_op = custom_op(
     arg_types=[object_rprimitive],
@@ -308,14 +379,32 @@ py_call_with_kwargs_op = custom_op(
     format_str='{dest} = py_call_with_kwargs({args[0]}, {args[1]}, {args[2]})',
     emit=call_emit('PyObject_Call'))
 
+# Like py_call_with_kwargs_op, but without keyword arguments
+py_call_with_args_op = custom_op(
+    arg_types=[object_rprimitive, object_rprimitive],
+    result_type=object_rprimitive,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = py_call_with_args({args[0]}, {args[1]})',
+    emit=simple_emit('{dest} = PyObject_Call({args[0]}, {args[1]}, NULL);'))
+
 
+# Method calls don't create a bound method object if the attribute is
+# a plain method (see CPyObject_VectorcallMethod)
 py_method_call_op = custom_op(
     arg_types=[object_rprimitive],
     result_type=object_rprimitive,
     is_var_arg=True,
     error_kind=ERR_MAGIC,
     format_str='{dest} = py_method_call({comma_args})',
-    emit=simple_emit('{dest} = PyObject_CallMethodObjArgs({comma_args}, NULL);'))
+    emit=emit_method_call)
+
+py_method_call_with_kwnames_op = custom_op(
+    arg_types=[object_rprimitive, str_rprimitive, tuple_rprimitive, object_rprimitive],
+    result_type=object_rprimitive,
+    is_var_arg=True,
+    error_kind=ERR_MAGIC,
+    format_str='{dest} = py_method_call_with_kwnames({comma_args})',
+    emit=emit_method_call_with_kwnames)
 
 
 import_op = custom_op(
@@ -393,3 +482,12 @@ pytype_from_template_op = custom_op(
     format_str='{dest} = pytype_from_template({comma_args})',
     emit=simple_emit(
         '{dest} = CPyType_FromTemplate((PyTypeObject *){args[0]}, {args[1]}, {args[2]});'))
+
+# Set up the runtime dataclass metadata of a native class (see genops_dataclass)
+dataclass_setup_op = custom_op(
+    arg_types=[object_rprimitive, dict_rprimitive, dict_rprimitive, dict_rprimitive],
+    result_type=bool_rprimitive,
+    error_kind=ERR_FALSE,
+    format_str='{dest} = dataclass_setup({comma_args})',
+    emit=simple_emit('{dest} = CPyDataclass_SetupMetadata((PyTypeObject *){args[0]}, '
+                     '{args[1]}, {args[2]}, {args[3]});'))
@@ -48,6 +48,21 @@ def call_emit(func: str) -> EmitCallback:
     return simple_emit('{dest} = %s({comma_args});' % func)
 
 
+def cached_call_emit(func: str, cache_type: str) -> EmitCallback:
+    """Construct an emit callback that calls a function with a per-site inline cache.
+
+    The cache is a static variable of type cache_type that is passed by
+    pointer after the other arguments.
+    """
+
+    def emit(emitter: EmitterInterface, args: List[str], dest: str) -> None:
+        cache = emitter.temp_name()
+        emitter.emit_line('static %s %s;' % (cache_type, cache))
+        emitter.emit_line('%s = %s(%s, &%s);' % (dest, func, ', '.join(args), cache))
+
+    return emit
+
+
 def call_negative_bool_emit(func: str) -> EmitCallback:
     return simple_emit('{dest} = %s({comma_args}) >= 0;' % func)
 
@@ -18,6 +18,12 @@ func_op(name='builtins.str',
         error_kind=ERR_MAGIC,
         emit=simple_emit('{dest} = PyObject_Str({args[0]});'))
 
+repr_op = func_op(name='builtins.repr',
+                  arg_types=[object_rprimitive],
+                  result_type=str_rprimitive,
+                  error_kind=ERR_MAGIC,
+                  emit=simple_emit('{dest} = PyObject_Repr({args[0]});'))
+
 binary_op(op='+',
           arg_types=[str_rprimitive, str_rprimitive],
           result_type=str_rprimitive,
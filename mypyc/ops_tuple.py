@@ -46,7 +46,7 @@ list_tuple_op = func_op(
     emit=call_emit('PyList_AsTuple'),
     priority=2)
 
-func_op(
+sequence_tuple_op = func_op(
     name='builtins.tuple',
     arg_types=[object_rprimitive],
     result_type=tuple_rprimitive,
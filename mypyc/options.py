@@ -1,6 +1,32 @@
+from typing import List, Optional
+
+
 class CompilerOptions:
     def __init__(self, strip_asserts: bool = False, multi_file: bool = False,
-                 verbose: bool = False) -> None:
+                 verbose: bool = False,
+                 passes: Optional[List[str]] = None,
+                 disabled_passes: Optional[List[str]] = None,
+                 time_passes: bool = False,
+                 verify_ir: bool = False,
+                 compact_layout: bool = False,
+                 freelist_size: int = 0,
+                 transparent_decorators: Optional[List[str]] = None) -> None:
         self.strip_asserts = strip_asserts
         self.multi_file = multi_file
         self.verbose = verbose
+        # Names of IR passes to run, in order (None means the default pipeline)
+        self.passes = passes
+        # Names of IR passes to leave out of the pipeline
+        self.disabled_passes = disabled_passes or []
+        # Report time spent in each IR pass
+        self.time_passes = time_passes
+        # Check that the IR is well-formed after each IR pass
+        self.verify_ir = verify_ir
+        # Reorder the fields of native instances and pack bools into bitfields
+        self.compact_layout = compact_layout
+        # Number of free instances to keep for reuse for each native class (0 means
+        # no freelists); the mypyc_extensions.freelist class decorator overrides this
+        self.freelist_size = freelist_size
+        # Full names of decorators that return functions that behave like the decorated
+        # function, in addition to decorators marked with mypyc_extensions.transparent_decorator
+        self.transparent_decorators = transparent_decorators or []
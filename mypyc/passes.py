@@ -0,0 +1,187 @@
+"""Pass manager for transforms that operate on the IR of functions.
+
+Genops produces IR without explicit uninitialized variable checks,
+exception handling or reference counting. These are inserted by
+transforms that must run in a fixed order, and optimization passes
+need to be placed in the right position relative to them (for
+example, a pass that doesn't understand reference counting ops must
+run before refcount insertion).
+
+Each pass is registered with the names of the passes it must run
+after and before. The pipeline used for a compilation is described by
+a list of pass names, and it is validated against these constraints.
+"""
+
+import time
+from collections import OrderedDict
+from typing import List, Dict, Callable, Iterable, Sequence, Tuple, Optional
+
+from mypyc.ops import FuncIR, ModuleIR
+from mypyc.ircheck import assert_func_ir_valid
+from mypyc.uninit import insert_uninit_checks
+from mypyc.exceptions import insert_exception_handling
+from mypyc.refcount import insert_ref_count_opcodes
+from mypyc.tailcall import convert_tail_calls
+from mypyc.boxelim import eliminate_redundant_coercions
+from mypyc.narrow import remove_narrowed_casts
+from mypyc.escape import remove_temporary_allocations
+
+
+Transform = Callable[[FuncIR], None]
+
+
+class IRPass:
+    """Description of a transform that can be included in a pipeline.
+
+    Attributes:
+        name: short name used to refer to the pass from options
+        transform: function that modifies the IR of a single function in place
+        after: names of passes that must precede this pass, if included
+        before: names of passes that must not have run yet when this pass runs
+        required: if true, the pass can't be left out of a pipeline
+    """
+
+    def __init__(self,
+                 name: str,
+                 transform: Transform,
+                 after: Sequence[str] = (),
+                 before: Sequence[str] = (),
+                 required: bool = False) -> None:
+        self.name = name
+        self.transform = transform
+        self.after = list(after)
+        self.before = list(before)
+        self.required = required
+
+    def __repr__(self) -> str:
+        return '<IRPass {}>'.format(self.name)
+
+
+# All known passes, in registration order
+all_passes = OrderedDict()  # type: Dict[str, IRPass]
+
+# Pipeline used if no pipeline is given explicitly
+default_pipeline = []  # type: List[str]
+
+
+def register_pass(name: str,
+                  transform: Transform,
+                  after: Sequence[str] = (),
+                  before: Sequence[str] = (),
+                  required: bool = False,
+                  default: bool = True) -> IRPass:
+    """Define a pass and optionally append it to the default pipeline."""
+    assert name not in all_passes, 'already defined: %s' % name
+    ir_pass = IRPass(name, transform, after, before, required)
+    all_passes[name] = ir_pass
+    if default:
+        default_pipeline.append(name)
+    return ir_pass
+
+
+# Passes are listed in the order in which they run in the default pipeline.
+
+register_pass('tailcall', convert_tail_calls,
+              before=['uninit'])
+register_pass('narrow', remove_narrowed_casts,
+              before=['exceptions'])
+register_pass('boxelim', eliminate_redundant_coercions,
+              before=['exceptions'])
+register_pass('escape', remove_temporary_allocations,
+              before=['exceptions'])
+register_pass('uninit', insert_uninit_checks,
+              before=['exceptions'],
+              required=True)
+register_pass('exceptions', insert_exception_handling,
+              after=['uninit'],
+              required=True)
+register_pass('refcount', insert_ref_count_opcodes,
+              after=['exceptions'],
+              required=True)
+
+
+def validate_pipeline(names: Sequence[str]) -> List[IRPass]:
+    """Check that a pipeline is valid and return the corresponding passes.
+
+    Raise ValueError if a pass is unknown, duplicated, missing although
+    required, or placed in a position that violates its constraints.
+    """
+    result = []  # type: List[IRPass]
+    for name in names:
+        if name not in all_passes:
+            raise ValueError('Unknown pass: {}'.format(name))
+        if names.count(name) > 1:
+            raise ValueError('Pass included more than once: {}'.format(name))
+        result.append(all_passes[name])
+    for ir_pass in all_passes.values():
+        if ir_pass.required and ir_pass.name not in names:
+            raise ValueError('Required pass missing from pipeline: {}'.format(ir_pass.name))
+    for i, ir_pass in enumerate(result):
+        for other in ir_pass.after:
+            if other in names and names.index(other) > i:
+                raise ValueError('Pass {} must run after {}'.format(ir_pass.name, other))
+        for other in ir_pass.before:
+            if other in names and names.index(other) < i:
+                raise ValueError('Pass {} must run before {}'.format(ir_pass.name, other))
+    return result
+
+
+def build_pipeline(passes: Optional[Sequence[str]] = None,
+                   disabled_passes: Iterable[str] = ()) -> List[str]:
+    """Return the names of passes to run, given the values of compiler options."""
+    disabled = set(disabled_passes)
+    for name in disabled:
+        if name not in all_passes:
+            raise ValueError('Unknown pass: {}'.format(name))
+    pipeline = list(passes) if passes is not None else default_pipeline
+    return [name for name in pipeline if name not in disabled]
+
+
+class PassManager:
+    """Run a pipeline of passes over functions, keeping track of time spent in each.
+
+    If verify is true, the IR is checked for consistency after each pass
+    and an AssertionError is raised if a pass produced malformed IR.
+    """
+
+    def __init__(self, pipeline: Sequence[str], verify: bool = False) -> None:
+        self.passes = validate_pipeline(pipeline)
+        self.verify = verify
+        self.timings = OrderedDict((p.name, 0.0) for p in self.passes)  # type: Dict[str, float]
+
+    def run_on_function(self, fn: FuncIR) -> None:
+        errors_lowered = False
+        if self.verify:
+            assert_func_ir_valid(fn)
+        for ir_pass in self.passes:
+            t0 = time.time()
+            ir_pass.transform(fn)
+            self.timings[ir_pass.name] += time.time() - t0
+            if ir_pass.name == 'exceptions':
+                errors_lowered = True
+            if self.verify:
+                assert_func_ir_valid(fn, errors_lowered)
+
+    def run(self, modules: List[Tuple[str, ModuleIR]]) -> None:
+        # Run each pass over all functions before moving on to the next one,
+        # so that later passes can rely on all functions having been processed.
+        if self.verify:
+            for _, module in modules:
+                for fn in module.functions:
+                    assert_func_ir_valid(fn)
+        errors_lowered = False
+        for ir_pass in self.passes:
+            t0 = time.time()
+            for _, module in modules:
+                for fn in module.functions:
+                    ir_pass.transform(fn)
+            self.timings[ir_pass.name] += time.time() - t0
+            if ir_pass.name == 'exceptions':
+                errors_lowered = True
+            if self.verify:
+                for _, module in modules:
+                    for fn in module.functions:
+                        assert_func_ir_valid(fn, errors_lowered)
+
+    def format_timings(self) -> List[str]:
+        return ['Pass {} in {:.3f}s'.format(name, t) for name, t in self.timings.items()]
@@ -27,6 +27,9 @@ class PreBuildVisitor(TraverserVisitor):
         self.encapsulating_funcs = set()  # type: Set[FuncItem]
         self.nested_funcs = set()  # type: Set[FuncItem]
         self.funcs_to_decorators = {}  # type: Dict[FuncDef, List[Expression]]
+        # Functions that are defined more than once (in conditional blocks), including the
+        # original definitions.
+        self.redefined_funcs = set()  # type: Set[FuncDef]
 
     def add_free_variable(self, symbol: SymbolNode) -> None:
         # Get the FuncItem instance where the free symbol was first declared, and map that FuncItem
@@ -56,6 +59,8 @@ class PreBuildVisitor(TraverserVisitor):
         self.funcs.pop()
 
     def visit_func_def(self, fdef: FuncDef) -> None:
+        if isinstance(fdef.original_def, FuncDef):
+            self.redefined_funcs.update((fdef, fdef.original_def))
         self.visit_func(fdef)
 
     def visit_lambda_expr(self, expr: LambdaExpr) -> None:
@@ -0,0 +1,128 @@
+"""Transform that turns self-recursive tail calls into jumps.
+
+A call to the function itself that is immediately followed by a
+return of the call result is replaced with assignments to the
+argument registers and a jump back to the start of the function:
+
+    def f(n: int, acc: int) -> int:
+        if n <= 1:
+            return acc
+        return f(n - 1, acc * n)   # becomes 'n = n - 1; acc = acc * n; goto start'
+
+This avoids the call overhead and keeps deep recursion from growing
+the C stack. Note that an exception raised by a later iteration will
+only have a single traceback entry for the function.
+
+This must run before exception and uninit check insertion. The jump
+never goes to the entry block, so that the data-flow analyses used by
+later passes still see an entry block without predecessors. If the
+function has optional arguments, the jump skips the checks that assign
+their default values. Arguments reassigned by a tail call are no
+longer borrowed at the loop header, and the refcount pass takes care
+of this by increfing them before entering the loop.
+"""
+
+from typing import List, Optional, Set
+
+from mypyc.analysis import get_cfg, analyze_live_regs
+from mypyc.ops import (
+    FuncIR, BasicBlock, Call, Return, Assign, Goto, Branch, LoadErrorValue, Register, Value, Op
+)
+
+
+def convert_tail_calls(ir: FuncIR) -> None:
+    tail_blocks = [block for block in ir.blocks if is_self_tail_call(ir, block)]
+    if not tail_blocks:
+        return
+
+    args = [reg for reg in ir.env.regs() if ir.env.indexes[reg] < len(ir.args)]
+    header = find_loop_header(ir, args)
+    if header is None:
+        return
+    if header is ir.blocks[0]:
+        # The original entry block becomes the loop header.
+        entry = BasicBlock()
+        entry.ops.append(Goto(header))
+        ir.blocks.insert(0, entry)
+
+    for block in tail_blocks:
+        call = block.ops[-2]
+        assert isinstance(call, Call)
+        del block.ops[-2:]
+        del ir.env.indexes[call]
+        block.ops.extend(assign_args(ir, args, call.args))
+        block.ops.append(Goto(header))
+
+    # Registers that are live at the loop header (other than arguments) may
+    # be read before being assigned; make them undefined again on each
+    # iteration so that the uninit checks behave as on the first iteration.
+    live = analyze_live_regs(ir.blocks, get_cfg(ir.blocks))
+    reset = [reg for reg in ir.env.regs()
+             if reg in live.before[header, 0] and isinstance(reg, Register)
+             and reg not in args]
+    if reset:
+        for block in tail_blocks:
+            goto = block.ops.pop()
+            for reg in reset:
+                error = LoadErrorValue(reg.type, undefines=True)
+                ir.env.add_op(error)
+                block.ops.extend([error, Assign(reg, error)])
+            block.ops.append(goto)
+
+
+def find_loop_header(ir: FuncIR, args: List[Value]) -> Optional[BasicBlock]:
+    """Return the block that starts the function body after default argument checks.
+
+    Tail calls pass all arguments, so the checks for omitted optional
+    arguments needn't be repeated. They also must not be part of the loop,
+    since an omitted argument is undefined (and can't be increfed) until
+    its default value is assigned. Return None if the checks can't be
+    recognized.
+    """
+    block = ir.blocks[0]
+    num_optional = sum(arg.optional for arg in ir.args)
+    for _ in range(num_optional):
+        branch = block.ops[0]
+        if not (isinstance(branch, Branch) and branch.op == Branch.IS_ERROR
+                and not branch.negated and branch.left in args):
+            return None
+        block = branch.false
+    return block
+
+
+def is_self_tail_call(ir: FuncIR, block: BasicBlock) -> bool:
+    # Calls inside a try statement have an error handler, and an
+    # exception from the recursive call must be caught by it.
+    if len(block.ops) < 2 or block.error_handler is not None:
+        return False
+    call, ret = block.ops[-2], block.ops[-1]
+    return (isinstance(call, Call)
+            and call.fn is ir.decl
+            and isinstance(ret, Return)
+            and ret.reg is call
+            # Missing optional arguments would need the default values to
+            # be recomputed; leave these calls alone.
+            and not any(isinstance(arg, LoadErrorValue) for arg in call.args))
+
+
+def assign_args(ir: FuncIR, args: List[Value], values: List[Value]) -> List[Op]:
+    """Generate ops that assign new values to the argument registers.
+
+    Values that are argument registers overwritten by an earlier
+    assignment are first copied to temporaries.
+    """
+    copies = []  # type: List[Op]
+    assigns = []  # type: List[Op]
+    assigned = set()  # type: Set[Value]
+    for arg, value in zip(args, values):
+        if value is arg:
+            continue
+        if value in assigned:
+            assert isinstance(value, Register)
+            temp = ir.env.add_temp(value.type)
+            copies.append(Assign(temp, value))
+            value = temp
+        assert isinstance(arg, Register)
+        assigns.append(Assign(arg, value))
+        assigned.add(arg)
+    return copies + assigns
@@ -0,0 +1,67 @@
+"""Test cases for finding classes that don't need cyclic GC support."""
+
+import unittest
+
+from collections import OrderedDict
+from typing import Tuple
+
+from mypyc.ops import (
+    ClassIR, RType, RInstance, RTuple, RUnion, int_rprimitive, str_rprimitive, bool_rprimitive,
+    none_rprimitive, object_rprimitive, list_rprimitive
+)
+from mypyc.acyclic import analyze_acyclic_classes
+
+
+def make_class(name: str, *attrs: Tuple[str, RType]) -> ClassIR:
+    cl = ClassIR(name, 'mod')
+    cl.attributes = OrderedDict(attrs)
+    return cl
+
+
+class TestAcyclic(unittest.TestCase):
+    def test_primitive_attributes(self) -> None:
+        a = make_class('A', ('x', int_rprimitive), ('s', str_rprimitive),
+                       ('t', RTuple([bool_rprimitive, str_rprimitive])))
+        b = make_class('B', ('x', int_rprimitive), ('o', object_rprimitive))
+        c = make_class('C', ('x', list_rprimitive))
+        analyze_acyclic_classes([a, b, c])
+        assert not a.needs_gc
+        assert b.needs_gc
+        assert c.needs_gc
+
+    def test_instance_attributes(self) -> None:
+        leaf = make_class('Leaf', ('x', int_rprimitive))
+        holder = make_class('Holder', ('leaf', RUnion([RInstance(leaf), none_rprimitive])))
+        analyze_acyclic_classes([leaf, holder])
+        assert not leaf.needs_gc
+        assert not holder.needs_gc
+
+    def test_subclass_may_refer_to_anything(self) -> None:
+        leaf = make_class('Leaf', ('x', int_rprimitive))
+        sub = make_class('Sub', ('o', object_rprimitive))
+        sub.base_mro = [sub, leaf]
+        leaf.children.append(sub)
+        holder = make_class('Holder', ('leaf', RInstance(leaf)))
+        analyze_acyclic_classes([leaf, sub, holder])
+        assert not leaf.needs_gc
+        assert sub.needs_gc
+        assert holder.needs_gc
+
+    def test_cycle(self) -> None:
+        node = make_class('Node')
+        node.attributes['next'] = RUnion([RInstance(node), none_rprimitive])
+        a = make_class('A')
+        b = make_class('B', ('a', RInstance(a)))
+        a.attributes['b'] = RInstance(b)
+        holder = make_class('Holder', ('node', RInstance(node)))
+        analyze_acyclic_classes([holder, node, a, b])
+        assert node.needs_gc
+        assert a.needs_gc
+        assert b.needs_gc
+        assert holder.needs_gc
+
+    def test_dict(self) -> None:
+        a = make_class('A', ('x', int_rprimitive))
+        a.has_dict = True
+        analyze_acyclic_classes([a])
+        assert a.needs_gc
@@ -10,7 +10,8 @@ from mypyc.ops import (
     IncRef, DecRef, Branch, Call, Unbox, Box, RTuple, TupleGet, GetAttr, PrimitiveOp,
     RegisterOp, FuncDecl,
     ClassIR, RInstance, SetAttr, Op, Value, int_rprimitive, bool_rprimitive,
-    list_rprimitive, dict_rprimitive, object_rprimitive, FuncSignature,
+    list_rprimitive, dict_rprimitive, object_rprimitive, int64_rprimitive, FuncSignature,
+    ERR_NEVER, ERR_MAGIC,
 )
 from mypyc.genops import compute_vtable
 from mypyc.emit import Emitter, EmitterContext
@@ -65,6 +66,14 @@ class TestFunctionEmitterVisitor(unittest.TestCase):
         self.assert_emit(LoadInt(5),
                          "cpy_r_r0 = 10;")
 
+    def test_load_int64(self) -> None:
+        self.assert_emit(LoadInt(-5, rtype=int64_rprimitive),
+                         "cpy_r_r0 = -5;")
+
+    def test_load_int64_min(self) -> None:
+        self.assert_emit(LoadInt(-2 ** 63, rtype=int64_rprimitive),
+                         "cpy_r_r0 = (-9223372036854775807LL - 1);")
+
     def test_tuple_get(self) -> None:
         self.assert_emit(TupleGet(self.t, 1, 0), 'cpy_r_r0 = cpy_r_t.f1;')
 
@@ -196,6 +205,29 @@ class TestFunctionEmitterVisitor(unittest.TestCase):
             GetAttr(self.r, 'y', 1),
             """cpy_r_r0 = native_A_gety((AObject *)cpy_r_r); /* y */""")
 
+    def test_get_attr_always_defined(self) -> None:
+        rtype = self.r.type
+        assert isinstance(rtype, RInstance)
+        rtype.class_ir.always_defined = {'x', 'y'}
+        op = GetAttr(self.r, 'x', 1)
+        self.assertEqual(op.error_kind, ERR_NEVER)
+        self.assert_emit(op, """cpy_r_r0 = ((AObject *)cpy_r_r)->_x;""")
+
+    def test_get_attr_always_defined_refcounted(self) -> None:
+        rtype = self.r.type
+        assert isinstance(rtype, RInstance)
+        rtype.class_ir.always_defined = {'x', 'y'}
+        op = GetAttr(self.r, 'y', 1)
+        self.assertEqual(op.error_kind, ERR_MAGIC)
+        self.assert_emit(
+            op,
+            """cpy_r_r0 = ((AObject *)cpy_r_r)->_y;
+               if (unlikely(cpy_r_r0 == CPY_INT_TAG)) {
+                   PyErr_SetString(PyExc_AttributeError, "attribute 'y' of 'A' undefined");
+               } else {
+                   CPyTagged_IncRef(cpy_r_r0);
+               }""")
+
     def test_set_attr(self) -> None:
         self.assert_emit(
             SetAttr(self.r, 'y', self.m, 1),
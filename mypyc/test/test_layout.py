@@ -0,0 +1,70 @@
+"""Test cases for the layout of native instance structs."""
+
+import unittest
+
+from collections import OrderedDict
+
+from mypyc.ops import (
+    ClassIR, Environment, int_rprimitive, bool_rprimitive, int32_rprimitive, object_rprimitive
+)
+from mypyc.emit import Emitter, EmitterContext
+from mypyc.emitclass import generate_object_struct
+from mypyc.layout import instance_size
+
+
+class TestLayout(unittest.TestCase):
+    def setUp(self) -> None:
+        self.a = ClassIR('A', 'mod')
+        self.a.attributes = OrderedDict([('flag', bool_rprimitive),
+                                         ('x', int_rprimitive),
+                                         ('done', bool_rprimitive),
+                                         ('n', int32_rprimitive),
+                                         ('obj', object_rprimitive)])
+        self.b = ClassIR('B', 'mod')
+        self.b.attributes = OrderedDict([('ok', bool_rprimitive),
+                                         ('y', int_rprimitive)])
+        self.b.base_mro = [self.b, self.a]
+        self.emitter = Emitter(EmitterContext(['mod']), Environment())
+
+    def assert_struct(self, cl: ClassIR, compact: bool, expected: str) -> None:
+        generate_object_struct(cl, self.emitter, compact)
+        lines = [line.strip() for line in self.emitter.fragments]
+        self.assertEqual(lines[3:-1], expected.strip().splitlines())
+
+    def test_declaration_order(self) -> None:
+        self.assert_struct(self.a, False, """\
+char _flag;
+CPyTagged _x;
+char _done;
+int32_t _n;
+char defined_n;
+PyObject *_obj;
+""")
+
+    def test_compact(self) -> None:
+        self.assert_struct(self.a, True, """\
+CPyTagged _x;
+PyObject *_obj;
+int32_t _n;
+unsigned char _flag : 2;
+unsigned char _done : 2;
+unsigned char defined_n : 1;
+""")
+
+    def test_compact_subclass_keeps_base_prefix(self) -> None:
+        self.assert_struct(self.b, True, """\
+CPyTagged _x;
+PyObject *_obj;
+int32_t _n;
+unsigned char _flag : 2;
+unsigned char _done : 2;
+unsigned char defined_n : 1;
+CPyTagged _y;
+unsigned char _ok : 2;
+""")
+
+    def test_instance_size(self) -> None:
+        self.assertEqual(instance_size(self.a, compact=False), 64)
+        self.assertEqual(instance_size(self.a, compact=True), 48)
+        self.assertEqual(instance_size(self.b, compact=False), 80)
+        self.assertEqual(instance_size(self.b, compact=True), 64)
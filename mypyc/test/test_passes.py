@@ -0,0 +1,136 @@
+"""Test cases for the pass manager and for individual IR optimization passes.
+
+The data-driven test cases show the IR of each function after running
+only the passes associated with the test data file.
+"""
+
+import os.path
+import unittest
+
+from mypy.nodes import Var
+from mypy.test.config import test_temp_dir
+from mypy.test.data import DataDrivenTestCase
+from mypy.errors import CompileError
+
+from mypyc.common import TOP_LEVEL_NAME
+from mypyc.ops import (
+    Environment, BasicBlock, FuncIR, FuncDecl, FuncSignature, RuntimeArg, Goto, Return,
+    LoadInt, Assign, int_rprimitive, format_func
+)
+from mypyc.ircheck import check_func_ir
+from mypyc.passes import (
+    PassManager, all_passes, validate_pipeline, build_pipeline, default_pipeline
+)
+from mypyc.test.testutil import (
+    ICODE_GEN_BUILTINS, use_custom_builtins, MypycDataSuite, build_ir_for_single_file,
+    assert_test_output, remove_comment_lines
+)
+
+# Map test data file to the passes that are run for test cases in the file
+file_passes = {
+    'opt-tailcall.test': ['tailcall'],
+    'opt-boxelim.test': ['boxelim'],
+    'opt-narrow.test': ['narrow'],
+    'opt-escape.test': ['escape'],
+}
+
+
+class TestPipeline(unittest.TestCase):
+    def test_default_pipeline(self) -> None:
+        passes = validate_pipeline(default_pipeline)
+        names = [p.name for p in passes]
+        assert names.index('uninit') < names.index('exceptions') < names.index('refcount')
+
+    def test_unknown_pass(self) -> None:
+        with self.assertRaises(ValueError):
+            validate_pipeline(['uninit', 'exceptions', 'refcount', 'nonexistent'])
+        with self.assertRaises(ValueError):
+            build_pipeline(disabled_passes=['nonexistent'])
+
+    def test_missing_required_pass(self) -> None:
+        with self.assertRaises(ValueError):
+            validate_pipeline(['uninit', 'exceptions'])
+        with self.assertRaises(ValueError):
+            PassManager(build_pipeline(disabled_passes=['refcount']))
+
+    def test_bad_order(self) -> None:
+        with self.assertRaises(ValueError):
+            validate_pipeline(['uninit', 'refcount', 'exceptions'])
+        with self.assertRaises(ValueError):
+            validate_pipeline(['exceptions', 'uninit', 'refcount'])
+
+    def test_duplicate_pass(self) -> None:
+        with self.assertRaises(ValueError):
+            validate_pipeline(['uninit', 'exceptions', 'refcount', 'refcount'])
+
+
+class TestIRCheck(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = Environment()
+        self.x = self.env.add_local(Var('x'), int_rprimitive, is_arg=True)
+        self.decl = FuncDecl('f', None, 'mod',
+                             FuncSignature([RuntimeArg('x', int_rprimitive)], int_rprimitive))
+
+    def test_valid(self) -> None:
+        block = BasicBlock()
+        op = LoadInt(1)
+        self.env.add_op(op)
+        block.ops = [op, Assign(self.x, op), Return(self.x)]
+        assert check_func_ir(FuncIR(self.decl, [block], self.env)) == []
+
+    def test_missing_exit(self) -> None:
+        block = BasicBlock()
+        op = LoadInt(1)
+        self.env.add_op(op)
+        block.ops = [op]
+        assert check_func_ir(FuncIR(self.decl, [block], self.env)) == [
+            'block 0: block does not end in a control op']
+
+    def test_bad_goto_target(self) -> None:
+        block = BasicBlock()
+        block.ops = [Goto(BasicBlock())]
+        assert check_func_ir(FuncIR(self.decl, [block], self.env)) == [
+            'block 0: goto target is not part of the function']
+
+    def test_undefined_value(self) -> None:
+        block = BasicBlock()
+        op = LoadInt(1)
+        self.env.add_op(op)
+        block.ops = [Return(op)]
+        assert check_func_ir(FuncIR(self.decl, [block], self.env)) == [
+            'block 0: use of value not defined in the function: return r0']
+
+    def test_pass_manager_verifies(self) -> None:
+        block = BasicBlock()
+        block.ops = [Return(self.x)]
+        fn = FuncIR(self.decl, [block], self.env)
+        manager = PassManager(default_pipeline, verify=True)
+        manager.run_on_function(fn)
+        assert list(manager.timings) == default_pipeline
+
+
+class TestOptimizationPasses(MypycDataSuite):
+    files = list(file_passes)
+    base_path = test_temp_dir
+
+    def run_case(self, testcase: DataDrivenTestCase) -> None:
+        passes = [all_passes[name] for name in file_passes[os.path.basename(testcase.file)]]
+        with use_custom_builtins(os.path.join(self.data_prefix, ICODE_GEN_BUILTINS), testcase):
+            expected_output = remove_comment_lines(testcase.output)
+
+            try:
+                ir = build_ir_for_single_file(testcase.input)
+            except CompileError as e:
+                actual = e.messages
+            else:
+                actual = []
+                for fn in ir:
+                    if (fn.name == TOP_LEVEL_NAME
+                            and not testcase.name.endswith('_toplevel')):
+                        continue
+                    for ir_pass in passes:
+                        ir_pass.transform(fn)
+                    actual.extend(format_func(fn))
+
+            assert_test_output(testcase, actual, 'Invalid source code output',
+                               expected_output)
@@ -68,6 +68,7 @@ class TestRun(MypycDataSuite):
 
     def run_case(self, testcase: DataDrivenTestCase) -> None:
         bench = testcase.config.getoption('--bench', False) and 'Benchmark' in testcase.name
+        compact_layout = 'CompactLayout' in testcase.name
 
         # setup.py wants to be run from the root directory of the package, which we accommodate
         # by chdiring into tmp/
@@ -133,7 +134,8 @@ class TestRun(MypycDataSuite):
                     result,
                     module_names=module_names,
                     shared_lib_name=lib_name,
-                    compiler_options=CompilerOptions(multi_file=self.multi_file))
+                    compiler_options=CompilerOptions(multi_file=self.multi_file,
+                                                     compact_layout=compact_layout))
             except CompileError as e:
                 for line in e.messages:
                     print(line)
@@ -16,11 +16,16 @@ from mypy.test.helpers import assert_string_arrays_equal
 from mypyc import genops
 from mypyc.options import CompilerOptions
 from mypyc.ops import FuncIR
-from mypyc.test.config import test_data_prefix
+from mypyc.test.config import prefix, test_data_prefix
 
 # The builtins stub used during icode generation test cases.
 ICODE_GEN_BUILTINS = os.path.join(test_data_prefix, 'fixtures/ir.py')
 
+# Stub and implementation of mypyc_extensions, copied next to test cases so
+# that they can be type checked against the builtins fixture and run.
+EXTENSIONS_STUB = os.path.join(test_data_prefix, 'fixtures/mypyc_extensions.pyi')
+EXTENSIONS_MODULE = os.path.join(prefix, 'mypyc_extensions.py')
+
 
 class MypycDataSuite(DataSuite):
     # Need to list no files, since this will be picked up as a suite of tests
@@ -49,12 +54,19 @@ def use_custom_builtins(builtins_path: str, testcase: DataDrivenTestCase) -> Ite
         shutil.copyfile(builtins_path, builtins)
         default_builtins = True
 
+    extensions = [os.path.abspath(os.path.join(test_temp_dir, os.path.basename(path)))
+                  for path in (EXTENSIONS_STUB, EXTENSIONS_MODULE)]
+    for src, dest in zip((EXTENSIONS_STUB, EXTENSIONS_MODULE), extensions):
+        shutil.copyfile(src, dest)
+
     # Actually peform the test case.
     yield None
 
     if default_builtins:
         # Clean up.
         os.remove(builtins)
+    for path in extensions:
+        os.remove(path)
 
 
 def perform_test(func: Callable[[DataDrivenTestCase], None],
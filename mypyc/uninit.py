@@ -10,10 +10,11 @@ from mypyc.analysis import (
 )
 from mypyc.ops import (
     FuncIR, BasicBlock, LoadErrorValue, Return, Goto, Branch, ERR_NEVER, ERR_MAGIC,
-    Value, RaiseStandardError, Unreachable, Environment, Register,
-    ERR_FALSE, RegisterOp, PrimitiveOp,
+    Value, RaiseStandardError, Unreachable, Environment, Register, Assign, Op,
+    ERR_FALSE, RegisterOp, PrimitiveOp, bool_rprimitive, is_fixed_width_rtype,
     NO_TRACEBACK_LINE_NO,
 )
+from mypyc.ops_misc import true_op, false_op
 
 
 def insert_uninit_checks(ir: FuncIR) -> None:
@@ -33,6 +34,18 @@ def split_blocks_at_uninits(env: Environment,
                             pre_must_defined: AnalysisDict[Value]) -> List[BasicBlock]:
     new_blocks = []  # type: List[BasicBlock]
 
+    # Every value of a fixed-width integer is valid, so there is no error
+    # value that could mark an uninitialized register. Instead, a separate
+    # flag register tracks whether such a register has been assigned.
+    flags = {}  # type: Dict[Register, Register]
+    for block in blocks:
+        for i, op in enumerate(block.ops):
+            defined = pre_must_defined[block, i]
+            for src in op.unique_sources():
+                if (isinstance(src, Register) and src not in defined
+                        and is_fixed_width_rtype(src.type) and src not in flags):
+                    flags[src] = env.add_temp(bool_rprimitive)
+
     # First split blocks on ops that may raise.
     for block in blocks:
         ops = block.ops
@@ -52,13 +65,20 @@ def split_blocks_at_uninits(env: Environment,
                     new_block.error_handler = error_block.error_handler = cur_block.error_handler
                     new_blocks += [error_block, new_block]
 
-                    env.vars_needing_init.add(src)
+                    if src in flags:
+                        cur_block.ops.append(Branch(flags[src],
+                                                    true_label=new_block,
+                                                    false_label=error_block,
+                                                    op=Branch.BOOL_EXPR,
+                                                    line=op.line))
+                    else:
+                        env.vars_needing_init.add(src)
 
-                    cur_block.ops.append(Branch(src,
-                                                true_label=error_block,
-                                                false_label=new_block,
-                                                op=Branch.IS_ERROR,
-                                                line=op.line))
+                        cur_block.ops.append(Branch(src,
+                                                    true_label=error_block,
+                                                    false_label=new_block,
+                                                    op=Branch.IS_ERROR,
+                                                    line=op.line))
                     raise_std = RaiseStandardError(
                         RaiseStandardError.UNBOUND_LOCAL_ERROR,
                         "local variable '{}' referenced before assignment".format(src.name),
@@ -68,5 +88,18 @@ def split_blocks_at_uninits(env: Environment,
                     error_block.ops.append(Unreachable())
                     cur_block = new_block
             cur_block.ops.append(op)
+            if isinstance(op, Assign) and op.dest in flags:
+                cur_block.ops.extend(set_flag(env, flags[op.dest], True, op.line))
+
+    # Clear the flags on entry
+    entry = new_blocks[0]
+    for flag in flags.values():
+        entry.ops[0:0] = set_flag(env, flag, False, NO_TRACEBACK_LINE_NO)
 
     return new_blocks
+
+
+def set_flag(env: Environment, flag: Register, value: bool, line: int) -> List[Op]:
+    load = PrimitiveOp([], true_op if value else false_op, line)
+    env.add_op(load)
+    return [load, Assign(flag, load, line)]
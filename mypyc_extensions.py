@@ -0,0 +1,285 @@
+"""Types that are specific to mypyc.
+
+The fixed-width integer types i64 and i32 are compiled to unboxed C
+integers. Arithmetic and bitwise operations on them wrap around on
+overflow, and converting an int that doesn't fit raises OverflowError.
+
+When the other operand of a binary operation is an int or a different
+fixed-width type, it's converted to the type of the fixed-width operand
+(the left one if both are fixed-width), which raises OverflowError if the
+value doesn't fit. The result has the same type.
+
+When interpreted, these are int subclasses that implement the same
+semantics, so that code behaves the same whether it's compiled or not
+(except that compiled code returns plain int objects when a value is
+boxed).
+
+The typed arrays FloatArray, IntArray, I64Array and I32Array are
+array.array subclasses with a fixed type code. Compiled code reads and
+writes the items directly without boxing them. Since they are arrays,
+they also support the buffer protocol. IntArray items are stored as
+64-bit integers.
+
+The freelist(size) class decorator makes compiled code keep the memory
+of up to size deleted instances of a native class, and reuse it when
+new instances are created. It has no effect when interpreted.
+
+The transparent_decorator marker declares that a decorator (or the
+decorators returned by a decorator factory) returns a function that
+behaves like the decorated function when called, for example a
+tracing wrapper that is only enabled in some configurations. Compiled
+code calls module-level functions that only have such decorators
+directly, bypassing the wrapper; Python code still sees the decorated
+function.
+
+The memoize(maxsize) decorator caches the results of a function like
+functools.lru_cache, which it uses when interpreted. Compiled
+module-level functions with no other decorators keep a native cache
+keyed by the unboxed argument values instead, and native calls look up
+results without going through the decorated function object. When the
+cache is full, the least recently used result is dropped (maxsize=None
+means no limit). Use memo_info(f) to get the (hits, misses, maxsize,
+currsize) statistics of a cache and memo_clear(f) to clear it.
+"""
+
+import array
+import functools
+from typing import (
+    TypeVar, Sequence, Iterable, Iterator, List, Tuple, Optional, Any, Callable, overload,
+    TYPE_CHECKING
+)
+
+T = TypeVar('T', bound='_FixedWidthInt')
+E = TypeVar('E')
+A = TypeVar('A', bound='_TypedArray[Any]')
+C = TypeVar('C', bound=type)
+D = TypeVar('D', bound=Callable[..., Any])
+
+
+class _FixedWidthInt(int):
+    bits = 0
+
+    def __new__(cls: Any, x: Any = 0) -> Any:
+        value = int(x)
+        if not -2 ** (cls.bits - 1) <= value < 2 ** (cls.bits - 1):
+            raise OverflowError('int too large to convert to {}'.format(cls.__name__))
+        return super().__new__(cls, value)
+
+    def _convert(self, x: int) -> int:
+        """Convert the other operand of a binary operation to the type of self.
+
+        This raises OverflowError if the value doesn't fit, like in compiled code.
+        """
+        return int(type(self)(x))
+
+    def _wrap(self: T, value: int) -> T:
+        bits = self.bits
+        value &= (1 << bits) - 1
+        if value >= 1 << (bits - 1):
+            value -= 1 << bits
+        return type(self)(value)
+
+    def __add__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) + self._convert(x))
+
+    def __radd__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(self._convert(x) + int(self))
+
+    def __sub__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) - self._convert(x))
+
+    def __rsub__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(self._convert(x) - int(self))
+
+    def __mul__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) * self._convert(x))
+
+    def __rmul__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(self._convert(x) * int(self))
+
+    def __floordiv__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) // self._convert(x))
+
+    def __rfloordiv__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(self._convert(x) // int(self))
+
+    def __mod__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) % self._convert(x))
+
+    def __rmod__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(self._convert(x) % int(self))
+
+    def __and__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) & self._convert(x))
+
+    def __rand__(self: T, x: int) -> T:
+        return self.__and__(x)
+
+    def __or__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) | self._convert(x))
+
+    def __ror__(self: T, x: int) -> T:
+        return self.__or__(x)
+
+    def __xor__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) ^ self._convert(x))
+
+    def __rxor__(self: T, x: int) -> T:
+        return self.__xor__(x)
+
+    def __lshift__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        count = self._convert(x)
+        if count < 0:
+            raise ValueError('negative shift count')
+        return self._wrap(int(self) << min(count, self.bits))
+
+    def __rshift__(self: T, x: int) -> T:
+        if not isinstance(x, int):
+            return NotImplemented
+        return self._wrap(int(self) >> self._convert(x))
+
+    def __neg__(self: T) -> T:
+        return self._wrap(-int(self))
+
+    def __pos__(self: T) -> T:
+        return self
+
+    def __invert__(self: T) -> T:
+        return self._wrap(~int(self))
+
+    def __repr__(self) -> str:
+        return repr(int(self))
+
+
+class i64(_FixedWidthInt):
+    """64-bit signed integer."""
+
+    bits = 64
+
+
+class i32(_FixedWidthInt):
+    """32-bit signed integer."""
+
+    bits = 32
+
+
+if TYPE_CHECKING:
+    class _TypedArray(Sequence[E]):
+        def __init__(self, values: Iterable[E] = ...) -> None: ...
+        def __len__(self) -> int: ...
+        @overload
+        def __getitem__(self, index: int) -> E: ...
+        @overload
+        def __getitem__(self: A, index: slice) -> A: ...
+        def __setitem__(self, index: int, value: E) -> None: ...
+        def __iter__(self) -> Iterator[E]: ...
+        def __reversed__(self) -> Iterator[E]: ...
+        def append(self, value: E) -> None: ...
+        def extend(self, values: Iterable[E]) -> None: ...
+        def tolist(self) -> List[E]: ...
+        def tobytes(self) -> bytes: ...
+else:
+    class _TypedArrayMeta(type):
+        # Allow _TypedArray[...] as a base class on all Python versions
+        def __getitem__(cls, item):
+            return cls
+
+    class _TypedArray(array.array, metaclass=_TypedArrayMeta):
+        _typecode = ''
+
+        def __new__(cls, values=()):
+            return array.array.__new__(cls, cls._typecode, values)
+
+        def __getitem__(self, index):
+            if isinstance(index, slice):
+                # Slices of array.array subclasses are plain arrays
+                return type(self)(array.array.__getitem__(self, index))
+            return array.array.__getitem__(self, index)
+
+        def __copy__(self):
+            return type(self)(self)
+
+        def __deepcopy__(self, memo):
+            return type(self)(self)
+
+        def __reduce_ex__(self, protocol):
+            return type(self), (self.tolist(),)
+
+
+class FloatArray(_TypedArray[float]):
+    """Array of floats stored as C doubles."""
+
+    _typecode = 'd'
+
+
+class IntArray(_TypedArray[int]):
+    """Array of ints stored as 64-bit integers."""
+
+    _typecode = 'q'
+
+
+class I64Array(_TypedArray[i64]):
+    """Array of i64 values."""
+
+    _typecode = 'q'
+
+
+class I32Array(_TypedArray[i32]):
+    """Array of i32 values."""
+
+    _typecode = 'i'
+
+
+def freelist(size: int) -> Callable[[C], C]:
+    """Keep up to size free instances of a native class for reuse."""
+    def decorator(cls: C) -> C:
+        return cls
+    return decorator
+
+
+def transparent_decorator(decorator: D) -> D:
+    """Mark a decorator as returning functions that behave like the decorated ones."""
+    return decorator
+
+
+def memoize(maxsize: Optional[int] = 128) -> Callable[[D], D]:
+    """Cache the results of a function, keeping up to maxsize results."""
+    return functools.lru_cache(maxsize=maxsize)  # type: ignore
+
+
+def memo_info(f: Callable[..., Any]) -> Tuple[int, int, Optional[int], int]:
+    """Return the (hits, misses, maxsize, currsize) statistics of a memoized function."""
+    return tuple(f.cache_info())  # type: ignore
+
+
+def memo_clear(f: Callable[..., Any]) -> None:
+    """Clear the cache and statistics of a memoized function."""
+    f.cache_clear()  # type: ignore
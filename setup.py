@@ -84,7 +84,7 @@ setup(name='mypyc',
       author_email='jukka.lehtosalo@iki.fi',
       url='https://github.com/mypyc/mypyc',
       license='MIT License',
-      py_modules=[],
+      py_modules=['mypyc_extensions'],
       packages=['mypyc', 'mypyc.test'],
       package_data={'mypyc': package_data},
       scripts=['scripts/mypyc'],
@@ -31,8 +31,14 @@ class int:
     def __mul__(self, n: int) -> int: pass
     def __floordiv__(self, x: int) -> int: pass
     def __mod__(self, x: int) -> int: pass
+    def __and__(self, n: int) -> int: pass
+    def __or__(self, n: int) -> int: pass
+    def __xor__(self, n: int) -> int: pass
+    def __lshift__(self, n: int) -> int: pass
+    def __rshift__(self, n: int) -> int: pass
     def __neg__(self) -> int: pass
     def __pos__(self) -> int: pass
+    def __invert__(self) -> int: pass
     def __eq__(self, n: object) -> bool: pass
     def __ne__(self, n: object) -> bool: pass
     def __lt__(self, n: int) -> bool: pass
@@ -54,9 +60,24 @@ class str:
 class float:
     def __init__(self, x: object) -> None: pass
     def __add__(self, n: float) -> float: pass
+    def __radd__(self, n: float) -> float: pass
     def __sub__(self, n: float) -> float: pass
+    def __rsub__(self, n: float) -> float: pass
     def __mul__(self, n: float) -> float: pass
+    def __rmul__(self, n: float) -> float: pass
     def __truediv__(self, n: float) -> float: pass
+    def __rtruediv__(self, n: float) -> float: pass
+    def __floordiv__(self, n: float) -> float: pass
+    def __mod__(self, n: float) -> float: pass
+    def __pow__(self, n: float) -> float: pass
+    def __neg__(self) -> float: pass
+    def __pos__(self) -> float: pass
+    def __eq__(self, n: object) -> bool: pass
+    def __ne__(self, n: object) -> bool: pass
+    def __lt__(self, n: float) -> bool: pass
+    def __gt__(self, n: float) -> bool: pass
+    def __le__(self, n: float) -> bool: pass
+    def __ge__(self, n: float) -> bool: pass
 
 class complex:
     def __init__(self, x: object, y: object = None) -> None: pass
@@ -184,7 +205,9 @@ def next(i: Iterator[T]) -> T: pass
 def next(i: Iterator[T], default: T) -> T: pass
 def hash(o: object) -> int: ...
 def globals() -> Dict[str, Any]: ...
+def getattr(object: Any, name: str) -> Any: ...
 def setattr(object: Any, name: str, value: Any) -> None: ...
+def min(x: T, y: T) -> T: ...
 def enumerate(x: Iterable[T]) -> Iterator[Tuple[int, T]]: ...
 @overload
 def zip(x: Iterable[T], y: Iterable[S]) -> Iterator[Tuple[T, S]]: ...
@@ -0,0 +1,87 @@
+# Stub for mypyc_extensions used in test cases
+
+from typing import (
+    TypeVar, Sequence, Iterable, Iterator, List, Tuple, Optional, Any, Callable, overload
+)
+
+E = TypeVar('E')
+A = TypeVar('A', bound=_TypedArray)
+C = TypeVar('C', bound=type)
+D = TypeVar('D')
+
+class i64(int):
+    def __init__(self, x: object = 0) -> None: pass
+    def __add__(self, x: int) -> i64: pass
+    def __radd__(self, x: int) -> i64: pass
+    def __sub__(self, x: int) -> i64: pass
+    def __rsub__(self, x: int) -> i64: pass
+    def __mul__(self, x: int) -> i64: pass
+    def __rmul__(self, x: int) -> i64: pass
+    def __floordiv__(self, x: int) -> i64: pass
+    def __rfloordiv__(self, x: int) -> i64: pass
+    def __mod__(self, x: int) -> i64: pass
+    def __rmod__(self, x: int) -> i64: pass
+    def __and__(self, x: int) -> i64: pass
+    def __rand__(self, x: int) -> i64: pass
+    def __or__(self, x: int) -> i64: pass
+    def __ror__(self, x: int) -> i64: pass
+    def __xor__(self, x: int) -> i64: pass
+    def __rxor__(self, x: int) -> i64: pass
+    def __lshift__(self, x: int) -> i64: pass
+    def __rshift__(self, x: int) -> i64: pass
+    def __neg__(self) -> i64: pass
+    def __pos__(self) -> i64: pass
+    def __invert__(self) -> i64: pass
+
+class i32(int):
+    def __init__(self, x: object = 0) -> None: pass
+    def __add__(self, x: int) -> i32: pass
+    def __radd__(self, x: int) -> i32: pass
+    def __sub__(self, x: int) -> i32: pass
+    def __rsub__(self, x: int) -> i32: pass
+    def __mul__(self, x: int) -> i32: pass
+    def __rmul__(self, x: int) -> i32: pass
+    def __floordiv__(self, x: int) -> i32: pass
+    def __rfloordiv__(self, x: int) -> i32: pass
+    def __mod__(self, x: int) -> i32: pass
+    def __rmod__(self, x: int) -> i32: pass
+    def __and__(self, x: int) -> i32: pass
+    def __rand__(self, x: int) -> i32: pass
+    def __or__(self, x: int) -> i32: pass
+    def __ror__(self, x: int) -> i32: pass
+    def __xor__(self, x: int) -> i32: pass
+    def __rxor__(self, x: int) -> i32: pass
+    def __lshift__(self, x: int) -> i32: pass
+    def __rshift__(self, x: int) -> i32: pass
+    def __neg__(self) -> i32: pass
+    def __pos__(self) -> i32: pass
+    def __invert__(self) -> i32: pass
+
+class _TypedArray(Sequence[E]):
+    def __init__(self, values: Iterable[E] = ...) -> None: pass
+    def __len__(self) -> int: pass
+    @overload
+    def __getitem__(self, index: int) -> E: pass
+    @overload
+    def __getitem__(self: A, index: slice) -> A: pass
+    def __setitem__(self, index: int, value: E) -> None: pass
+    def __iter__(self) -> Iterator[E]: pass
+    def __reversed__(self) -> Iterator[E]: pass
+    def append(self, value: E) -> None: pass
+    def extend(self, values: Iterable[E]) -> None: pass
+    def tolist(self) -> List[E]: pass
+
+class FloatArray(_TypedArray[float]): pass
+class IntArray(_TypedArray[int]): pass
+class I64Array(_TypedArray[i64]): pass
+class I32Array(_TypedArray[i32]): pass
+
+def freelist(size: int) -> Callable[[C], C]: pass
+
+def transparent_decorator(decorator: D) -> D: pass
+
+def memoize(maxsize: Optional[int] = 128) -> Callable[[D], D]: pass
+
+def memo_info(f: Callable[..., Any]) -> Tuple[int, int, Optional[int], int]: pass
+
+def memo_clear(f: Callable[..., Any]) -> None: pass